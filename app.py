@@ -73,7 +73,7 @@ MAIN MODULES:
 TECHNOLOGY STACK:
 =================
 - Backend: Flask 3.0.0 (Python web framework)
-- Database: MySQL (Flask-MySQLdb connector)
+- Database: MySQL (mysqlclient driver with a bounded connection pool)
 - ML: scikit-learn 1.3.2 (Decision Tree, Logistic Regression)
 - NLP: Custom algorithms (keyword frequency, sentence scoring)
 - PDF: PyPDF2 3.0.1
@@ -115,22 +115,45 @@ This application demonstrates:
 All code is well-commented and explainable for academic presentations.
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_file
-from flask_mysqldb import MySQL
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_file, g, has_app_context, Response
+import MySQLdb
+import MySQLdb.cursors
+import click
 import os
 import re
 import bcrypt
-from datetime import timedelta, date
+import hashlib
+import hmac
+import threading
+import queue
+import abc
+import atexit
+import asyncio
+import time
+import uuid
+import random
+import itertools
+import multiprocessing
+from datetime import datetime, timedelta, date
+from decimal import Decimal
 from dotenv import load_dotenv
 from email_validator import validate_email, EmailNotValidError
 import joblib
 import numpy as np
 from werkzeug.utils import secure_filename
+from itsdangerous import URLSafeSerializer, BadSignature
 import PyPDF2
 import io
-from collections import Counter
+import csv
+import json
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import string
-import unicodedata
+import zlib
+from text_sanitizer import sanitize_text
+from document_index import BM25Index, chunk_text, DEFAULT_CHUNK_CHARS
+from pdf_extract import extract_pdf_pages, init_worker as init_pdf_worker
 
 # Load environment variables from .env file
 load_dotenv()
@@ -150,14 +173,214 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'  # CSRF protection
 
 # MySQL Database Configuration
 app.config['MYSQL_HOST'] = os.getenv('MYSQL_HOST', 'localhost')
+app.config['MYSQL_PORT'] = int(os.getenv('MYSQL_PORT', 3306))
 app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'root')
 app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD', '')
 app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'learnsmart_ai')
 app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
 app.config['MYSQL_CHARSET'] = 'utf8mb4'
 
-# Initialize MySQL
-mysql = MySQL(app)
+# Connection pool settings
+app.config['MYSQL_POOL_SIZE'] = int(os.getenv('MYSQL_POOL_SIZE', 10))  # Max open connections per process
+app.config['MYSQL_POOL_TIMEOUT'] = float(os.getenv('MYSQL_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+app.config['MYSQL_POOL_RECYCLE'] = float(os.getenv('MYSQL_POOL_RECYCLE', 300))  # Close connections idle longer than this
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free within MYSQL_POOL_TIMEOUT."""
+
+
+class MySQLConnectionPool:
+    """
+    Bounded, thread-safe pool of MySQL connections.
+    
+    HOW IT WORKS:
+    1. At most `size` connections are open at once (guarded by a semaphore)
+    2. Checkout reuses an idle connection when one is available
+    3. Connections idle longer than `recycle` seconds are closed and replaced
+    4. Every reused connection is health-checked with ping() before use
+    5. On release, any open transaction is rolled back and the connection
+       goes back to the idle list
+    
+    Wait time for a free connection is recorded so pool pressure can be
+    monitored through the /health endpoint.
+    """
+    
+    def __init__(self, config, size=10, timeout=30.0, recycle=300.0):
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = deque()  # (connection, last_used_timestamp)
+        self._lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'failed_health_checks': 0,
+            'timeouts': 0,
+            'in_use': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0
+        }
+    
+    def _create_connection(self):
+        """Open a new MySQL connection using the app's MYSQL_* settings."""
+        conn = MySQLdb.connect(
+            host=self.config['MYSQL_HOST'],
+            port=self.config['MYSQL_PORT'],
+            user=self.config['MYSQL_USER'],
+            passwd=self.config['MYSQL_PASSWORD'],
+            db=self.config['MYSQL_DB'],
+            charset=self.config['MYSQL_CHARSET'],
+            cursorclass=getattr(MySQLdb.cursors, self.config['MYSQL_CURSORCLASS'])
+        )
+        with self._lock:
+            self._stats['created'] += 1
+        return conn
+    
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def acquire(self):
+        """
+        Check out a healthy connection, waiting up to `timeout` seconds.
+        
+        Raises:
+            PoolTimeoutError: If no connection is free in time
+        """
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeoutError(f"No database connection available after {self.timeout} seconds")
+        wait_ms = (time.perf_counter() - start) * 1000
+        
+        try:
+            conn = None
+            with self._lock:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+            
+            if conn is not None:
+                if time.time() - last_used > self.recycle:
+                    # Idle too long - the server may have dropped it already
+                    self._close_quietly(conn)
+                    conn = None
+                    with self._lock:
+                        self._stats['recycled'] += 1
+                else:
+                    try:
+                        conn.ping()
+                    except Exception:
+                        self._close_quietly(conn)
+                        conn = None
+                        with self._lock:
+                            self._stats['failed_health_checks'] += 1
+            
+            if conn is None:
+                conn = self._create_connection()
+        except Exception:
+            self._slots.release()
+            raise
+        
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['total_wait_ms'] += wait_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+        return conn
+    
+    def release(self, conn):
+        """Return a connection to the pool (rolls back any uncommitted work)."""
+        try:
+            conn.rollback()
+            reusable = True
+        except Exception:
+            self._close_quietly(conn)
+            reusable = False
+        
+        with self._lock:
+            if reusable:
+                self._idle.append((conn, time.time()))
+            self._stats['in_use'] -= 1
+        self._slots.release()
+    
+    def reserve(self, count):
+        """
+        Take `count` connections out of this pool's budget, for a second pool
+        that shares the same MYSQL_POOL_SIZE limit (the ASGI aiomysql pool).
+        Waits for connections in use to come back if needed.
+        """
+        if not 0 < count < self.size:
+            raise ValueError(f"Can't reserve {count} of {self.size} pooled connections")
+        for _ in range(count):
+            self._slots.acquire()
+        with self._lock:
+            self.size -= count
+    
+    def unreserve(self, count):
+        """Give back connections taken with reserve()."""
+        with self._lock:
+            self.size += count
+        for _ in range(count):
+            self._slots.release()
+    
+    @contextmanager
+    def connection(self):
+        """Context manager for code running outside a request (scripts, background threads)."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+    
+    def stats(self):
+        """Return pool size, usage and wait-time metrics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['size'] = self.size
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / stats['checkouts'], 3) if stats['checkouts'] else 0.0
+        stats['total_wait_ms'] = round(stats['total_wait_ms'], 3)
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 3)
+        return stats
+
+
+# Initialize MySQL connection pool
+db_pool = MySQLConnectionPool(
+    app.config,
+    size=app.config['MYSQL_POOL_SIZE'],
+    timeout=app.config['MYSQL_POOL_TIMEOUT'],
+    recycle=app.config['MYSQL_POOL_RECYCLE']
+)
+
+
+def get_db():
+    """
+    Get the pooled database connection for the current request.
+    
+    The connection is checked out on first use and kept in flask.g, so all
+    helpers called during one request share a single connection. It is
+    returned to the pool automatically when the app context ends.
+    """
+    if 'db_conn' not in g:
+        g.db_conn = db_pool.acquire()
+    return g.db_conn
+
+
+@app.teardown_appcontext
+def release_db(exception=None):
+    """Return the request's database connection to the pool."""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        db_pool.release(conn)
+
 
 # File upload configuration for AI Chatbot
 UPLOAD_FOLDER = 'uploads'
@@ -172,6 +395,150 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
 
+def ensure_index(cursor, table, index_name, columns_sql):
+    """
+    Create an index on an existing table if it is not there yet.
+    
+    MySQL has no CREATE INDEX IF NOT EXISTS, so the index is looked up in
+    information_schema first. Used by init_database to migrate databases
+    created by older versions of the app.
+    
+    Args:
+        cursor: Open database cursor
+        table (str): Table name
+        index_name (str): Index name
+        columns_sql (str): Parenthesized column list, e.g. "(user_id, study_date)"
+    """
+    cursor.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    """, (table, index_name))
+    if not cursor.fetchone():
+        cursor.execute(f"CREATE INDEX {index_name} ON {table} {columns_sql.strip()}")
+
+
+def column_exists(cursor, table, column):
+    """Return True if the column exists on the table in the current database."""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+
+def ensure_column(cursor, table, column, definition):
+    """
+    Add a column to an existing table if it is not there yet.
+    
+    Args:
+        cursor: Open database cursor
+        table (str): Table name
+        column (str): Column name
+        definition (str): Column definition, e.g. "CHAR(64) NULL"
+    """
+    if not column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def ensure_foreign_key(cursor, table, constraint_name, definition_sql):
+    """
+    Add a foreign key to an existing table if it is not there yet.
+    
+    Args:
+        cursor: Open database cursor
+        table (str): Table name
+        constraint_name (str): Constraint name
+        definition_sql (str): e.g. "FOREIGN KEY (content_id) REFERENCES document_contents(id)"
+    """
+    cursor.execute("""
+        SELECT 1 FROM information_schema.table_constraints
+        WHERE table_schema = DATABASE() AND table_name = %s
+          AND constraint_name = %s AND constraint_type = 'FOREIGN KEY'
+        LIMIT 1
+    """, (table, constraint_name))
+    if not cursor.fetchone():
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint_name} {definition_sql.strip()}")
+
+
+def migrate_document_contents(conn, cursor, batch_size=100):
+    """
+    Move text stored inline in user_documents.extracted_text (databases
+    created by older versions of the app) into the content-addressed
+    document_contents table, then drop the old column.
+    
+    Rows are migrated in batches with a commit after each batch, so an
+    interrupted migration simply resumes on the next start.
+    """
+    if not column_exists(cursor, 'user_documents', 'extracted_text'):
+        return
+    
+    migrated = 0
+    while True:
+        cursor.execute("""
+            SELECT id, extracted_text FROM user_documents
+            WHERE content_id IS NULL
+            LIMIT %s
+        """, (batch_size,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for row in rows:
+            content_id = store_document_content(cursor, row['extracted_text'] or '')
+            cursor.execute(
+                "UPDATE user_documents SET content_id = %s WHERE id = %s",
+                (content_id, row['id'])
+            )
+        conn.commit()
+        migrated += len(rows)
+    
+    cursor.execute("ALTER TABLE user_documents DROP COLUMN extracted_text")
+    print(f"Migrated {migrated} documents to content-addressed storage")
+
+
+def migrate_document_compression(conn, cursor, batch_size=100):
+    """
+    Compress document_contents rows written as plain LONGTEXT by older
+    versions of the app into compressed_text, then drop the text column.
+    
+    Rows are migrated in batches with a commit after each batch, so an
+    interrupted migration simply resumes on the next start.
+    """
+    if not column_exists(cursor, 'document_contents', 'extracted_text'):
+        return
+    
+    ensure_column(cursor, 'document_contents', 'compressed_text', 'LONGBLOB')
+    ensure_column(cursor, 'document_contents', 'text_length', 'INT')
+    
+    migrated = 0
+    while True:
+        cursor.execute("""
+            SELECT id, extracted_text FROM document_contents
+            WHERE compressed_text IS NULL
+            LIMIT %s
+        """, (batch_size,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for row in rows:
+            text = row['extracted_text'] or ''
+            cursor.execute(
+                "UPDATE document_contents SET compressed_text = %s, text_length = %s WHERE id = %s",
+                (compress_document_text(text), len(text), row['id'])
+            )
+        conn.commit()
+        migrated += len(rows)
+    
+    cursor.execute("""
+        ALTER TABLE document_contents
+        DROP COLUMN extracted_text,
+        MODIFY compressed_text LONGBLOB NOT NULL,
+        MODIFY text_length INT NOT NULL
+    """)
+    print(f"Compressed {migrated} stored documents")
+
+
 def init_database():
     """
     Initialize the database and create necessary tables if they don't exist.
@@ -187,7 +554,7 @@ def init_database():
       * created_at: Registration timestamp
     """
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         # Create users table with name field and increased password length for bcrypt hash
@@ -263,20 +630,92 @@ def init_database():
             )
         """)
         
-        # Create user_documents table to store uploaded documents and extracted text for AI chatbot
+        # Create document_contents table: extracted text stored once per unique
+        # content (SHA-256 of the cleaned text), shared by all uploads of it.
+        # Text is stored zlib-compressed UTF-8 (see compress_document_text)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS document_contents (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                content_hash CHAR(64) NOT NULL,
+                compressed_text LONGBLOB NOT NULL,
+                text_length INT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE KEY unique_content_hash (content_hash)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+        migrate_document_compression(conn, cursor)
+        
+        # Create document_chunks and document_indexes tables: each stored text
+        # split into compressed chunks plus a serialized BM25 index over them,
+        # used to send only relevant chunks to the AI (see document_index.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS document_chunks (
+                content_id INT NOT NULL,
+                chunk_index INT NOT NULL,
+                compressed_text BLOB NOT NULL,
+                PRIMARY KEY (content_id, chunk_index),
+                FOREIGN KEY (content_id) REFERENCES document_contents(id) ON DELETE CASCADE
+            ) ENGINE=InnoDB
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS document_indexes (
+                content_id INT PRIMARY KEY,
+                chunk_count INT NOT NULL,
+                index_data LONGBLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (content_id) REFERENCES document_contents(id) ON DELETE CASCADE
+            ) ENGINE=InnoDB
+        """)
+        
+        # Create user_documents table: one row per upload, referencing its text
+        # in document_contents (file_hash = SHA-256 of the raw uploaded bytes)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS user_documents (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 user_id INT NOT NULL,
                 filename VARCHAR(255) NOT NULL,
                 file_type ENUM('PDF', 'TEXT') NOT NULL,
-                extracted_text LONGTEXT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL,
+                content_id INT,
+                file_hash CHAR(64),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                INDEX idx_user_id (user_id)
+                CONSTRAINT fk_user_documents_content FOREIGN KEY (content_id)
+                    REFERENCES document_contents(id) ON DELETE RESTRICT,
+                INDEX idx_user_created (user_id, created_at),
+                INDEX idx_content_id (content_id),
+                INDEX idx_file_hash (file_hash)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
         """)
         
+        # Migrate user_documents from inline extracted_text to document_contents
+        ensure_column(cursor, 'user_documents', 'content_id', 'INT')
+        ensure_column(cursor, 'user_documents', 'file_hash', 'CHAR(64)')
+        ensure_index(cursor, 'user_documents', 'idx_content_id', '(content_id)')
+        ensure_index(cursor, 'user_documents', 'idx_file_hash', '(file_hash)')
+        # Latest-document lookups for chat context and the document list
+        ensure_index(cursor, 'user_documents', 'idx_user_created', '(user_id, created_at)')
+        migrate_document_contents(conn, cursor)
+        
+        # Shared text can't be deleted while an upload references it, even by
+        # a concurrent transaction that has not committed yet (see
+        # delete_orphan_content). References to missing rows are cleared first.
+        cursor.execute("""
+            UPDATE user_documents d
+            LEFT JOIN document_contents dc ON dc.id = d.content_id
+            SET d.content_id = NULL
+            WHERE d.content_id IS NOT NULL AND dc.id IS NULL
+        """)
+        ensure_foreign_key(cursor, 'user_documents', 'fk_user_documents_content', """
+            FOREIGN KEY (content_id) REFERENCES document_contents(id) ON DELETE RESTRICT
+        """)
+        
+        # Remove text no longer referenced by any upload (e.g. deleted users)
+        cursor.execute("""
+            DELETE dc FROM document_contents dc
+            LEFT JOIN user_documents d ON d.content_id = dc.id
+            WHERE d.id IS NULL
+        """)
+        
         # Create chat_conversations table for AI Chatbot
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS chat_conversations (
@@ -310,7 +749,77 @@ def init_database():
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
         """)
         
+        # Create document_jobs table for background document ingestion
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS document_jobs (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT NOT NULL,
+                filename VARCHAR(255) NOT NULL,
+                file_type ENUM('PDF', 'TEXT') NOT NULL,
+                status ENUM('queued', 'processing', 'done', 'failed') NOT NULL DEFAULT 'queued',
+                pages_done INT NOT NULL DEFAULT 0,
+                pages_total INT,
+                document_id INT,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+                FOREIGN KEY (document_id) REFERENCES user_documents(id) ON DELETE SET NULL,
+                INDEX idx_user_id (user_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+        
+        # Jobs left unfinished by a previous run can never complete
+        cursor.execute("""
+            UPDATE document_jobs
+            SET status = 'failed', error = 'Interrupted by server restart. Please upload again.'
+            WHERE status IN ('queued', 'processing')
+        """)
+        
+        # Covering indexes for keyset-paginated history (user_id, study_date, id)
+        ensure_index(cursor, 'study_patterns', 'idx_history_keyset', """
+            (user_id, study_date, id, study_hours, sleep_hours, break_time,
+             screen_time, mood_level, created_at)
+        """)
+        ensure_index(cursor, 'burnout_predictions', 'idx_history_keyset', """
+            (user_id, study_date, id, study_hours, sleep_hours, break_time,
+             screen_time, mood_score, predicted_risk, confidence, created_at)
+        """)
+        
+        # Rolling 7/14/30-day aggregates per user and day, maintained by the
+        # study pattern routes (see refresh_study_aggregates). Means are over
+        # the days in the window that have an entry.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS study_pattern_aggregates (
+                user_id INT NOT NULL,
+                window_days TINYINT NOT NULL,
+                agg_date DATE NOT NULL,
+                entries TINYINT NOT NULL,
+                study_hours_sum DECIMAL(6,2) NOT NULL,
+                sleep_hours_sum DECIMAL(6,2) NOT NULL,
+                break_time_sum DECIMAL(6,2) NOT NULL,
+                screen_time_sum DECIMAL(6,2) NOT NULL,
+                productivity_sum DECIMAL(6,1) NOT NULL,
+                study_hours_avg DECIMAL(4,2) NOT NULL,
+                sleep_hours_avg DECIMAL(4,2) NOT NULL,
+                break_time_avg DECIMAL(4,2) NOT NULL,
+                screen_time_avg DECIMAL(4,2) NOT NULL,
+                productivity_avg DECIMAL(4,1) NOT NULL,
+                PRIMARY KEY (user_id, window_days, agg_date),
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+        """)
+        
         conn.commit()
+        
+        # Backfill aggregates the first time the table is created on an existing database
+        cursor.execute("SELECT 1 FROM study_pattern_aggregates LIMIT 1")
+        if not cursor.fetchone():
+            cursor.execute("SELECT 1 FROM study_patterns LIMIT 1")
+            if cursor.fetchone():
+                result = rebuild_study_aggregates(conn)
+                print(f"Backfilled {result['rows']} study aggregate rows for {result['users']} user(s).")
+        
         cursor.close()
         print("Database initialized successfully!")
         
@@ -322,6 +831,140 @@ def init_database():
 # AUTHENTICATION HELPER FUNCTIONS
 # ============================================================================
 
+# bcrypt cost factor for new hashes; stored hashes with a different cost
+# are replaced at the user's next successful login
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+# Threads computing bcrypt hashes (one hash at 12 rounds is ~250 ms of CPU)
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+# Hash requests allowed to wait for a free worker; beyond that requests are rejected
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', 32))
+# Seconds a request waits for its hash before giving up
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when the password hashing queue is full or a hash took too long."""
+
+
+class PasswordHasher:
+    """
+    Dedicated, bounded worker pool for bcrypt.
+    
+    HOW IT WORKS:
+    1. bcrypt runs on `workers` threads of its own, so a login storm uses at
+       most that many cores and never occupies every web thread
+    2. At most `queue_limit` further hashes may wait for a worker; beyond
+       that, submit() is refused immediately (no unbounded queue)
+    3. Callers wait at most `timeout` seconds for their result
+    4. Queue wait and hashing time are recorded for /api/metrics
+    """
+    
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, queue_limit=PASSWORD_HASH_QUEUE_LIMIT,
+                 timeout=PASSWORD_HASH_TIMEOUT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # One slot per running or waiting hash
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self._stats = {
+            'completed': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'rehashed': 0,
+            'in_flight': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'total_hash_ms': 0.0,
+            'max_hash_ms': 0.0
+        }
+    
+    def submit(self, func, *args):
+        """
+        Queue func(*args) on a hashing thread.
+        
+        Returns:
+            Future, or None if workers and queue are all taken
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            return None
+        queued_at = time.perf_counter()
+        
+        def task():
+            started_at = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                finished_at = time.perf_counter()
+                self._slots.release()
+                self._record((started_at - queued_at) * 1000, (finished_at - started_at) * 1000)
+        
+        with self._lock:
+            self._stats['in_flight'] += 1
+        return self._executor.submit(task)
+    
+    def run(self, func, *args):
+        """
+        Run func(*args) on a hashing thread and wait for the result.
+        
+        Raises:
+            PasswordHasherBusyError: If the queue is full or the result takes
+                longer than `timeout` seconds
+        """
+        future = self.submit(func, *args)
+        if future is None:
+            raise PasswordHasherBusyError("Too many password checks in progress")
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # The hash still finishes in the background and then frees its slot
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PasswordHasherBusyError(f"Password check took longer than {self.timeout} seconds")
+    
+    def _record(self, wait_ms, hash_ms):
+        with self._lock:
+            self._stats['completed'] += 1
+            self._stats['in_flight'] -= 1
+            self._stats['total_wait_ms'] += wait_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+            self._stats['total_hash_ms'] += hash_ms
+            self._stats['max_hash_ms'] = max(self._stats['max_hash_ms'], hash_ms)
+    
+    def count_rehash(self):
+        with self._lock:
+            self._stats['rehashed'] += 1
+    
+    def stats(self):
+        """Return pool limits, counters and queue wait / hashing time."""
+        with self._lock:
+            stats = dict(self._stats)
+        completed = stats['completed']
+        stats['workers'] = self.workers
+        stats['queue_limit'] = self.queue_limit
+        stats['rounds'] = BCRYPT_ROUNDS
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / completed, 3) if completed else 0.0
+        stats['avg_hash_ms'] = round(stats['total_hash_ms'] / completed, 3) if completed else 0.0
+        for key in ('total_wait_ms', 'max_wait_ms', 'total_hash_ms', 'max_hash_ms'):
+            stats[key] = round(stats[key], 3)
+        return stats
+
+
+password_hasher = PasswordHasher()
+
+
+def _bcrypt_hash(password):
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def _bcrypt_check(password, hashed_password):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
 def hash_password(password):
     """
     Hash a password using bcrypt algorithm.
@@ -337,17 +980,20 @@ def hash_password(password):
     - bcrypt is computationally expensive (slows brute force attacks)
     - Each password gets unique salt (even same passwords have different hashes)
     
+    The hash is computed on the password_hasher pool, not the request thread.
+    
     Args:
         password (str): Plain text password
         
     Returns:
         str: Hashed password (bcrypt hash)
+    
+    Raises:
+        PasswordHasherBusyError: If the hashing pool is saturated
     """
-    # Generate salt and hash password
     # bcrypt automatically generates a random salt
-    salt = bcrypt.gensalt(rounds=12)  # 12 rounds = good balance of security and performance
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+    # BCRYPT_ROUNDS (default 12) = good balance of security and performance
+    return password_hasher.run(_bcrypt_hash, password)
 
 
 def verify_password(password, hashed_password):
@@ -360,14 +1006,58 @@ def verify_password(password, hashed_password):
     3. Compares the two hashes
     4. Returns True if they match, False otherwise
     
+    The check runs on the password_hasher pool, not the request thread.
+    
     Args:
         password (str): Plain text password to verify
         hashed_password (str): Stored bcrypt hash
         
     Returns:
         bool: True if password matches, False otherwise
+    
+    Raises:
+        PasswordHasherBusyError: If the hashing pool is saturated
     """
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return password_hasher.run(_bcrypt_check, password, hashed_password)
+
+
+def password_needs_rehash(hashed_password):
+    """Return True if a stored bcrypt hash was made with a cost other than BCRYPT_ROUNDS."""
+    try:
+        # Format: $2b$<cost>$<22 character salt><31 character hash>
+        return int(hashed_password.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+def rehash_password_in_background(user_id, password, old_hash):
+    """
+    Replace a user's password hash with one at the current BCRYPT_ROUNDS.
+    
+    Runs on the password_hasher pool after a successful login, so the login
+    response does not wait for it. Skipped if the pool is busy (it is tried
+    again at the next login). The UPDATE only applies if the stored hash is
+    still old_hash, so a password changed in the meantime is never
+    overwritten.
+    """
+    def rehash():
+        new_hash = _bcrypt_hash(password)
+        try:
+            with db_pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE users SET password = %s WHERE id = %s AND password = %s",
+                    (new_hash, user_id, old_hash)
+                )
+                updated = cursor.rowcount
+                conn.commit()
+                cursor.close()
+            if updated:
+                password_hasher.count_rehash()
+        except Exception as e:
+            print(f"Password rehash failed for user {user_id}: {str(e)}")
+    
+    password_hasher.submit(rehash)
 
 
 def validate_registration_data(name, username, email, password):
@@ -516,7 +1206,7 @@ def login():
             return jsonify({'success': False, 'message': 'Username/Email and password are required'})
         
         try:
-            conn = mysql.connect
+            conn = get_db()
             cursor = conn.cursor()
             
             # Query user by username OR email (allows login with either)
@@ -533,6 +1223,10 @@ def login():
                 # Verify password using bcrypt
                 # This compares the provided password with the stored hash
                 if verify_password(password, user['password']):
+                    # Upgrade hashes made with an older cost factor
+                    if password_needs_rehash(user['password']):
+                        rehash_password_in_background(user['id'], password, user['password'])
+                    
                     # Password is correct - create session
                     session['user_id'] = user['id']
                     session['username'] = user['username']
@@ -555,7 +1249,10 @@ def login():
                 # User not found
                 # Generic message (don't reveal if user exists)
                 return jsonify({'success': False, 'message': 'Invalid username/email or password'})
-                
+        
+        except PasswordHasherBusyError as e:
+            print(f"Login rejected: {str(e)}")
+            return jsonify({'success': False, 'message': 'The server is busy. Please try again in a moment.'}), 503
         except Exception as e:
             print(f"Login error: {str(e)}")  # Log error for debugging
             return jsonify({'success': False, 'message': 'An error occurred. Please try again.'})
@@ -618,7 +1315,7 @@ def register():
             return jsonify({'success': False, 'message': 'Passwords do not match'})
         
         try:
-            conn = mysql.connect
+            conn = get_db()
             cursor = conn.cursor()
             
             # Check if username or email already exists
@@ -655,6 +1352,9 @@ def register():
                 'redirect': url_for('login')
             })
             
+        except PasswordHasherBusyError as e:
+            print(f"Registration rejected: {str(e)}")
+            return jsonify({'success': False, 'message': 'The server is busy. Please try again in a moment.'}), 503
         except Exception as e:
             print(f"Registration error: {str(e)}")  # Log error for debugging
             return jsonify({'success': False, 'message': 'An error occurred. Please try again.'})
@@ -667,6 +1367,30 @@ def register():
 # PRODUCTIVITY SCORE CALCULATION MODULE
 # ============================================================================
 
+# CONFIGURABLE WEIGHTS - Easy to modify for different scoring systems
+# (shared by the scalar and vectorized score functions)
+WEIGHT_STUDY = 30    # Weight for study hours (out of 100)
+WEIGHT_SLEEP = 30     # Weight for sleep hours (out of 100)
+WEIGHT_BREAK = 20     # Weight for break time (out of 100)
+WEIGHT_SCREEN = 20    # Weight for screen time (out of 100)
+
+# Optimal ranges for each component
+STUDY_OPTIMAL_MIN = 4.0   # Minimum good study hours
+STUDY_OPTIMAL_MAX = 8.0   # Maximum good study hours
+STUDY_PEAK = 6.0          # Peak study hours (best score)
+
+SLEEP_OPTIMAL_MIN = 7.0   # Minimum good sleep hours
+SLEEP_OPTIMAL_MAX = 9.0   # Maximum good sleep hours
+SLEEP_PEAK = 8.0          # Peak sleep hours (best score)
+
+BREAK_OPTIMAL_MIN = 1.0   # Minimum good break time
+BREAK_OPTIMAL_MAX = 3.0   # Maximum good break time
+BREAK_PEAK = 2.0          # Peak break time (best score)
+
+SCREEN_OPTIMAL_MAX = 6.0  # Maximum good screen time
+SCREEN_PENALTY_START = 8.0  # Start penalizing after this
+
+
 def calculate_productivity_score(study_hours, sleep_hours, break_time, screen_time):
     """
     Calculate Productivity Score out of 100 based on study patterns.
@@ -713,30 +1437,6 @@ def calculate_productivity_score(study_hours, sleep_hours, break_time, screen_ti
         dict: Contains total_score (0-100) and component scores
     """
     
-    # ========================================================================
-    # CONFIGURABLE WEIGHTS - Easy to modify for different scoring systems
-    # ========================================================================
-    WEIGHT_STUDY = 30    # Weight for study hours (out of 100)
-    WEIGHT_SLEEP = 30     # Weight for sleep hours (out of 100)
-    WEIGHT_BREAK = 20     # Weight for break time (out of 100)
-    WEIGHT_SCREEN = 20    # Weight for screen time (out of 100)
-    
-    # Optimal ranges for each component
-    STUDY_OPTIMAL_MIN = 4.0   # Minimum good study hours
-    STUDY_OPTIMAL_MAX = 8.0   # Maximum good study hours
-    STUDY_PEAK = 6.0          # Peak study hours (best score)
-    
-    SLEEP_OPTIMAL_MIN = 7.0   # Minimum good sleep hours
-    SLEEP_OPTIMAL_MAX = 9.0   # Maximum good sleep hours
-    SLEEP_PEAK = 8.0          # Peak sleep hours (best score)
-    
-    BREAK_OPTIMAL_MIN = 1.0   # Minimum good break time
-    BREAK_OPTIMAL_MAX = 3.0   # Maximum good break time
-    BREAK_PEAK = 2.0          # Peak break time (best score)
-    
-    SCREEN_OPTIMAL_MAX = 6.0  # Maximum good screen time
-    SCREEN_PENALTY_START = 8.0  # Start penalizing after this
-    
     # ========================================================================
     # 1. STUDY HOURS SCORE (0 to WEIGHT_STUDY points)
     # ========================================================================
@@ -844,6 +1544,129 @@ def calculate_productivity_score(study_hours, sleep_hours, break_time, screen_ti
     }
 
 
+def _round_half_even_like_python(values, ndigits=1):
+    """
+    Round a float array exactly like Python's built-in round(x, ndigits).
+    
+    np.round scales by 10**ndigits and rounds, which can disagree with
+    round() for values whose decimal representation sits on a tie (e.g.
+    0.15 is really 0.1499999... so round() gives 0.1 but np.round gives 0.2).
+    The fast NumPy result is used everywhere except for the few elements
+    near a tie, which are re-rounded with Python's round() to stay
+    bit-for-bit identical to calculate_productivity_score.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, ndigits)
+    
+    scaled = values * (10 ** ndigits)
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for idx in np.flatnonzero(near_tie):
+        rounded.flat[idx] = round(float(values.flat[idx]), ndigits)
+    return rounded
+
+
+def calculate_productivity_scores_vectorized(study_hours, sleep_hours, break_time, screen_time):
+    """
+    Vectorized productivity score for arrays of study patterns.
+    
+    Same formula as calculate_productivity_score, but every component is
+    computed for all rows at once with np.select (one condition per branch
+    of the scalar if/elif chain) and np.clip. Results are bit-for-bit equal
+    to calling calculate_productivity_score on each row.
+    
+    Args:
+        study_hours, sleep_hours, break_time, screen_time (array-like): One value per row
+    
+    Returns:
+        dict: NumPy arrays total_score, study_score, sleep_score, break_score, screen_score
+    """
+    study_hours = np.asarray(study_hours, dtype=float)
+    sleep_hours = np.asarray(sleep_hours, dtype=float)
+    break_time = np.asarray(break_time, dtype=float)
+    screen_time = np.asarray(screen_time, dtype=float)
+    
+    # 1. STUDY HOURS SCORE
+    study_excess = study_hours - STUDY_OPTIMAL_MAX
+    study_penalty = np.minimum(study_excess * 5, WEIGHT_STUDY * 0.5)
+    study_score = np.select(
+        [
+            study_hours < STUDY_OPTIMAL_MIN,
+            study_hours <= STUDY_PEAK,
+            study_hours <= STUDY_OPTIMAL_MAX
+        ],
+        [
+            (study_hours / STUDY_OPTIMAL_MIN) * WEIGHT_STUDY * 0.5,
+            WEIGHT_STUDY * (study_hours / STUDY_PEAK),
+            WEIGHT_STUDY * (1 - (study_hours - STUDY_PEAK) / (STUDY_OPTIMAL_MAX - STUDY_PEAK))
+        ],
+        default=np.maximum(WEIGHT_STUDY * 0.5 - study_penalty, 0)
+    )
+    study_score = np.clip(study_score, 0, WEIGHT_STUDY)
+    
+    # 2. SLEEP HOURS SCORE
+    sleep_excess = sleep_hours - SLEEP_OPTIMAL_MAX
+    sleep_penalty = np.minimum(sleep_excess * 3, WEIGHT_SLEEP * 0.4)
+    sleep_score = np.select(
+        [
+            sleep_hours < SLEEP_OPTIMAL_MIN,
+            sleep_hours <= SLEEP_PEAK,
+            sleep_hours <= SLEEP_OPTIMAL_MAX
+        ],
+        [
+            (sleep_hours / SLEEP_OPTIMAL_MIN) * WEIGHT_SLEEP * 0.7,
+            WEIGHT_SLEEP * (0.7 + 0.3 * (sleep_hours / SLEEP_PEAK)),
+            WEIGHT_SLEEP * (1 - 0.3 * (sleep_hours - SLEEP_PEAK) / (SLEEP_OPTIMAL_MAX - SLEEP_PEAK))
+        ],
+        default=np.maximum(WEIGHT_SLEEP * 0.6 - sleep_penalty, 0)
+    )
+    sleep_score = np.clip(sleep_score, 0, WEIGHT_SLEEP)
+    
+    # 3. BREAK TIME SCORE
+    break_excess = break_time - BREAK_OPTIMAL_MAX
+    break_penalty = np.minimum(break_excess * 4, WEIGHT_BREAK * 0.5)
+    break_score = np.select(
+        [
+            break_time < BREAK_OPTIMAL_MIN,
+            break_time <= BREAK_PEAK,
+            break_time <= BREAK_OPTIMAL_MAX
+        ],
+        [
+            (break_time / BREAK_OPTIMAL_MIN) * WEIGHT_BREAK * 0.6,
+            WEIGHT_BREAK * (0.6 + 0.4 * (break_time / BREAK_PEAK)),
+            WEIGHT_BREAK * (1 - 0.4 * (break_time - BREAK_PEAK) / (BREAK_OPTIMAL_MAX - BREAK_PEAK))
+        ],
+        default=np.maximum(WEIGHT_BREAK * 0.5 - break_penalty, 0)
+    )
+    break_score = np.clip(break_score, 0, WEIGHT_BREAK)
+    
+    # 4. SCREEN TIME SCORE
+    screen_excess = screen_time - SCREEN_OPTIMAL_MAX
+    screen_heavy_excess = screen_time - SCREEN_PENALTY_START
+    screen_score = np.select(
+        [
+            screen_time <= SCREEN_OPTIMAL_MAX,
+            screen_time <= SCREEN_PENALTY_START
+        ],
+        [
+            WEIGHT_SCREEN * (1 - (screen_time / SCREEN_OPTIMAL_MAX) * 0.2),
+            WEIGHT_SCREEN * 0.8 - (screen_excess / (SCREEN_PENALTY_START - SCREEN_OPTIMAL_MAX)) * WEIGHT_SCREEN * 0.5
+        ],
+        default=np.maximum(WEIGHT_SCREEN * 0.3 - np.minimum(screen_heavy_excess * 2, WEIGHT_SCREEN * 0.7), 0)
+    )
+    screen_score = np.clip(screen_score, 0, WEIGHT_SCREEN)
+    
+    # TOTAL (summed before rounding, in the same order as the scalar version)
+    total_score = study_score + sleep_score + break_score + screen_score
+    
+    return {
+        'total_score': _round_half_even_like_python(total_score),
+        'study_score': _round_half_even_like_python(study_score),
+        'sleep_score': _round_half_even_like_python(sleep_score),
+        'break_score': _round_half_even_like_python(break_score),
+        'screen_score': _round_half_even_like_python(screen_score)
+    }
+
+
 # ============================================================================
 # SUGGESTIONS AND INSIGHTS MODULE (Rule-Based Logic)
 # ============================================================================
@@ -1104,25 +1927,14 @@ def get_user_study_suggestions(user_id):
         list: List of suggestion dictionaries, or empty list if no data
     """
     try:
-        conn = mysql.connect
-        cursor = conn.cursor()
-        
-        # Get the most recent study pattern
-        cursor.execute("""
-            SELECT study_hours, sleep_hours, break_time, screen_time, mood_level
-            FROM study_patterns
-            WHERE user_id = %s
-            ORDER BY study_date DESC
-            LIMIT 1
-        """, (user_id,))
-        
-        pattern = cursor.fetchone()
-        cursor.close()
+        # Get the most recent study pattern (shared, memoized snapshot query)
+        pattern = get_latest_user_snapshot(user_id)['pattern']
         
         if not pattern:
             return []
         
         # Get productivity score and burnout prediction for context
+        # (both reuse the same snapshot - no extra queries)
         productivity_score = get_user_productivity_score(user_id)
         burnout_prediction = get_user_burnout_prediction(user_id)
         
@@ -1148,20 +1960,130 @@ def get_user_study_suggestions(user_id):
 # BURNOUT RISK PREDICTION MODULE (Machine Learning)
 # ============================================================================
 
-def load_burnout_model(model_path='burnout_model.pkl'):
+BURNOUT_MODEL_PATH = os.getenv('BURNOUT_MODEL_PATH', 'burnout_model.pkl')
+
+
+class BurnoutModelRegistry:
+    """
+    Process-wide cache for the trained burnout model.
+
+    HOW IT WORKS:
+    1. The model is unpickled once per worker and kept in memory
+    2. Each lookup only does a cheap os.stat() on the model file
+    3. If the file's mtime changed, the file is hashed (SHA-256)
+    4. Only if the content hash differs is the model reloaded
+    5. The new model is swapped in atomically under a lock, so concurrent
+       requests always see either the old or the new model, never a partial one
+
+    This means re-training the model (train_burnout_model.py) is picked up
+    automatically without restarting the server.
+    """
+
+    def __init__(self, model_path=BURNOUT_MODEL_PATH):
+        self.model_path = model_path
+        self._lock = threading.Lock()
+        self._model = None
+        self._mtime = None
+        self._version = None  # SHA-256 of the model file contents
+        self._loaded_at = None
+        self._load_time_ms = None
+        self._load_count = 0
+        self._last_error = None
+
+    def _file_hash(self):
+        """Return the SHA-256 hex digest of the model file."""
+        digest = hashlib.sha256()
+        with open(self.model_path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get_model(self):
+        """
+        Return the cached model, reloading it first if the file has changed.
+
+        Returns:
+            model: Trained classifier, or None if the model file is missing or invalid
+        """
+        try:
+            mtime = os.stat(self.model_path).st_mtime
+        except OSError:
+            if self._model is None:
+                print(f"Warning: Model file '{self.model_path}' not found. Please train the model first.")
+            # Keep serving the last good model if the file was removed
+            return self._model
+
+        # Fast path: file untouched since last load
+        if mtime == self._mtime:
+            return self._model
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if mtime == self._mtime:
+                return self._model
+
+            try:
+                version = self._file_hash()
+                if version == self._version:
+                    # File was touched but contents are identical - no reload needed
+                    self._mtime = mtime
+                    return self._model
+
+                start = time.perf_counter()
+                model = joblib.load(self.model_path)
+                load_time_ms = (time.perf_counter() - start) * 1000
+
+                # Atomic swap
+                self._model = model
+                self._mtime = mtime
+                self._version = version
+                self._loaded_at = datetime.now()
+                self._load_time_ms = round(load_time_ms, 2)
+                self._load_count += 1
+                self._last_error = None
+                print(f"Burnout model loaded (version {version[:12]}, {self._load_time_ms} ms)")
+            except Exception as e:
+                # Keep the previous model if the new file can't be loaded
+                self._last_error = str(e)
+                print(f"Error loading model: {str(e)}")
+
+        return self._model
+
+    def status(self):
+        """Return model version and load statistics for the status API."""
+        return {
+            'model_path': self.model_path,
+            'loaded': self._model is not None,
+            'version': self._version,
+            'loaded_at': self._loaded_at.isoformat() if self._loaded_at else None,
+            'load_time_ms': self._load_time_ms,
+            'load_count': self._load_count,
+            'last_error': self._last_error
+        }
+
+
+burnout_model_registry = BurnoutModelRegistry()
+
+
+def load_burnout_model(model_path=BURNOUT_MODEL_PATH):
     """
     Load the trained burnout risk prediction model.
-    
+
+    Uses the process-wide BurnoutModelRegistry, so the model is only read
+    from disk when the file changes.
+
     Returns:
         model: Trained Decision Tree classifier, or None if model not found
     """
+    if model_path == burnout_model_registry.model_path:
+        return burnout_model_registry.get_model()
+
+    # Non-default path: load directly without caching
     try:
         if os.path.exists(model_path):
-            model = joblib.load(model_path)
-            return model
-        else:
-            print(f"Warning: Model file '{model_path}' not found. Please train the model first.")
-            return None
+            return joblib.load(model_path)
+        print(f"Warning: Model file '{model_path}' not found. Please train the model first.")
+        return None
     except Exception as e:
         print(f"Error loading model: {str(e)}")
         return None
@@ -1240,28 +2162,117 @@ def predict_burnout_risk(study_hours, sleep_hours, break_time, screen_time, mood
     # ========================================================================
     # STEP 1: SIMPLE RULE-BASED LOGIC (Checked BEFORE ML)
     # ========================================================================
-    # CRITICAL: These 3 simple rules are checked FIRST, before ML.
-    # If any rule matches, we use that prediction. ML will NOT override HIGH risk predictions.
+    rule_index = _match_burnout_rule(study_hours, sleep_hours, screen_time)
     
-    predicted_risk = None
-    rule_applied = None
-    explanation = ""
-    use_ml = False  # Flag to determine if we should use ML
-    is_high_risk_rule = False  # Flag to prevent ML from overriding HIGH risk
+    # ========================================================================
+    # STEP 2: ML SUPPORT (For Borderline Cases or Validation)
+    # ========================================================================
+    model = load_burnout_model()
+    probabilities = None
+    classes = None
+    
+    if model is not None:
+        try:
+            # Prepare features for ML
+            features = np.array([[study_hours, sleep_hours, break_time, screen_time, mood_score]])
+            
+            # Single predict_proba call; the predicted class is its argmax
+            probabilities = model.predict_proba(features)[0]
+            classes = model.classes_
+            model_status = 'available'
+        except Exception as e:
+            print(f"ML prediction error: {str(e)}")
+            model_status = 'error'
+    else:
+        model_status = 'not_available'
+    
+    return _finalize_burnout_prediction(
+        rule_index, study_hours, sleep_hours, break_time, screen_time,
+        mood_level, mood_score, model_status, probabilities, classes
+    )
+
+
+# Rule indices shared by the single-row and batch prediction paths
+BURNOUT_RULE_ML = 4  # No rule matched - borderline case handled by ML
+
+
+def _match_burnout_rule(study_hours, sleep_hours, screen_time):
+    """
+    Return the index of the first burnout rule that matches (0-3), or BURNOUT_RULE_ML.
     
+    CRITICAL: These rules are checked FIRST, before ML, in this exact order.
+    """
     # Rule 1: Sleep < 4 hours AND Screen > 8 hours → HIGH RISK
     if sleep_hours < 4 and screen_time > 8:
-        predicted_risk = 'High'
-        is_high_risk_rule = True
-        rule_applied = 'Rule 1: Sleep < 4h AND Screen > 8h'
-        explanation = (
-            f"High risk detected: You're getting only {sleep_hours:.1f} hours of sleep and spending "
-            f"{screen_time:.1f} hours on screens. This combination of severe sleep deprivation and "
-            f"excessive screen exposure significantly increases burnout risk."
-        )
-    
+        return 0
     # Rule 2: Sleep < 4 hours → HIGH RISK
     elif sleep_hours < 4:
+        return 1
+    # Rule 3: Study > 9 hours AND Sleep < 5 hours → HIGH RISK
+    elif study_hours > 9 and sleep_hours < 5:
+        return 2
+    # Rule 4: Sleep ≥ 7h AND Study 4-7h → LOW RISK (Healthy pattern)
+    elif sleep_hours >= 7 and 4 <= study_hours <= 7:
+        return 3
+    # Default: Use ML for normal/borderline cases
+    return BURNOUT_RULE_ML
+
+
+def _match_burnout_rules_vectorized(study_hours, sleep_hours, screen_time):
+    """
+    Vectorized version of _match_burnout_rule over NumPy arrays.
+    
+    np.select picks the FIRST matching condition per row, which preserves
+    the if/elif priority order of the scalar rules.
+    
+    Returns:
+        np.ndarray: Rule index per row (0-3, or BURNOUT_RULE_ML)
+    """
+    conditions = [
+        (sleep_hours < 4) & (screen_time > 8),
+        sleep_hours < 4,
+        (study_hours > 9) & (sleep_hours < 5),
+        (sleep_hours >= 7) & (study_hours >= 4) & (study_hours <= 7)
+    ]
+    return np.select(conditions, [0, 1, 2, 3], default=BURNOUT_RULE_ML)
+
+
+def _finalize_burnout_prediction(rule_index, study_hours, sleep_hours, break_time, screen_time,
+                                 mood_level, mood_score, model_status, probabilities=None, classes=None):
+    """
+    Combine the matched rule with the ML probabilities into the final prediction dict.
+    
+    Used by both predict_burnout_risk and predict_burnout_risk_batch so that
+    single-row and batch results are identical.
+    
+    Args:
+        rule_index (int): Result of _match_burnout_rule
+        study_hours, sleep_hours, break_time, screen_time (float): Features
+        mood_level (str): 'Low', 'Medium', or 'High'
+        mood_score (int): Numeric mood score
+        model_status (str): 'available', 'error' or 'not_available'
+        probabilities (array, optional): predict_proba output for this row
+        classes (array, optional): model.classes_
+    
+    Returns:
+        dict: Contains predicted_risk, prediction_strength, explanation, and model_status
+    """
+    predicted_risk = None
+    rule_applied = None
+    explanation = ""
+    use_ml = False  # Flag to determine if we should use ML
+    is_high_risk_rule = False  # Flag to prevent ML from overriding HIGH risk
+    
+    if rule_index == 0:
+        predicted_risk = 'High'
+        is_high_risk_rule = True
+        rule_applied = 'Rule 1: Sleep < 4h AND Screen > 8h'
+        explanation = (
+            f"High risk detected: You're getting only {sleep_hours:.1f} hours of sleep and spending "
+            f"{screen_time:.1f} hours on screens. This combination of severe sleep deprivation and "
+            f"excessive screen exposure significantly increases burnout risk."
+        )
+    elif rule_index == 1:
         predicted_risk = 'High'
         is_high_risk_rule = True
         rule_applied = 'Rule 2: Sleep < 4h'
@@ -1270,9 +2281,7 @@ def predict_burnout_risk(study_hours, sleep_hours, break_time, screen_time, mood
             f"severely insufficient. Sleep deprivation below 4 hours causes severe cognitive impairment "
             f"and significantly increases burnout risk."
         )
-    
-    # Rule 3: Study > 9 hours AND Sleep < 5 hours → HIGH RISK
-    elif study_hours > 9 and sleep_hours < 5:
+    elif rule_index == 2:
         predicted_risk = 'High'
         is_high_risk_rule = True
         rule_applied = 'Rule 3: Study > 9h AND Sleep < 5h'
@@ -1281,9 +2290,7 @@ def predict_burnout_risk(study_hours, sleep_hours, break_time, screen_time, mood
             f"{sleep_hours:.1f} hours of sleep. This pattern shows excessive study without "
             f"adequate rest, which is a classic burnout indicator."
         )
-    
-    # Rule 4: Sleep ≥ 7h AND Study 4-7h → LOW RISK (Healthy pattern)
-    elif sleep_hours >= 7 and 4 <= study_hours <= 7:
+    elif rule_index == 3:
         predicted_risk = 'Low'
         rule_applied = 'Rule 4: Healthy Balance'
         explanation = (
@@ -1292,8 +2299,6 @@ def predict_burnout_risk(study_hours, sleep_hours, break_time, screen_time, mood
             f"showing that 7-9 hours of sleep and 4-7 hours of focused study is optimal for "
             f"academic performance without burnout. Keep maintaining this balanced routine!"
         )
-    
-    # Default: Use ML for normal/borderline cases
     else:
         use_ml = True
         rule_applied = 'ML Analysis (Borderline Case)'
@@ -1303,89 +2308,72 @@ def predict_burnout_risk(study_hours, sleep_hours, break_time, screen_time, mood
             f"patterns. Using machine learning analysis to determine risk level."
         )
     
-    # ========================================================================
-    # STEP 2: ML SUPPORT (For Borderline Cases or Validation)
-    # ========================================================================
-    
-    model = load_burnout_model()
     ml_prediction = None
     ml_probabilities = None
     prediction_strength = 75.0  # Default strength
     
-    if model is not None:
-        try:
-            # Prepare features for ML
-            features = np.array([[study_hours, sleep_hours, break_time, screen_time, mood_score]])
-            
-            # Get ML prediction
-            ml_prediction = model.predict(features)[0]
-            
-            # Get ML probabilities
-            probabilities = model.predict_proba(features)[0]
-            class_indices = {class_name: idx for idx, class_name in enumerate(model.classes_)}
-            
-            ml_probabilities = {
-                'Low': round(probabilities[class_indices.get('Low', 0)] * 100, 2),
-                'Medium': round(probabilities[class_indices.get('Medium', 1)] * 100, 2),
-                'High': round(probabilities[class_indices.get('High', 2)] * 100, 2)
-            }
-            
-            # Calculate ML confidence (but clamp it to avoid 100%)
-            ml_confidence = probabilities[class_indices[ml_prediction]] * 100
-            ml_confidence = min(95.0, max(70.0, ml_confidence))  # Clamp to 70-95%
-            
-            if use_ml:
-                # Use ML prediction for borderline cases
-                predicted_risk = ml_prediction
-                prediction_strength = ml_confidence
-                explanation = (
-                    f"ML Analysis: Your pattern (Sleep: {sleep_hours:.1f}h, Study: {study_hours:.1f}h, "
-                    f"Breaks: {break_time:.1f}h, Screen: {screen_time:.1f}h, Mood: {mood_level}) "
-                    f"indicates {predicted_risk} burnout risk. "
-                    f"Prediction probabilities: Low {ml_probabilities['Low']:.1f}%, "
-                    f"Medium {ml_probabilities['Medium']:.1f}%, High {ml_probabilities['High']:.1f}%."
-                )
-            else:
-                # Rule-based prediction: ML provides validation ONLY
-                # CRITICAL: If HIGH risk rule matched, NEVER override with ML
-                if is_high_risk_rule:
-                    # HIGH risk rule takes absolute priority - ML cannot override
-                    # Adjust strength based on ML agreement, but keep HIGH risk
-                    if ml_prediction == 'High':
-                        # ML agrees with HIGH → Higher strength (88-95%)
-                        prediction_strength = 88.0 + (ml_confidence / 100) * 7  # 88-95%
-                        prediction_strength = min(95.0, max(88.0, prediction_strength))
-                    else:
-                        # ML disagrees but rule is HIGH → Still HIGH, moderate strength (80-88%)
-                        prediction_strength = 80.0 + (ml_confidence / 100) * 8  # 80-88%
-                        prediction_strength = min(88.0, max(80.0, prediction_strength))
-                    # Keep predicted_risk as 'High' (never change it)
-                elif ml_prediction == predicted_risk:
-                    # ML agrees with rule → Higher strength (85-95%)
-                    prediction_strength = 85.0 + (ml_confidence / 100) * 10  # 85-95%
-                    prediction_strength = min(95.0, max(85.0, prediction_strength))
+    if model_status == 'available':
+        # Predicted class is the argmax of the probabilities (same as model.predict)
+        ml_prediction = classes[int(np.argmax(probabilities))]
+        class_indices = {class_name: idx for idx, class_name in enumerate(classes)}
+        
+        ml_probabilities = {
+            'Low': round(probabilities[class_indices.get('Low', 0)] * 100, 2),
+            'Medium': round(probabilities[class_indices.get('Medium', 1)] * 100, 2),
+            'High': round(probabilities[class_indices.get('High', 2)] * 100, 2)
+        }
+        
+        # Calculate ML confidence (but clamp it to avoid 100%)
+        ml_confidence = probabilities[class_indices[ml_prediction]] * 100
+        ml_confidence = min(95.0, max(70.0, ml_confidence))  # Clamp to 70-95%
+        
+        if use_ml:
+            # Use ML prediction for borderline cases
+            predicted_risk = ml_prediction
+            prediction_strength = ml_confidence
+            explanation = (
+                f"ML Analysis: Your pattern (Sleep: {sleep_hours:.1f}h, Study: {study_hours:.1f}h, "
+                f"Breaks: {break_time:.1f}h, Screen: {screen_time:.1f}h, Mood: {mood_level}) "
+                f"indicates {predicted_risk} burnout risk. "
+                f"Prediction probabilities: Low {ml_probabilities['Low']:.1f}%, "
+                f"Medium {ml_probabilities['Medium']:.1f}%, High {ml_probabilities['High']:.1f}%."
+            )
+        else:
+            # Rule-based prediction: ML provides validation ONLY
+            # CRITICAL: If HIGH risk rule matched, NEVER override with ML
+            if is_high_risk_rule:
+                # HIGH risk rule takes absolute priority - ML cannot override
+                # Adjust strength based on ML agreement, but keep HIGH risk
+                if ml_prediction == 'High':
+                    # ML agrees with HIGH → Higher strength (88-95%)
+                    prediction_strength = 88.0 + (ml_confidence / 100) * 7  # 88-95%
+                    prediction_strength = min(95.0, max(88.0, prediction_strength))
                 else:
-                    # ML disagrees → Still use rule, but lower strength (75-85%)
-                    # Rule-based logic takes priority for extreme cases
-                    prediction_strength = 75.0 + (ml_confidence / 100) * 10  # 75-85%
-                    prediction_strength = min(85.0, max(75.0, prediction_strength))
-            
-            model_status = 'available'
-            
-        except Exception as e:
-            print(f"ML prediction error: {str(e)}")
-            model_status = 'error'
-            if use_ml:
-                # If ML fails and we needed it, default to Medium risk
-                predicted_risk = 'Medium'
-                prediction_strength = 70.0
-                explanation = (
-                    f"Unable to analyze with ML. Defaulting to Medium risk. "
-                    f"Your pattern: Sleep {sleep_hours:.1f}h, Study {study_hours:.1f}h, "
-                    f"Breaks {break_time:.1f}h, Screen {screen_time:.1f}h."
-                )
+                    # ML disagrees but rule is HIGH → Still HIGH, moderate strength (80-88%)
+                    prediction_strength = 80.0 + (ml_confidence / 100) * 8  # 80-88%
+                    prediction_strength = min(88.0, max(80.0, prediction_strength))
+                # Keep predicted_risk as 'High' (never change it)
+            elif ml_prediction == predicted_risk:
+                # ML agrees with rule → Higher strength (85-95%)
+                prediction_strength = 85.0 + (ml_confidence / 100) * 10  # 85-95%
+                prediction_strength = min(95.0, max(85.0, prediction_strength))
+            else:
+                # ML disagrees → Still use rule, but lower strength (75-85%)
+                # Rule-based logic takes priority for extreme cases
+                prediction_strength = 75.0 + (ml_confidence / 100) * 10  # 75-85%
+                prediction_strength = min(85.0, max(75.0, prediction_strength))
+    
+    elif model_status == 'error':
+        if use_ml:
+            # If ML fails and we needed it, default to Medium risk
+            predicted_risk = 'Medium'
+            prediction_strength = 70.0
+            explanation = (
+                f"Unable to analyze with ML. Defaulting to Medium risk. "
+                f"Your pattern: Sleep {sleep_hours:.1f}h, Study {study_hours:.1f}h, "
+                f"Breaks {break_time:.1f}h, Screen {screen_time:.1f}h."
+            )
     else:
-        model_status = 'not_available'
         if use_ml:
             # If ML not available and we needed it, default to Medium risk
             predicted_risk = 'Medium'
@@ -1433,6 +2421,65 @@ def predict_burnout_risk(study_hours, sleep_hours, break_time, screen_time, mood
     }
 
 
+def predict_burnout_risk_batch(rows):
+    """
+    Predict burnout risk for many study-pattern rows in one vectorized pass.
+    
+    HOW IT WORKS:
+    1. All rows are stacked into one (N x 5) NumPy feature matrix
+    2. The four hard rules are evaluated as NumPy masks (np.select)
+    3. The model is called ONCE with predict_proba for the whole matrix;
+       the predicted class is the argmax of each probability row
+    4. Each row is finalized with the same logic as predict_burnout_risk
+    
+    Rule-matched rows still need ML probabilities because the prediction
+    strength of a rule is adjusted by ML agreement, so every row is part of
+    the single predict_proba call. Results are identical to calling
+    predict_burnout_risk once per row.
+    
+    Args:
+        rows (list): Sequence of (study_hours, sleep_hours, break_time, screen_time, mood_level)
+    
+    Returns:
+        list: One prediction dict per input row, in input order
+    """
+    if len(rows) == 0:
+        return []
+    
+    mood_levels = [row[4] for row in rows]
+    mood_scores = np.array([mood_level_to_score(mood) for mood in mood_levels], dtype=float)
+    hours = np.array([row[:4] for row in rows], dtype=float)
+    study_hours, sleep_hours, break_time, screen_time = hours.T
+    
+    rule_indices = _match_burnout_rules_vectorized(study_hours, sleep_hours, screen_time)
+    
+    model = load_burnout_model()
+    probabilities = None
+    classes = None
+    
+    if model is not None:
+        try:
+            features = np.column_stack([hours, mood_scores])
+            probabilities = model.predict_proba(features)
+            classes = model.classes_
+            model_status = 'available'
+        except Exception as e:
+            print(f"ML prediction error: {str(e)}")
+            model_status = 'error'
+    else:
+        model_status = 'not_available'
+    
+    results = []
+    for i, row in enumerate(rows):
+        results.append(_finalize_burnout_prediction(
+            int(rule_indices[i]), row[0], row[1], row[2], row[3],
+            mood_levels[i], mood_level_to_score(mood_levels[i]), model_status,
+            probabilities[i] if probabilities is not None else None, classes
+        ))
+    
+    return results
+
+
 def save_burnout_prediction(user_id, study_date, study_hours, sleep_hours, 
                            break_time, screen_time, mood_score, predicted_risk, prediction_strength):
     """
@@ -1450,7 +2497,7 @@ def save_burnout_prediction(user_id, study_date, study_hours, sleep_hours,
         bool: True if saved successfully, False otherwise
     """
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         # Check if prediction exists for this date
@@ -1501,21 +2548,7 @@ def get_user_burnout_prediction(user_id):
         dict: Latest prediction data, or None if not found
     """
     try:
-        conn = mysql.connect
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT predicted_risk, confidence as prediction_strength, study_date, mood_score
-            FROM burnout_predictions
-            WHERE user_id = %s
-            ORDER BY study_date DESC
-            LIMIT 1
-        """, (user_id,))
-        
-        prediction = cursor.fetchone()
-        cursor.close()
-        
-        return prediction
+        return get_latest_user_snapshot(user_id)['prediction']
         
     except Exception as e:
         print(f"Error getting burnout prediction: {str(e)}")
@@ -1533,20 +2566,7 @@ def get_user_productivity_score(user_id):
         dict: Productivity score data, or None if no study pattern exists
     """
     try:
-        conn = mysql.connect
-        cursor = conn.cursor()
-        
-        # Get the most recent study pattern
-        cursor.execute("""
-            SELECT study_hours, sleep_hours, break_time, screen_time, study_date
-            FROM study_patterns
-            WHERE user_id = %s
-            ORDER BY study_date DESC
-            LIMIT 1
-        """, (user_id,))
-        
-        pattern = cursor.fetchone()
-        cursor.close()
+        pattern = get_latest_user_snapshot(user_id)['pattern']
         
         if pattern:
             # Calculate productivity score
@@ -1566,113 +2586,647 @@ def get_user_productivity_score(user_id):
         return None
 
 
-@app.route('/dashboard')
-def dashboard():
+# ============================================================================
+# DASHBOARD DATA SERVICE
+# ============================================================================
+
+def request_memo():
     """
-    Dashboard route - displays user dashboard after login.
+    Return a dict that lives for the current request only (stored in flask.g).
     
-    PROTECTED ROUTE:
-    - Requires authentication (user must be logged in)
-    - Redirects to login if not authenticated
-    - Shows personalized content based on logged-in user
+    Helpers use it to memoize database lookups so that the same row is never
+    fetched twice while rendering one page. Outside an app context a fresh
+    dict is returned, so nothing is cached.
+    """
+    if not has_app_context():
+        return {}
+    if 'request_memo' not in g:
+        g.request_memo = {}
+    return g.request_memo
+
+
+def get_latest_user_snapshot(user_id):
+    """
+    Fetch the user's latest study pattern and latest burnout prediction in ONE query.
     
-    Shows user progress, available courses, and productivity score.
+    Both rows are selected as single-row derived tables and cross-joined, so
+    the dashboard needs one database round trip instead of one per helper.
+    The result is memoized for the rest of the request.
+    
+    Args:
+        user_id (int): User ID
+    
+    Returns:
+        dict: {'pattern': dict or None, 'prediction': dict or None}
     """
-    # Check authentication - redirect to login if not logged in
-    if not is_authenticated():
-        return redirect(url_for('login'))
+    memo = request_memo()
+    memo_key = ('latest_snapshot', user_id)
+    if memo_key in memo:
+        return memo[memo_key]
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        SELECT sp.study_hours, sp.sleep_hours, sp.break_time, sp.screen_time,
+               sp.mood_level, sp.study_date,
+               bp.predicted_risk, bp.confidence AS prediction_strength,
+               bp.study_date AS prediction_date, bp.mood_score
+        FROM (SELECT 1 AS anchor) AS a
+        LEFT JOIN (
+            SELECT study_hours, sleep_hours, break_time, screen_time, mood_level, study_date
+            FROM study_patterns
+            WHERE user_id = %s
+            ORDER BY study_date DESC
+            LIMIT 1
+        ) AS sp ON 1 = 1
+        LEFT JOIN (
+            SELECT predicted_risk, confidence, study_date, mood_score
+            FROM burnout_predictions
+            WHERE user_id = %s
+            ORDER BY study_date DESC
+            LIMIT 1
+        ) AS bp ON 1 = 1
+    """, (user_id, user_id))
+    
+    row = cursor.fetchone()
+    cursor.close()
+    
+    pattern = None
+    prediction = None
+    if row and row['study_date'] is not None:
+        pattern = {
+            'study_hours': row['study_hours'],
+            'sleep_hours': row['sleep_hours'],
+            'break_time': row['break_time'],
+            'screen_time': row['screen_time'],
+            'mood_level': row['mood_level'],
+            'study_date': row['study_date']
+        }
+    if row and row['prediction_date'] is not None:
+        prediction = {
+            'predicted_risk': row['predicted_risk'],
+            'prediction_strength': row['prediction_strength'],
+            'study_date': row['prediction_date'],
+            'mood_score': row['mood_score']
+        }
     
-    try:
-        # Get productivity score for the user
-        productivity_score = get_user_productivity_score(session['user_id'])
-        
-        # Get burnout risk prediction for the user
-        burnout_prediction = get_user_burnout_prediction(session['user_id'])
-        
-        # Get personalized study suggestions
-        study_suggestions = get_user_study_suggestions(session['user_id'])
-        
-        return render_template('dashboard.html', 
-                             username=session.get('username'),
-                             name=session.get('name', session.get('username')),
-                             productivity_score=productivity_score,
-                             burnout_prediction=burnout_prediction,
-                             study_suggestions=study_suggestions)
-        
-    except Exception as e:
-        return render_template('dashboard.html', 
-                             username=session.get('username'),
-                             name=session.get('name', session.get('username')),
-                             productivity_score=None,
-                             burnout_prediction=None,
-                             study_suggestions=[],
-                             error=str(e))
+    snapshot = {'pattern': pattern, 'prediction': prediction}
+    memo[memo_key] = snapshot
+    return snapshot
 
 
-@app.route('/api/courses', methods=['GET'])
-def get_courses():
+def get_dashboard_data(user_id):
     """
-    API endpoint to get all available courses.
-    Returns JSON data of all courses.
+    Build everything the dashboard page needs from a single snapshot query.
+    
+    Productivity score, burnout prediction and suggestions are all derived
+    from the same latest pattern/prediction rows, so rendering the dashboard
+    costs one database round trip.
+    
+    Args:
+        user_id (int): User ID
+    
+    Returns:
+        dict: productivity_score, burnout_prediction and study_suggestions
     """
-    try:
-        conn = mysql.connect
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM courses")
-        courses = cursor.fetchall()
-        cursor.close()
-        
-        return jsonify({'success': True, 'courses': courses})
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
+    productivity_score = get_user_productivity_score(user_id)
+    burnout_prediction = get_user_burnout_prediction(user_id)
+    study_suggestions = get_user_study_suggestions(user_id)
+    
+    return {
+        'productivity_score': productivity_score,
+        'burnout_prediction': burnout_prediction,
+        'study_suggestions': study_suggestions
+    }
 
 
-@app.route('/api/courses', methods=['POST'])
-def create_course():
+# Dashboard chart cache configuration
+DASHBOARD_CACHE_BACKEND = os.getenv('DASHBOARD_CACHE_BACKEND', 'memory')  # 'memory' or 'redis'
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 300))  # Seconds
+DASHBOARD_CACHE_MAX_USERS = int(os.getenv('DASHBOARD_CACHE_MAX_USERS', 1000))
+# Cached payloads per user (chart names plus e.g. trend date ranges)
+DASHBOARD_CACHE_MAX_ENTRIES_PER_USER = int(os.getenv('DASHBOARD_CACHE_MAX_ENTRIES_PER_USER', 16))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+
+class InProcessCacheBackend:
     """
-    API endpoint to create a new course.
-    Requires authentication (session).
+    In-process LRU cache with TTL, grouped per user.
+    
+    Entries are stored as {user_id: {name: (expires_at, value)}} in nested
+    OrderedDicts, so invalidating a user drops all of their entries at once,
+    the least recently used user is evicted when the cache is full, and a
+    user's own least recently used entry is evicted beyond
+    max_entries_per_user (entry names can come from request parameters).
     """
-    if 'user_id' not in session:
-        return jsonify({'success': False, 'message': 'Authentication required'})
     
-    data = request.get_json()
-    title = data.get('title')
-    description = data.get('description')
-    instructor = data.get('instructor')
-    duration = data.get('duration')
+    def __init__(self, max_users=1000, ttl=300, max_entries_per_user=16):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.max_entries_per_user = max_entries_per_user
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, user_id, name):
+        with self._lock:
+            user_entries = self._entries.get(user_id)
+            if not user_entries or name not in user_entries:
+                return None
+            expires_at, value = user_entries[name]
+            if expires_at < time.time():
+                del user_entries[name]
+                return None
+            user_entries.move_to_end(name)
+            self._entries.move_to_end(user_id)
+            return value
+    
+    def set(self, user_id, name, value):
+        with self._lock:
+            now = time.time()
+            user_entries = self._entries.setdefault(user_id, OrderedDict())
+            user_entries[name] = (now + self.ttl, value)
+            user_entries.move_to_end(name)
+            for expired in [key for key, (expires_at, _) in user_entries.items() if expires_at < now]:
+                del user_entries[expired]
+            while len(user_entries) > self.max_entries_per_user:
+                user_entries.popitem(last=False)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+class RedisCacheBackend:
+    """
+    Redis-backed cache (any Redis-compatible server, e.g. a local redis/valkey).
     
-    try:
-        conn = mysql.connect
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "INSERT INTO courses (title, description, instructor, duration) VALUES (%s, %s, %s, %s)",
-            (title, description, instructor, duration)
-        )
-        conn.commit()
-        cursor.close()
-        
-        return jsonify({'success': True, 'message': 'Course created successfully'})
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
+    Each user has one hash key holding all of their cached chart payloads as
+    JSON, with a TTL on the key. Shared across worker processes. A hash that
+    already holds max_entries_per_user payloads is cleared before a new
+    name is added, so one user can't grow it without bound.
+    """
+    
+    def __init__(self, url, ttl=300, max_entries_per_user=16):
+        import redis  # Optional dependency - only needed for this backend
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.max_entries_per_user = max_entries_per_user
+    
+    @staticmethod
+    def _key(user_id):
+        return f"learnsmart:dashboard:{user_id}"
+    
+    def get(self, user_id, name):
+        raw = self.client.hget(self._key(user_id), name)
+        return json.loads(raw) if raw is not None else None
+    
+    def set(self, user_id, name, value):
+        key = self._key(user_id)
+        if (self.client.hlen(key) >= self.max_entries_per_user
+                and not self.client.hexists(key, name)):
+            self.client.delete(key)
+        pipe = self.client.pipeline()
+        pipe.hset(key, name, json.dumps(value))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+    
+    def invalidate(self, user_id):
+        self.client.delete(self._key(user_id))
 
 
-@app.route('/study-pattern')
-def study_pattern():
+class UserDataCache:
     """
-    Study Pattern Analyzer page - displays form to track daily study data.
+    Read-through cache for per-user data with hit/miss counters.
     
-    PROTECTED ROUTE:
-    - Requires authentication
-    - Shows form to input daily study metrics
-    - Displays user's study history
+    Values must be JSON-serializable so that any backend can store them.
+    Backend errors never fail the request - the value is just recomputed.
+    """
     
-    FIELDS:
-    - Study hours: Hours spent studying
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+    
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def get_or_compute(self, user_id, name, compute):
+        """Return the cached value for (user_id, name), computing and storing it on a miss."""
+        try:
+            value = self.backend.get(user_id, name)
+        except Exception as e:
+            print(f"Cache read error: {str(e)}")
+            self._count('_errors')
+            value = None
+        
+        if value is not None:
+            self._count('_hits')
+            return value
+        
+        self._count('_misses')
+        value = compute()
+        try:
+            self.backend.set(user_id, name, value)
+        except Exception as e:
+            print(f"Cache write error: {str(e)}")
+            self._count('_errors')
+        return value
+    
+    def invalidate(self, user_id):
+        """Drop all cached entries for a user (call after any write to their data)."""
+        try:
+            self.backend.invalidate(user_id)
+        except Exception as e:
+            print(f"Cache invalidation error: {str(e)}")
+            self._count('_errors')
+    
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self._hits,
+                'misses': self._misses,
+                'errors': self._errors,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def create_dashboard_cache():
+    """Create the dashboard cache using the configured backend (falls back to in-process)."""
+    if DASHBOARD_CACHE_BACKEND == 'redis':
+        try:
+            return UserDataCache(RedisCacheBackend(
+                REDIS_URL, ttl=DASHBOARD_CACHE_TTL, max_entries_per_user=DASHBOARD_CACHE_MAX_ENTRIES_PER_USER
+            ))
+        except ImportError:
+            print("Warning: redis package not installed. Using in-process dashboard cache.")
+    return UserDataCache(InProcessCacheBackend(
+        max_users=DASHBOARD_CACHE_MAX_USERS, ttl=DASHBOARD_CACHE_TTL,
+        max_entries_per_user=DASHBOARD_CACHE_MAX_ENTRIES_PER_USER
+    ))
+
+
+dashboard_cache = create_dashboard_cache()
+
+
+# ============================================================================
+# STUDY PATTERN AGGREGATES (Rolling Windows)
+# ============================================================================
+
+# Rolling windows (in days) kept in study_pattern_aggregates
+STUDY_AGGREGATE_WINDOWS = (7, 14, 30)
+
+# Rows per INSERT batch when rewriting aggregates
+STUDY_AGGREGATE_BATCH_SIZE = 1000
+
+STUDY_AGGREGATE_INSERT = """
+    INSERT INTO study_pattern_aggregates
+    (user_id, window_days, agg_date, entries,
+     study_hours_sum, sleep_hours_sum, break_time_sum, screen_time_sum, productivity_sum,
+     study_hours_avg, sleep_hours_avg, break_time_avg, screen_time_avg, productivity_avg)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def compute_study_aggregates(user_id, patterns, first_date, last_date):
+    """
+    Compute rolling-window aggregate rows for every day in [first_date, last_date].
+
+    The window ending on day D covers D - (window - 1) .. D. Daily values are
+    laid out on a dense day axis, so every window sum is the difference of two
+    cumulative sums. Means are taken over the days that have an entry. Days
+    whose window contains no entry produce no row.
+
+    Args:
+        user_id (int): User ID
+        patterns (list): study_patterns rows; must include every entry from
+                         first_date - 29 days to last_date
+        first_date (date): First day to compute
+        last_date (date): Last day to compute
+
+    Returns:
+        list: Tuples in STUDY_AGGREGATE_INSERT column order
+    """
+    longest = max(STUDY_AGGREGATE_WINDOWS)
+    origin = first_date - timedelta(days=longest - 1)
+    day_count = (last_date - origin).days + 1
+
+    # One row per measure: entries, study, sleep, break, screen, productivity
+    daily = np.zeros((6, day_count))
+    patterns = [
+        pattern for pattern in patterns
+        if 0 <= (pattern['study_date'] - origin).days < day_count
+    ]
+    if patterns:
+        offsets = np.array([(pattern['study_date'] - origin).days for pattern in patterns])
+        study_hours = np.array([float(pattern['study_hours']) for pattern in patterns])
+        sleep_hours = np.array([float(pattern['sleep_hours']) for pattern in patterns])
+        break_time = np.array([float(pattern['break_time']) for pattern in patterns])
+        screen_time = np.array([float(pattern['screen_time']) for pattern in patterns])
+        scores = calculate_productivity_scores_vectorized(study_hours, sleep_hours, break_time, screen_time)
+        # One entry per user per day, so offsets are unique
+        daily[:, offsets] = np.vstack([
+            np.ones(len(patterns)), study_hours, sleep_hours, break_time, screen_time,
+            scores['total_score']
+        ])
+
+    cumulative = np.zeros((6, day_count + 1))
+    np.cumsum(daily, axis=1, out=cumulative[:, 1:])
+
+    days = np.arange(longest - 1, day_count)
+    rows = []
+    for window in STUDY_AGGREGATE_WINDOWS:
+        sums = cumulative[:, days + 1] - cumulative[:, days + 1 - window]
+        entries = np.rint(sums[0]).astype(int)
+        filled = entries > 0
+        # Round sums before dividing, so a mean never depends on float noise
+        # left over from the cumulative sums (incremental and rebuilt rows match)
+        hour_sums = np.round(sums[1:5, filled], 2)
+        productivity_sums = np.round(sums[5, filled], 1)
+        hour_means = np.round(hour_sums / entries[filled], 2).T.tolist()
+        productivity_means = np.round(productivity_sums / entries[filled], 1).tolist()
+        hour_sums = hour_sums.T.tolist()
+        productivity_sums = productivity_sums.tolist()
+        for i, day in enumerate(days[filled].tolist()):
+            rows.append((
+                user_id, window, origin + timedelta(days=day), int(entries[filled][i]),
+                *hour_sums[i], productivity_sums[i], *hour_means[i], productivity_means[i]
+            ))
+    return rows
+
+
+def lock_user_study_patterns(cursor, user_id):
+    """
+    Serialize writers of one user's study patterns and aggregates.
+    
+    Every transaction that changes study_patterns takes this lock (the
+    user's row, FOR UPDATE) before its first write, so two overlapping
+    aggregate refreshes can't each miss the other's row and overwrite the
+    aggregates with stale sums. Released on commit/rollback.
+    """
+    cursor.execute("SELECT id FROM users WHERE id = %s FOR UPDATE", (user_id,))
+
+
+def refresh_study_aggregates(cursor, user_id, *changed_dates):
+    """
+    Recompute the aggregate rows affected by changed study_patterns entries.
+
+    An entry on day d only appears in windows ending on d .. d + 29, so each
+    change rewrites at most 30 days per window from at most 59 entries,
+    however long the user's history is. Call it inside the transaction that
+    changed the entry, after lock_user_study_patterns and before commit.
+
+    Args:
+        cursor: Open database cursor
+        user_id (int): User ID
+        *changed_dates (date or str): Dates whose entry was inserted, updated or deleted
+    """
+    for changed in sorted({
+        changed if isinstance(changed, date) else date.fromisoformat(str(changed))
+        for changed in changed_dates
+    }):
+        refresh_study_aggregate_range(cursor, user_id, changed, changed)
+
+
+def refresh_study_aggregate_range(cursor, user_id, first_date, last_date):
+    """
+    Recompute the aggregate rows affected by changes to every entry between
+    first_date and last_date (used for bulk imports).
+
+    Reads the entries from first_date - 29 to last_date + 29 in one query and
+    rewrites the aggregates for first_date .. last_date + 29.
+
+    Args:
+        cursor: Open database cursor
+        user_id (int): User ID
+        first_date (date): First changed day
+        last_date (date): Last changed day
+    """
+    longest = max(STUDY_AGGREGATE_WINDOWS)
+    window_end = last_date + timedelta(days=longest - 1)
+
+    # Locking read: sees the latest committed rows, not the transaction's snapshot
+    cursor.execute("""
+        SELECT study_date, study_hours, sleep_hours, break_time, screen_time
+        FROM study_patterns
+        WHERE user_id = %s AND study_date BETWEEN %s AND %s
+        LOCK IN SHARE MODE
+    """, (user_id, first_date - timedelta(days=longest - 1), window_end))
+    rows = compute_study_aggregates(user_id, cursor.fetchall(), first_date, window_end)
+
+    cursor.execute("""
+        DELETE FROM study_pattern_aggregates
+        WHERE user_id = %s AND agg_date BETWEEN %s AND %s
+    """, (user_id, first_date, window_end))
+    for start in range(0, len(rows), STUDY_AGGREGATE_BATCH_SIZE):
+        cursor.executemany(STUDY_AGGREGATE_INSERT, rows[start:start + STUDY_AGGREGATE_BATCH_SIZE])
+
+
+def rebuild_study_aggregates(conn, user_id=None):
+    """
+    Rebuild study_pattern_aggregates from study_patterns (backfill / repair).
+
+    Each user's history is loaded once and aggregated in one pass; the user's
+    old rows are replaced in a single transaction.
+
+    Args:
+        conn: Database connection
+        user_id (int): Rebuild one user only (default: every user with study patterns)
+
+    Returns:
+        dict: users and rows written
+    """
+    longest = max(STUDY_AGGREGATE_WINDOWS)
+    cursor = conn.cursor()
+
+    if user_id is None:
+        cursor.execute("SELECT DISTINCT user_id FROM study_patterns")
+        user_ids = [row['user_id'] for row in cursor.fetchall()]
+    else:
+        user_ids = [user_id]
+
+    total_rows = 0
+    for current_user_id in user_ids:
+        lock_user_study_patterns(cursor, current_user_id)
+        cursor.execute("""
+            SELECT study_date, study_hours, sleep_hours, break_time, screen_time
+            FROM study_patterns
+            WHERE user_id = %s
+            ORDER BY study_date
+            LOCK IN SHARE MODE
+        """, (current_user_id,))
+        patterns = cursor.fetchall()
+
+        rows = []
+        if patterns:
+            rows = compute_study_aggregates(
+                current_user_id, patterns, patterns[0]['study_date'],
+                patterns[-1]['study_date'] + timedelta(days=longest - 1)
+            )
+
+        cursor.execute("DELETE FROM study_pattern_aggregates WHERE user_id = %s", (current_user_id,))
+        for start in range(0, len(rows), STUDY_AGGREGATE_BATCH_SIZE):
+            cursor.executemany(STUDY_AGGREGATE_INSERT, rows[start:start + STUDY_AGGREGATE_BATCH_SIZE])
+        conn.commit()
+        total_rows += len(rows)
+
+    cursor.close()
+    return {'users': len(user_ids), 'rows': total_rows}
+
+
+@app.cli.command('rebuild-study-aggregates')
+@click.option('--user-id', type=int, default=None, help='Rebuild one user only.')
+def rebuild_study_aggregates_command(user_id):
+    """Rebuild rolling study pattern aggregates from study_patterns."""
+    result = rebuild_study_aggregates(get_db(), user_id)
+    print(f"Rebuilt {result['rows']} aggregate rows for {result['users']} user(s).")
+
+
+def get_study_aggregates(user_id, as_of):
+    """
+    Read the rolling 7/14/30-day aggregates ending on one day (primary key lookup).
+
+    Args:
+        user_id (int): User ID
+        as_of (date): Last day of the windows
+
+    Returns:
+        dict: {window_days: aggregates dict}; windows without entries are
+              returned with entries 0 and null means
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT window_days, entries,
+               study_hours_sum, sleep_hours_sum, break_time_sum, screen_time_sum, productivity_sum,
+               study_hours_avg, sleep_hours_avg, break_time_avg, screen_time_avg, productivity_avg
+        FROM study_pattern_aggregates
+        WHERE user_id = %s AND agg_date = %s
+    """, (user_id, as_of))
+    found = {row['window_days']: row for row in cursor.fetchall()}
+    cursor.close()
+
+    measures = ('study_hours', 'sleep_hours', 'break_time', 'screen_time', 'productivity')
+    aggregates = {}
+    for window in STUDY_AGGREGATE_WINDOWS:
+        row = found.get(window)
+        aggregates[window] = {
+            'entries': row['entries'] if row else 0,
+            'sum': {m: float(row[f'{m}_sum']) if row else 0.0 for m in measures},
+            'mean': {m: float(row[f'{m}_avg']) if row else None for m in measures},
+        }
+    return aggregates
+
+
+@app.route('/dashboard')
+def dashboard():
+    """
+    Dashboard route - displays user dashboard after login.
+    
+    PROTECTED ROUTE:
+    - Requires authentication (user must be logged in)
+    - Redirects to login if not authenticated
+    - Shows personalized content based on logged-in user
+    
+    Shows user progress, available courses, and productivity score.
+    """
+    # Check authentication - redirect to login if not logged in
+    if not is_authenticated():
+        return redirect(url_for('login'))
+    
+    try:
+        # Productivity score, burnout prediction and suggestions (one query)
+        dashboard_data = get_dashboard_data(session['user_id'])
+        
+        return render_template('dashboard.html', 
+                             username=session.get('username'),
+                             name=session.get('name', session.get('username')),
+                             productivity_score=dashboard_data['productivity_score'],
+                             burnout_prediction=dashboard_data['burnout_prediction'],
+                             study_suggestions=dashboard_data['study_suggestions'])
+        
+    except Exception as e:
+        return render_template('dashboard.html', 
+                             username=session.get('username'),
+                             name=session.get('name', session.get('username')),
+                             productivity_score=None,
+                             burnout_prediction=None,
+                             study_suggestions=[],
+                             error=str(e))
+
+
+@app.route('/api/courses', methods=['GET'])
+def get_courses():
+    """
+    API endpoint to get all available courses.
+    Returns JSON data of all courses.
+    """
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM courses")
+        courses = cursor.fetchall()
+        cursor.close()
+        
+        return jsonify({'success': True, 'courses': courses})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+@app.route('/api/courses', methods=['POST'])
+def create_course():
+    """
+    API endpoint to create a new course.
+    Requires authentication (session).
+    """
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Authentication required'})
+    
+    data = request.get_json()
+    title = data.get('title')
+    description = data.get('description')
+    instructor = data.get('instructor')
+    duration = data.get('duration')
+    
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "INSERT INTO courses (title, description, instructor, duration) VALUES (%s, %s, %s, %s)",
+            (title, description, instructor, duration)
+        )
+        conn.commit()
+        cursor.close()
+        
+        return jsonify({'success': True, 'message': 'Course created successfully'})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+@app.route('/study-pattern')
+def study_pattern():
+    """
+    Study Pattern Analyzer page - displays form to track daily study data.
+    
+    PROTECTED ROUTE:
+    - Requires authentication
+    - Shows form to input daily study metrics
+    - Displays user's study history
+    
+    FIELDS:
+    - Study hours: Hours spent studying
     - Sleep hours: Hours of sleep
     - Break time: Hours of break/rest
     - Screen time: Hours spent on screen
@@ -1684,7 +3238,7 @@ def study_pattern():
     
     try:
         # Get user's recent study patterns (last 7 days)
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -1769,8 +3323,9 @@ def submit_study_pattern():
         return jsonify({'success': False, 'message': 'Invalid number format'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
+        lock_user_study_patterns(cursor, session['user_id'])
         
         # Check if entry exists for this date (one entry per day per user)
         cursor.execute("""
@@ -1798,9 +3353,15 @@ def submit_study_pattern():
             """, (session['user_id'], study_date, study_hours, sleep_hours, 
                   break_time, screen_time, mood_level))
         
+        # Rolling aggregates change in the same transaction
+        refresh_study_aggregates(cursor, session['user_id'], study_date)
+        
         conn.commit()
         cursor.close()
         
+        # Chart data for this user is now stale
+        dashboard_cache.invalidate(session['user_id'])
+        
         # Predict burnout risk using ML model
         prediction_result = predict_burnout_risk(
             study_hours, sleep_hours, break_time, screen_time, mood_level
@@ -1848,7 +3409,7 @@ def get_study_patterns():
         return jsonify({'success': False, 'message': 'Authentication required'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get limit from query parameter (default 30)
@@ -1892,7 +3453,7 @@ def get_study_pattern(pattern_id):
         return jsonify({'success': False, 'message': 'Authentication required'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get pattern (only if it belongs to the user)
@@ -1978,12 +3539,13 @@ def update_study_pattern(pattern_id):
         return jsonify({'success': False, 'message': 'Invalid number format'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
+        lock_user_study_patterns(cursor, session['user_id'])
         
         # Check if pattern exists and belongs to user
         cursor.execute("""
-            SELECT id FROM study_patterns 
+            SELECT id, study_date FROM study_patterns 
             WHERE id = %s AND user_id = %s
         """, (pattern_id, session['user_id']))
         
@@ -2002,9 +3564,15 @@ def update_study_pattern(pattern_id):
         """, (study_date, study_hours, sleep_hours, break_time, screen_time, mood_level,
               pattern_id, session['user_id']))
         
+        # The entry may have moved, so both its old and new days are refreshed
+        refresh_study_aggregates(cursor, session['user_id'], existing['study_date'], study_date)
+        
         conn.commit()
         cursor.close()
         
+        # Chart data for this user is now stale
+        dashboard_cache.invalidate(session['user_id'])
+        
         # Recalculate burnout prediction for updated pattern
         prediction_result = predict_burnout_risk(
             study_hours, sleep_hours, break_time, screen_time, mood_level
@@ -2046,8 +3614,9 @@ def delete_study_pattern(pattern_id):
         return jsonify({'success': False, 'message': 'Authentication required'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
+        lock_user_study_patterns(cursor, session['user_id'])
         
         # Check if pattern exists and belongs to user
         cursor.execute("""
@@ -2067,9 +3636,14 @@ def delete_study_pattern(pattern_id):
             WHERE id = %s AND user_id = %s
         """, (pattern_id, session['user_id']))
         
+        refresh_study_aggregates(cursor, session['user_id'], pattern['study_date'])
+        
         conn.commit()
         cursor.close()
         
+        # Chart data for this user is now stale
+        dashboard_cache.invalidate(session['user_id'])
+        
         return jsonify({
             'success': True, 
             'message': 'Study pattern deleted successfully!'
@@ -2079,112 +3653,588 @@ def delete_study_pattern(pattern_id):
         return jsonify({'success': False, 'message': str(e)})
 
 
-@app.route('/api/dashboard/weekly-study-hours', methods=['GET'])
-def get_weekly_study_hours():
+# Bulk study pattern import limits
+MAX_IMPORT_ROWS = 10000
+MAX_IMPORT_ERRORS = 100  # Validation errors reported per request
+IMPORT_BATCH_SIZE = 1000  # Rows per executemany() batch
+
+STUDY_IMPORT_COLUMNS = ('study_date', 'study_hours', 'sleep_hours', 'break_time', 'screen_time', 'mood_level')
+
+STUDY_PATTERN_UPSERT = """
+    INSERT INTO study_patterns
+    (user_id, study_date, study_hours, sleep_hours, break_time, screen_time, mood_level)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        study_hours = VALUES(study_hours), sleep_hours = VALUES(sleep_hours),
+        break_time = VALUES(break_time), screen_time = VALUES(screen_time),
+        mood_level = VALUES(mood_level)
+"""
+
+BURNOUT_PREDICTION_UPSERT = """
+    INSERT INTO burnout_predictions
+    (user_id, study_date, study_hours, sleep_hours, break_time,
+     screen_time, mood_score, predicted_risk, confidence)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        study_hours = VALUES(study_hours), sleep_hours = VALUES(sleep_hours),
+        break_time = VALUES(break_time), screen_time = VALUES(screen_time),
+        mood_score = VALUES(mood_score), predicted_risk = VALUES(predicted_risk),
+        confidence = VALUES(confidence)
+"""
+
+
+def read_study_import_records(req):
     """
-    API endpoint to get weekly study hours data for chart.
-    
-    Returns study hours for the last 7 days.
-    Used for weekly study hours chart visualization.
-    
+    Read the records of a bulk study pattern import from the request.
+
+    Accepted inputs:
+    - multipart upload in the 'file' field (.csv or .json)
+    - a JSON body: a list of objects, or {"rows": [...]}
+    - a text/csv body
+
+    CSV files need a header row with the STUDY_IMPORT_COLUMNS names (any
+    order, case-insensitive); a UTF-8 byte order mark from Excel is ignored.
+
     Returns:
-        JSON with dates and study hours for last 7 days
+        tuple: (list of dicts, None) or (None, error_message)
     """
-    if not is_authenticated():
-        return jsonify({'success': False, 'message': 'Authentication required'})
-    
+    if 'file' in req.files:
+        file = req.files['file']
+        extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
+        if extension not in ('csv', 'json'):
+            return None, 'Invalid file type. Only CSV and JSON files are allowed.'
+        raw = file.read()
+    elif req.is_json:
+        extension, raw = 'json', req.get_data()
+    elif req.mimetype == 'text/csv':
+        extension, raw = 'csv', req.get_data()
+    else:
+        return None, 'Upload a CSV or JSON file, or send rows as JSON'
+
     try:
-        conn = mysql.connect
-        cursor = conn.cursor()
-        
-        # Get last 7 days of study data
-        cursor.execute("""
-            SELECT study_date, study_hours
-            FROM study_patterns
-            WHERE user_id = %s
-            ORDER BY study_date DESC
-            LIMIT 7
-        """, (session['user_id'],))
-        
-        patterns = cursor.fetchall()
-        cursor.close()
-        
-        # Prepare data for chart (reverse to show oldest first)
-        dates = []
-        hours = []
-        
-        for pattern in reversed(patterns):
-            dates.append(pattern['study_date'].strftime('%Y-%m-%d'))
-            hours.append(float(pattern['study_hours']))
-        
-        return jsonify({
-            'success': True,
-            'dates': dates,
-            'study_hours': hours
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
+        text = raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return None, 'File must be UTF-8 encoded'
 
+    if extension == 'json':
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None, 'Invalid JSON'
+        records = data.get('rows') if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            return None, 'JSON must be a list of rows or an object with a "rows" list'
+        return records, None
+
+    reader = csv.DictReader(io.StringIO(text))
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = [column for column in STUDY_IMPORT_COLUMNS if column not in reader.fieldnames]
+    if missing:
+        return None, f"CSV is missing columns: {', '.join(missing)}"
+    try:
+        return list(reader), None
+    except csv.Error as e:
+        return None, f'Invalid CSV: {e}'
 
-@app.route('/api/dashboard/sleep-vs-productivity', methods=['GET'])
-def get_sleep_vs_productivity():
+
+def validate_study_import_records(records):
     """
-    API endpoint to get sleep hours vs productivity score data for chart.
-    
-    Returns sleep hours and corresponding productivity scores for analysis.
-    Used for sleep vs productivity correlation chart.
-    
+    Validate import records in bulk.
+
+    Fields are parsed row by row, then the hour ranges of all rows are
+    checked with one NumPy comparison. A date may appear only once per import.
+
+    Args:
+        records (list): Dicts with the STUDY_IMPORT_COLUMNS fields
+
     Returns:
-        JSON with sleep hours and productivity scores
+        tuple: (rows, errors) - rows are (study_date, study_hours, sleep_hours,
+               break_time, screen_time, mood_level) tuples in input order,
+               errors are {'index', 'message'} dicts (rows is empty if any row failed)
     """
-    if not is_authenticated():
-        return jsonify({'success': False, 'message': 'Authentication required'})
-    
-    try:
-        conn = mysql.connect
-        cursor = conn.cursor()
-        
-        # Get study patterns with dates
-        cursor.execute("""
-            SELECT study_date, sleep_hours, study_hours, break_time, screen_time, mood_level
-            FROM study_patterns
-            WHERE user_id = %s
-            ORDER BY study_date DESC
-            LIMIT 14
-        """, (session['user_id'],))
-        
-        patterns = cursor.fetchall()
+    rows = []
+    row_indexes = []
+    errors = []
+    seen_dates = {}
+
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append({'index': index, 'message': 'Row must be an object'})
+            continue
+
+        mood_level = str(record.get('mood_level') or '').strip().capitalize()
+        if mood_level not in ['Low', 'Medium', 'High']:
+            errors.append({'index': index, 'message': 'Invalid mood level'})
+            continue
+
+        try:
+            study_date = date.fromisoformat(str(record.get('study_date') or '').strip())
+        except ValueError:
+            errors.append({'index': index, 'message': 'Invalid date format (use YYYY-MM-DD)'})
+            continue
+
+        if study_date in seen_dates:
+            errors.append({'index': index, 'message': f'Duplicate date (same as row {seen_dates[study_date]})'})
+            continue
+        seen_dates[study_date] = index
+
+        try:
+            rows.append((
+                study_date,
+                float(record.get('study_hours')),
+                float(record.get('sleep_hours')),
+                float(record.get('break_time')),
+                float(record.get('screen_time')),
+                mood_level
+            ))
+            row_indexes.append(index)
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'message': 'Invalid number format'})
+
+    if rows:
+        hours = np.array([row[1:5] for row in rows], dtype=float)
+        out_of_range = ~np.all((hours >= 0) & (hours <= 24), axis=1)  # also catches NaN
+        for position in np.flatnonzero(out_of_range).tolist():
+            errors.append({'index': row_indexes[position], 'message': 'Hours must be between 0 and 24'})
+
+    if errors:
+        errors.sort(key=lambda error: error['index'])
+        return [], errors
+    return rows, errors
+
+
+@app.route('/api/study-pattern/import', methods=['POST'])
+def import_study_patterns():
+    """
+    API endpoint to import many days of study pattern data at once.
+
+    REQUIRES AUTHENTICATION:
+    - User must be logged in
+    - Data is linked to logged-in user
+
+    INPUT (see read_study_import_records):
+    - CSV or JSON file upload, or a JSON / CSV request body
+    - Columns: study_date, study_hours, sleep_hours, break_time, screen_time,
+      mood_level (max MAX_IMPORT_ROWS rows)
+
+    HOW IT WORKS:
+    1. All rows are validated before anything is written (all or nothing)
+    2. Patterns are upserted with INSERT ... ON DUPLICATE KEY UPDATE through
+       executemany(), so days that already exist are overwritten
+    3. Burnout risk for every row comes from one predict_burnout_risk_batch call
+    4. Predictions are upserted with one executemany() per batch
+    5. Rolling aggregates are recomputed for the imported date range
+    Everything is written in one transaction.
+
+    Returns:
+        JSON response with the number of imported rows and predicted risk counts
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+
+    records, error = read_study_import_records(request)
+    if error:
+        return jsonify({'success': False, 'message': error})
+
+    if not records:
+        return jsonify({'success': False, 'message': 'No rows to import'})
+
+    if len(records) > MAX_IMPORT_ROWS:
+        return jsonify({'success': False, 'message': f'At most {MAX_IMPORT_ROWS} rows per import'})
+
+    rows, errors = validate_study_import_records(records)
+    if errors:
+        return jsonify({
+            'success': False,
+            'message': f'{len(errors)} invalid row(s); nothing was imported',
+            'errors': errors[:MAX_IMPORT_ERRORS]
+        })
+
+    user_id = session['user_id']
+    predictions = predict_burnout_risk_batch([row[1:] for row in rows])
+
+    pattern_rows = [(user_id, *row) for row in rows]
+    prediction_rows = [
+        (user_id, *row[:5], mood_level_to_score(row[5]),
+         prediction['predicted_risk'], prediction['prediction_strength'])
+        for row, prediction in zip(rows, predictions)
+        if prediction['predicted_risk']
+    ]
+
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        lock_user_study_patterns(cursor, user_id)
+        for start in range(0, len(pattern_rows), IMPORT_BATCH_SIZE):
+            cursor.executemany(STUDY_PATTERN_UPSERT, pattern_rows[start:start + IMPORT_BATCH_SIZE])
+        for start in range(0, len(prediction_rows), IMPORT_BATCH_SIZE):
+            cursor.executemany(BURNOUT_PREDICTION_UPSERT, prediction_rows[start:start + IMPORT_BATCH_SIZE])
+
+        study_dates = [row[0] for row in rows]
+        refresh_study_aggregate_range(cursor, user_id, min(study_dates), max(study_dates))
+
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Error importing study patterns: {str(e)}")
+        return jsonify({'success': False, 'message': 'Error importing data. Nothing was imported.'})
+    finally:
         cursor.close()
+
+    # Chart data for this user is now stale
+    dashboard_cache.invalidate(user_id)
+
+    return jsonify({
+        'success': True,
+        'message': f'Imported {len(rows)} day(s) of study data.',
+        'imported': len(rows),
+        'predictions': len(prediction_rows),
+        'risk_counts': dict(Counter(row[7] for row in prediction_rows))
+    })
+
+
+def load_weekly_study_hours(user_id):
+    """
+    Load the last 7 days of study hours for the weekly chart.
+    
+    Args:
+        user_id (int): User ID
+    
+    Returns:
+        dict: dates and study_hours lists (oldest first)
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    
+    # Get last 7 days of study data
+    cursor.execute("""
+        SELECT study_date, study_hours
+        FROM study_patterns
+        WHERE user_id = %s
+        ORDER BY study_date DESC
+        LIMIT 7
+    """, (user_id,))
+    
+    patterns = cursor.fetchall()
+    cursor.close()
+    
+    # Prepare data for chart (reverse to show oldest first)
+    dates = []
+    hours = []
+    
+    for pattern in reversed(patterns):
+        dates.append(pattern['study_date'].strftime('%Y-%m-%d'))
+        hours.append(float(pattern['study_hours']))
+    
+    return {'dates': dates, 'study_hours': hours}
+
+
+def load_sleep_vs_productivity(user_id):
+    """
+    Load the last 14 days of sleep hours and productivity scores for the correlation chart.
+    
+    Args:
+        user_id (int): User ID
+    
+    Returns:
+        dict: dates, sleep_hours and productivity_scores lists (oldest first)
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    
+    # Get study patterns with dates
+    cursor.execute("""
+        SELECT study_date, sleep_hours, study_hours, break_time, screen_time, mood_level
+        FROM study_patterns
+        WHERE user_id = %s
+        ORDER BY study_date DESC
+        LIMIT 14
+    """, (user_id,))
+    
+    patterns = cursor.fetchall()
+    cursor.close()
+    
+    # Oldest first for the chart
+    patterns = list(reversed(patterns))
+    sleep_hours_list = [float(pattern['sleep_hours']) for pattern in patterns]
+    dates = [pattern['study_date'].strftime('%Y-%m-%d') for pattern in patterns]
+    
+    # Score all patterns in one vectorized call
+    score_data = calculate_productivity_scores_vectorized(
+        [float(pattern['study_hours']) for pattern in patterns],
+        sleep_hours_list,
+        [float(pattern['break_time']) for pattern in patterns],
+        [float(pattern['screen_time']) for pattern in patterns]
+    )
+    productivity_scores = score_data['total_score'].tolist()
+    
+    return {
+        'dates': dates,
+        'sleep_hours': sleep_hours_list,
+        'productivity_scores': productivity_scores
+    }
+
+
+# Long-range trend charts: points returned by default / at most, and the
+# range shown when no start date is given
+TRENDS_DEFAULT_POINTS = int(os.getenv('TRENDS_DEFAULT_POINTS', 90))
+TRENDS_MAX_POINTS = int(os.getenv('TRENDS_MAX_POINTS', 500))
+TRENDS_DEFAULT_DAYS = int(os.getenv('TRENDS_DEFAULT_DAYS', 365))
+
+
+def downsample_daily_series(day_offsets, series, bucket_days):
+    """
+    Bucket daily values into fixed-width date buckets (mean/min/max per bucket).
+
+    Buckets cover bucket_days consecutive days each, so the x axis stays
+    evenly spaced in time; buckets without any entry are left out. With
+    bucket_days == 1 every entry is its own bucket and is returned unchanged.
+
+    Args:
+        day_offsets (np.ndarray): Days since the range start, one per entry
+        series (dict): {name: np.ndarray of values, one per entry}
+        bucket_days (int): Days per bucket
+
+    Returns:
+        tuple: (bucket numbers, entries per bucket,
+                {name: {'mean': array, 'min': array, 'max': array}})
+    """
+    buckets, inverse = np.unique(day_offsets // bucket_days, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(buckets))
+
+    downsampled = {}
+    for name, values in series.items():
+        minimum = np.full(len(buckets), np.inf)
+        maximum = np.full(len(buckets), -np.inf)
+        np.minimum.at(minimum, inverse, values)
+        np.maximum.at(maximum, inverse, values)
+        downsampled[name] = {
+            'mean': np.bincount(inverse, weights=values, minlength=len(buckets)) / counts,
+            'min': minimum,
+            'max': maximum
+        }
+    return buckets, counts, downsampled
+
+
+def load_study_trends(user_id, start_date, end_date, points):
+    """
+    Load study hours, sleep hours and productivity for a date range, downsampled
+    to at most `points` buckets.
+
+    The rows come from one range scan of the (user_id, study_date, ...)
+    covering index; productivity is scored for all rows in one vectorized
+    call, and bucketing is done with NumPy, so the payload size depends on
+    `points` rather than on the length of the range.
+
+    Args:
+        user_id (int): User ID
+        start_date (date): First day of the range
+        end_date (date): Last day of the range
+        points (int): Maximum number of buckets
+
+    Returns:
+        dict: bucket_days, bucket start/end dates, entries per bucket and
+              mean/min/max lists for study_hours, sleep_hours and productivity_scores
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT study_date, study_hours, sleep_hours, break_time, screen_time
+        FROM study_patterns
+        WHERE user_id = %s AND study_date BETWEEN %s AND %s
+        ORDER BY study_date
+    """, (user_id, start_date, end_date))
+    patterns = cursor.fetchall()
+    cursor.close()
+
+    span_days = (end_date - start_date).days + 1
+    bucket_days = -(-span_days // points)  # ceil
+
+    series_names = ('study_hours', 'sleep_hours', 'productivity_scores')
+    result = {
+        'bucket_days': bucket_days,
+        'bucket_start': [],
+        'bucket_end': [],
+        'entries': [],
+        **{name: {'mean': [], 'min': [], 'max': []} for name in series_names}
+    }
+    if not patterns:
+        return result
+
+    study_hours = np.array([float(pattern['study_hours']) for pattern in patterns])
+    sleep_hours = np.array([float(pattern['sleep_hours']) for pattern in patterns])
+    scores = calculate_productivity_scores_vectorized(
+        study_hours, sleep_hours,
+        [float(pattern['break_time']) for pattern in patterns],
+        [float(pattern['screen_time']) for pattern in patterns]
+    )['total_score']
+    day_offsets = np.array([(pattern['study_date'] - start_date).days for pattern in patterns])
+
+    buckets, counts, downsampled = downsample_daily_series(
+        day_offsets,
+        {'study_hours': study_hours, 'sleep_hours': sleep_hours, 'productivity_scores': scores},
+        bucket_days
+    )
+
+    for bucket in buckets.tolist():
+        bucket_start = start_date + timedelta(days=bucket * bucket_days)
+        bucket_end = min(bucket_start + timedelta(days=bucket_days - 1), end_date)
+        result['bucket_start'].append(bucket_start.strftime('%Y-%m-%d'))
+        result['bucket_end'].append(bucket_end.strftime('%Y-%m-%d'))
+    result['entries'] = counts.tolist()
+    for name in series_names:
+        decimals = 1 if name == 'productivity_scores' else 2
+        for stat, values in downsampled[name].items():
+            result[name][stat] = np.round(values, decimals).tolist()
+    return result
+
+
+@app.route('/api/dashboard/weekly-study-hours', methods=['GET'])
+def get_weekly_study_hours():
+    """
+    API endpoint to get weekly study hours data for chart.
+    
+    Returns study hours for the last 7 days.
+    Used for weekly study hours chart visualization.
+    Served from the per-user dashboard cache when possible.
+    
+    Returns:
+        JSON with dates and study hours for last 7 days
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+    
+    try:
+        user_id = session['user_id']
+        chart_data = dashboard_cache.get_or_compute(
+            user_id, 'weekly-study-hours', lambda: load_weekly_study_hours(user_id)
+        )
         
-        # Calculate productivity score for each pattern
-        sleep_hours_list = []
-        productivity_scores = []
-        dates = []
+        return jsonify({
+            'success': True,
+            'dates': chart_data['dates'],
+            'study_hours': chart_data['study_hours']
+        })
         
-        for pattern in reversed(patterns):
-            # Convert mood level to score
-            mood_score = mood_level_to_score(pattern['mood_level'])
-            
-            # Calculate productivity score
-            score_data = calculate_productivity_score(
-                float(pattern['study_hours']),
-                float(pattern['sleep_hours']),
-                float(pattern['break_time']),
-                float(pattern['screen_time'])
-            )
-            
-            sleep_hours_list.append(float(pattern['sleep_hours']))
-            productivity_scores.append(score_data['total_score'])
-            dates.append(pattern['study_date'].strftime('%Y-%m-%d'))
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+@app.route('/api/dashboard/sleep-vs-productivity', methods=['GET'])
+def get_sleep_vs_productivity():
+    """
+    API endpoint to get sleep hours vs productivity score data for chart.
+    
+    Returns sleep hours and corresponding productivity scores for analysis.
+    Used for sleep vs productivity correlation chart.
+    Served from the per-user dashboard cache when possible.
+    
+    Returns:
+        JSON with sleep hours and productivity scores
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+    
+    try:
+        user_id = session['user_id']
+        chart_data = dashboard_cache.get_or_compute(
+            user_id, 'sleep-vs-productivity', lambda: load_sleep_vs_productivity(user_id)
+        )
         
         return jsonify({
             'success': True,
-            'dates': dates,
-            'sleep_hours': sleep_hours_list,
-            'productivity_scores': productivity_scores
+            'dates': chart_data['dates'],
+            'sleep_hours': chart_data['sleep_hours'],
+            'productivity_scores': chart_data['productivity_scores']
         })
-        
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+@app.route('/api/dashboard/trends', methods=['GET'])
+def get_study_trends():
+    """
+    API endpoint to get long-range study trends, downsampled server-side.
+
+    QUERY PARAMETERS:
+    - start: First day, YYYY-MM-DD (default: TRENDS_DEFAULT_DAYS before end)
+    - end: Last day, YYYY-MM-DD (default: today)
+    - points: Maximum number of points to return (default: TRENDS_DEFAULT_POINTS,
+      capped at TRENDS_MAX_POINTS)
+
+    Days are grouped into equal-width buckets and each series is returned as
+    mean/min/max per bucket, so a semester or a year of history is still a
+    small payload. Served from the per-user dashboard cache when possible.
+
+    Returns:
+        JSON with bucket dates, entries per bucket and the downsampled series
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+
+    try:
+        end_date = date.fromisoformat(request.args.get('end', date.today().isoformat()))
+        start_arg = request.args.get('start')
+        start_date = (date.fromisoformat(start_arg) if start_arg
+                      else end_date - timedelta(days=TRENDS_DEFAULT_DAYS - 1))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid date format (use YYYY-MM-DD)'})
+    if start_date > end_date:
+        return jsonify({'success': False, 'message': 'start must not be after end'})
+
+    points = request.args.get('points', TRENDS_DEFAULT_POINTS, type=int)
+    points = max(1, min(points, TRENDS_MAX_POINTS))
+
+    try:
+        user_id = session['user_id']
+        chart_data = dashboard_cache.get_or_compute(
+            user_id, f'trends:{start_date}:{end_date}:{points}',
+            lambda: load_study_trends(user_id, start_date, end_date, points)
+        )
+
+        return jsonify({
+            'success': True,
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            **chart_data
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+@app.route('/api/dashboard/rolling-averages', methods=['GET'])
+def get_rolling_averages():
+    """
+    API endpoint to get 7/14/30-day rolling sums and means ending on a day.
+
+    QUERY PARAMETERS:
+    - date: Last day of the windows, YYYY-MM-DD (default: today)
+
+    Read from study_pattern_aggregates with one primary key lookup, so the
+    cost does not grow with the length of the user's history.
+
+    Returns:
+        JSON with entries, sum and mean per window
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+
+    try:
+        as_of = date.fromisoformat(request.args.get('date', date.today().isoformat()))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid date format (use YYYY-MM-DD)'})
+
+    try:
+        aggregates = get_study_aggregates(session['user_id'], as_of)
+
+        return jsonify({
+            'success': True,
+            'date': as_of.isoformat(),
+            'windows': {f'{window}d': values for window, values in aggregates.items()}
+        })
+
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
@@ -2279,6 +4329,102 @@ def predict_burnout_api():
         })
 
 
+MAX_BATCH_PREDICTION_ROWS = 5000
+
+
+@app.route('/api/predict-burnout/batch', methods=['POST'])
+def predict_burnout_batch_api():
+    """
+    API endpoint to predict burnout risk for many study-pattern rows at once.
+
+    REQUIRES AUTHENTICATION:
+    - User must be logged in
+
+    REQUEST BODY (JSON):
+    - rows: List of objects with study_hours, sleep_hours, break_time,
+      screen_time and mood_level (max MAX_BATCH_PREDICTION_ROWS rows)
+
+    Returns:
+        JSON response with one prediction per row, in request order
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+
+    data = request.get_json(silent=True) or {}
+    rows = data.get('rows')
+
+    if not isinstance(rows, list) or not rows:
+        return jsonify({'success': False, 'message': 'rows must be a non-empty list'})
+
+    if len(rows) > MAX_BATCH_PREDICTION_ROWS:
+        return jsonify({'success': False, 'message': f'At most {MAX_BATCH_PREDICTION_ROWS} rows per request'})
+
+    # Validate all rows before scoring any of them
+    parsed_rows = []
+    errors = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'index': index, 'message': 'Row must be an object'})
+            continue
+
+        mood_level = row.get('mood_level')
+        if mood_level not in ['Low', 'Medium', 'High']:
+            errors.append({'index': index, 'message': 'Invalid mood level'})
+            continue
+
+        try:
+            parsed_rows.append((
+                float(row.get('study_hours')),
+                float(row.get('sleep_hours')),
+                float(row.get('break_time')),
+                float(row.get('screen_time')),
+                mood_level
+            ))
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'message': 'Invalid number format'})
+
+    if errors:
+        return jsonify({'success': False, 'message': 'Invalid rows in request', 'errors': errors})
+
+    predictions = []
+    for prediction_result in predict_burnout_risk_batch(parsed_rows):
+        predictions.append({
+            'predicted_risk': prediction_result['predicted_risk'],
+            'prediction_strength': prediction_result['prediction_strength'],
+            'explanation': prediction_result['explanation'],
+            'rule_applied': prediction_result['rule_applied'],
+            'ml_prediction': prediction_result.get('ml_prediction'),
+            'ml_probabilities': prediction_result.get('ml_probabilities'),
+            'model_status': prediction_result['model_status']
+        })
+
+    return jsonify({
+        'success': True,
+        'predictions': predictions,
+        'count': len(predictions)
+    })
+
+
+@app.route('/api/model-status', methods=['GET'])
+def model_status_api():
+    """
+    API endpoint to report the burnout model currently loaded in this worker.
+
+    Returns:
+        JSON with model version (content hash), load time and load count
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+
+    # Trigger a reload check so the reported version is current
+    burnout_model_registry.get_model()
+
+    return jsonify({
+        'success': True,
+        'model': burnout_model_registry.status()
+    })
+
+
 # ============================================================================
 # AI CHATBOT MODULE (OpenAI ChatGPT / Google Gemini Integration)
 # ============================================================================
@@ -2288,24 +4434,239 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def extract_text_from_pdf(file_path):
+# PDF extraction settings
+PDF_EXTRACT_WORKERS = int(os.getenv('PDF_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))  # Processes in the shared extraction pool (0 = in-process, no timeout)
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', 4))  # Minimum pages handed to a worker at a time
+PDF_PAGE_TIMEOUT = float(os.getenv('PDF_PAGE_TIMEOUT', 30))  # Seconds allowed per page
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', 1000))  # Pages beyond this are ignored
+
+
+class PdfExtractionPool:
+    """
+    One long-lived process pool shared by every PDF extraction.
+    
+    Workers are started with the 'forkserver' method ('spawn' where it is
+    not available), never by fork()ing this multithreaded server, so a
+    child can't inherit a lock held by another thread (DB pool, caches,
+    logging). The task function lives in pdf_extract, which the fork
+    server preloads.
+    
+    Workers report each task as they pick it up, so a batch can be timed
+    from when it started rather than from when it was queued.
+    
+    multiprocessing.Pool can't kill a single stuck worker, so when a batch
+    times out the pool is discarded: new extractions get a fresh pool, and
+    the old one is terminated as soon as the last extraction still using it
+    finishes.
+    """
+    
+    def __init__(self, processes=PDF_EXTRACT_WORKERS):
+        self.processes = processes
+        self._lock = threading.Lock()
+        self._task_started = threading.Condition(self._lock)
+        self._pool = None
+        self._users = {}  # pool -> extractions currently using it
+        self._started_queues = {}  # pool -> queue its workers report task starts on
+        self._start_times = {}  # task id -> time.monotonic() when a worker picked it up
+        self._task_ids = itertools.count()
+        self._stats = {'pools_started': 0, 'pools_discarded': 0}
+    
+    @staticmethod
+    def _context():
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['pdf_extract'])
+            return context
+        return multiprocessing.get_context('spawn')
+    
+    def _record_starts(self, started_queue):
+        """Listener thread: timestamp task starts reported by one pool's workers."""
+        while True:
+            try:
+                task_id = started_queue.get()
+            except (EOFError, OSError):
+                return
+            if task_id is None:
+                return
+            with self._task_started:
+                self._start_times[task_id] = time.monotonic()
+                self._task_started.notify_all()
+    
+    def _terminate(self, pool, started_queue):
+        pool.terminate()
+        started_queue.put(None)
+    
+    @contextmanager
+    def acquire(self):
+        """Yield the current pool, starting it on first use."""
+        with self._lock:
+            if self._pool is None:
+                context = self._context()
+                started_queue = context.SimpleQueue()
+                self._pool = context.Pool(processes=self.processes, initializer=init_pdf_worker,
+                                          initargs=(started_queue, PDF_PAGE_TIMEOUT))
+                self._users[self._pool] = 0
+                self._started_queues[self._pool] = started_queue
+                threading.Thread(target=self._record_starts, args=(started_queue,), daemon=True).start()
+                self._stats['pools_started'] += 1
+            pool = self._pool
+            self._users[pool] += 1
+        try:
+            yield pool
+        finally:
+            with self._lock:
+                self._users[pool] -= 1
+                retired = pool is not self._pool and self._users[pool] == 0
+                if retired:
+                    del self._users[pool]
+                    started_queue = self._started_queues.pop(pool)
+            if retired:
+                self._terminate(pool, started_queue)
+    
+    def submit(self, pool, file_path, page_numbers):
+        """Queue one batch of pages on pool. Returns (task_id, AsyncResult)."""
+        task_id = next(self._task_ids)
+        return task_id, pool.apply_async(extract_pdf_pages, (file_path, page_numbers, task_id))
+    
+    def wait_started(self, task_id, timeout):
+        """Return when a worker picked up task_id, or None if it hasn't within timeout."""
+        with self._task_started:
+            self._task_started.wait_for(lambda: task_id in self._start_times, timeout)
+            return self._start_times.get(task_id)
+    
+    def started(self, task_id):
+        with self._lock:
+            return task_id in self._start_times
+    
+    def forget(self, task_ids):
+        with self._lock:
+            for task_id in task_ids:
+                self._start_times.pop(task_id, None)
+    
+    def is_current(self, pool):
+        with self._lock:
+            return pool is self._pool
+    
+    def discard(self, pool):
+        """Stop handing out a pool with a stuck worker (terminated once unused)."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+                self._stats['pools_discarded'] += 1
+    
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            started_queue = self._started_queues.pop(pool, None)
+        if pool is not None:
+            self._terminate(pool, started_queue)
+    
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, running=self._pool is not None, processes=self.processes)
+
+
+pdf_extraction_pool = PdfExtractionPool()
+atexit.register(pdf_extraction_pool.close)
+
+
+def extract_text_from_pdf(file_path, progress_callback=None, first_page=0, max_pages=PDF_MAX_PAGES):
     """
-    Extract text from PDF file using PyPDF2.
+    Extract text from PDF file using PyPDF2, splitting pages across worker processes.
+    
+    HOW IT WORKS:
+    1. Only pages [first_page, first_page + max_pages) are extracted
+    2. Pages are split into batches (a few per worker, at least
+       PDF_PAGES_PER_TASK pages each) and extracted in parallel by the shared
+       pdf_extraction_pool (PyPDF2 is CPU-bound, so threads would be
+       serialized by the GIL)
+    3. Inside the worker each page gets PDF_PAGE_TIMEOUT seconds (where
+       SIGALRM exists); a page that runs over contributes no text
+    4. As a backstop each batch gets about PDF_PAGE_TIMEOUT seconds per page,
+       counted from when a worker picked it up. A batch that overruns is
+       skipped and the pool is replaced; batches of this PDF still waiting
+       for a worker are moved to the new pool rather than dropped
+    5. With PDF_EXTRACT_WORKERS=0 pages are extracted in this process
+       instead, with no timeout at all
+    6. Page texts are assembled once with str.join (no repeated +=)
     
     Args:
         file_path (str): Path to PDF file
+        progress_callback (callable, optional): Called as progress_callback(pages_done, pages_total)
+        first_page (int): Index of the first page to extract
+        max_pages (int): Maximum number of pages to extract
     
     Returns:
         str: Extracted text content
     """
     try:
-        text = ""
         with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
+            pages_in_file = len(PyPDF2.PdfReader(file).pages)
+        
+        page_numbers = list(range(first_page, min(pages_in_file, first_page + max_pages)))
+        pages_total = len(page_numbers)
+        if pages_total == 0:
+            return ""
+        
+        page_texts = []
+        pages_done = 0
+        
+        if PDF_EXTRACT_WORKERS <= 0:
+            with open(file_path, 'rb') as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+                for page_number in page_numbers:
+                    page_texts.append(pdf_reader.pages[page_number].extract_text() or "")
+                    pages_done += 1
+                    if progress_callback:
+                        progress_callback(pages_done, pages_total)
+        else:
+            # Every batch re-opens the PDF in its worker, so aim for a few
+            # batches per worker rather than many tiny ones
+            batch_size = max(PDF_PAGES_PER_TASK, -(-pages_total // (PDF_EXTRACT_WORKERS * 4)))
+            batches = [page_numbers[i:i + batch_size] for i in range(0, pages_total, batch_size)]
+            submitted = []
+            with ExitStack() as pools:
+                pool = pools.enter_context(pdf_extraction_pool.acquire())
+                tasks = [(*pdf_extraction_pool.submit(pool, file_path, batch), pool) for batch in batches]
+                submitted.extend(task[0] for task in tasks)
+                try:
+                    for index, batch in enumerate(batches):
+                        while True:
+                            task_id, result, task_pool = tasks[index]
+                            started_at = pdf_extraction_pool.wait_started(task_id, PDF_PAGE_TIMEOUT)
+                            if started_at is not None:
+                                # One page of slack over the workers' own per-page limit
+                                result.wait(max(0, started_at + PDF_PAGE_TIMEOUT * (len(batch) + 1) - time.monotonic()))
+                                break
+                            if result.ready():
+                                break
+                            if not pdf_extraction_pool.is_current(task_pool):
+                                # Queued behind a stuck worker in a discarded pool:
+                                # resubmit every batch that hasn't started yet
+                                pool = pools.enter_context(pdf_extraction_pool.acquire())
+                                for later in range(index, len(batches)):
+                                    if not pdf_extraction_pool.started(tasks[later][0]):
+                                        tasks[later] = (*pdf_extraction_pool.submit(pool, file_path, batches[later]), pool)
+                                        submitted.append(tasks[later][0])
+                        
+                        if result.ready():
+                            try:
+                                page_texts.extend(result.get())
+                            except Exception as e:
+                                print(f"PDF extraction failed on pages {batch[0] + 1}-{batch[-1] + 1}: {str(e)}")
+                                page_texts.extend([""] * len(batch))
+                        else:
+                            print(f"PDF extraction timed out on pages {batch[0] + 1}-{batch[-1] + 1}, skipping")
+                            page_texts.extend([""] * len(batch))
+                            pdf_extraction_pool.discard(task_pool)
+                        pages_done += len(batch)
+                        if progress_callback:
+                            progress_callback(pages_done, pages_total)
+                finally:
+                    pdf_extraction_pool.forget(submitted)
+        
+        return "".join(page_text + "\n" for page_text in page_texts)
+    except Exception as e:
         print(f"Error extracting PDF: {str(e)}")
         return ""
 
@@ -2343,114 +4704,342 @@ def preprocess_text(text):
 # These are no longer needed as we're using AI for direct Q&A
 
 
-@app.route('/api/upload-document', methods=['POST'])
-def upload_document():
+# ============================================================================
+# DOCUMENT INGESTION PIPELINE (Background Jobs)
+# ============================================================================
+
+# Number of background threads processing uploaded documents
+DOCUMENT_INGEST_WORKERS = int(os.getenv('DOCUMENT_INGEST_WORKERS', 2))
+# Minimum seconds between progress writes to the job table
+JOB_PROGRESS_INTERVAL = 0.5
+# zlib level for stored document text (6 = zlib default speed/size balance)
+DOCUMENT_COMPRESSION_LEVEL = 6
+
+document_ingest_executor = ThreadPoolExecutor(
+    max_workers=DOCUMENT_INGEST_WORKERS,
+    thread_name_prefix='document-ingest'
+)
+
+
+def clean_document_text(text):
     """
-    API endpoint to upload and process documents for AI chatbot.
+    Clean extracted text so it can be stored in a utf8mb4 column.
     
-    PROCESS:
-    1. Receive uploaded file (PDF or text)
-    2. Extract text content
-    3. Store document in database for chatbot context
-    4. Return document ID for use in chat
+    - Normalizes Unicode to composed form (NFKC)
+    - Keeps printable characters and common whitespace (newlines, tabs, carriage returns)
+    - Replaces other control characters with a space and drops remaining
+      non-printable characters (format, surrogate, private-use, unassigned)
+    - Guarantees valid UTF-8
+    
+    Delegates to text_sanitizer.sanitize_text, which produces identical
+    output to the original per-character loop using precompiled regexes.
+    """
+    return sanitize_text(text)
+
+
+def hash_file(file_path, block_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file's raw bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_document_text(text):
+    """Return the SHA-256 hex digest of cleaned document text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compress_document_text(text):
+    """Compress document text (UTF-8 + zlib) for document_contents.compressed_text."""
+    return zlib.compress(text.encode('utf-8'), DOCUMENT_COMPRESSION_LEVEL)
+
+
+def decompress_document_text(data):
+    """Decompress document text stored by compress_document_text."""
+    return zlib.decompress(data).decode('utf-8')
+
+
+def find_content_by_file_hash(cursor, file_hash):
+    """
+    Return the document_contents ID already extracted from a file with
+    these exact bytes, or None if the file has not been seen before.
+    """
+    cursor.execute("""
+        SELECT content_id FROM user_documents
+        WHERE file_hash = %s AND content_id IS NOT NULL
+        LIMIT 1
+    """, (file_hash,))
+    row = cursor.fetchone()
+    return row['content_id'] if row else None
+
+
+def store_document_content(cursor, text):
+    """
+    Store cleaned text in document_contents, reusing the existing row when
+    identical text is already stored.
     
     Returns:
-        JSON with document_id and success message
+        int: document_contents ID
     """
-    if not is_authenticated():
-        return jsonify({'success': False, 'message': 'Authentication required'})
+    # LAST_INSERT_ID(id) makes lastrowid return the existing row's ID on duplicates
+    cursor.execute("""
+        INSERT INTO document_contents (content_hash, compressed_text, text_length)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)
+    """, (hash_document_text(text), compress_document_text(text), len(text)))
+    return cursor.lastrowid
+
+
+def delete_orphan_content(cursor, content_id):
+    """
+    Delete a document_contents row once no upload references it anymore.
     
-    # Check if file is present
-    if 'file' not in request.files:
-        return jsonify({'success': False, 'message': 'No file uploaded'})
+    The NOT EXISTS check skips rows that are visibly still in use; the
+    fk_user_documents_content foreign key (ON DELETE RESTRICT) also blocks
+    the delete when a concurrent upload has just deduplicated onto this row,
+    in which case the row is simply kept.
+    """
+    if content_id is None:
+        return
+    try:
+        cursor.execute("""
+            DELETE FROM document_contents
+            WHERE id = %s
+              AND NOT EXISTS (SELECT 1 FROM user_documents WHERE content_id = %s)
+        """, (content_id, content_id))
+    except MySQLdb.IntegrityError:
+        return
+    if cursor.rowcount:
+        with _document_index_cache_lock:
+            _document_index_cache.pop(content_id, None)
+
+
+def set_utf8mb4_charset(cursor):
+    """Set connection charset to utf8mb4 before storing document text."""
+    # CRITICAL: Set connection charset to utf8mb4 BEFORE any operations
+    # This ensures the connection can handle 4-byte UTF-8 characters (emojis, etc.)
+    try:
+        cursor.execute("SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci")
+        cursor.execute("SET CHARACTER SET utf8mb4")
+        cursor.execute("SET character_set_connection=utf8mb4")
+        cursor.execute("SET character_set_client=utf8mb4")
+        cursor.execute("SET character_set_results=utf8mb4")
+    except Exception as e:
+        print(f"Warning: Could not set charset: {e}")
+
+
+def store_document_text(conn, user_id, filename, file_type, text=None, file_hash=None, content_id=None):
+    """
+    Insert a processed document into user_documents.
     
-    file = request.files['file']
+    Either text (cleaned extracted text, stored in document_contents) or
+    content_id (existing document_contents row, for duplicate uploads)
+    must be given.
     
-    if file.filename == '':
-        return jsonify({'success': False, 'message': 'No file selected'})
+    Returns:
+        int: New document ID
+    """
+    cursor = conn.cursor()
+    
+    if content_id is None:
+        set_utf8mb4_charset(cursor)
+        content_id = store_document_content(cursor, text)
+        cursor.execute("SELECT 1 FROM document_indexes WHERE content_id = %s", (content_id,))
+        if not cursor.fetchone():
+            index_document_content(cursor, content_id, text)
+    
+    cursor.execute("""
+        INSERT INTO user_documents 
+        (user_id, filename, file_type, content_id, file_hash)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (user_id, filename, file_type, content_id, file_hash))
+    document_id = cursor.lastrowid
+    
+    conn.commit()
+    cursor.close()
+    return document_id
+
+
+def update_document_job(job_id, **fields):
+    """Update columns of a document_jobs row from a background thread."""
+    assignments = ', '.join(f"{column} = %s" for column in fields)
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"UPDATE document_jobs SET {assignments} WHERE id = %s",
+            tuple(fields.values()) + (job_id,)
+        )
+        conn.commit()
+        cursor.close()
+
+
+def process_document_job(job_id, user_id, file_path, filename, file_type):
+    """
+    Background worker: extract, clean and store one uploaded document.
     
-    if not allowed_file(file.filename):
-        return jsonify({'success': False, 'message': 'Invalid file type. Only PDF and TXT files are allowed.'})
+    PROCESS:
+    1. Mark job as 'processing'
+    2. Hash the raw file; if the same bytes were uploaded before, reuse the
+       stored text and skip extraction entirely
+    3. Otherwise extract text page by page, recording progress in document_jobs
+    4. Clean the text and store it (deduplicated by text hash) for user_documents,
+       together with its chunks and BM25 retrieval index
+    5. Mark job as 'done' with the new document_id (or 'failed' with an error)
+    6. Always remove the temporary upload file
+    """
+    last_progress_write = [0.0]
+    
+    def report_progress(pages_done, pages_total):
+        # Throttle writes, but always record the final page
+        now = time.monotonic()
+        if pages_done == pages_total or now - last_progress_write[0] >= JOB_PROGRESS_INTERVAL:
+            last_progress_write[0] = now
+            update_document_job(job_id, pages_done=pages_done, pages_total=pages_total)
     
     try:
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        update_document_job(job_id, status='processing')
         
-        # Determine file type
-        file_ext = filename.rsplit('.', 1)[1].lower()
-        file_type = 'PDF' if file_ext == 'pdf' else 'TEXT'
+        # Skip extraction for files that have already been processed
+        file_hash = hash_file(file_path)
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            content_id = find_content_by_file_hash(cursor, file_hash)
+            cursor.close()
+            if content_id is not None:
+                document_id = store_document_text(
+                    conn, user_id, filename, file_type,
+                    file_hash=file_hash, content_id=content_id
+                )
+        if content_id is not None:
+            update_document_job(job_id, status='done', document_id=document_id)
+            return
         
         # Extract text
         if file_type == 'PDF':
-            text = extract_text_from_pdf(file_path)
+            text = extract_text_from_pdf(file_path, progress_callback=report_progress)
         else:
             text = extract_text_from_text_file(file_path)
+            report_progress(1, 1)
         
         if not text or len(text.strip()) < 50:
-            os.remove(file_path)  # Clean up
-            return jsonify({'success': False, 'message': 'File is too short or could not extract text. Minimum 50 characters required.'})
+            update_document_job(
+                job_id, status='failed',
+                error='File is too short or could not extract text. Minimum 50 characters required.'
+            )
+            return
         
-        # Store document in database
-        conn = mysql.connect
-        cursor = conn.cursor()
+        text = clean_document_text(text)
         
-        # CRITICAL: Set connection charset to utf8mb4 BEFORE any operations
-        # This ensures the connection can handle 4-byte UTF-8 characters (emojis, etc.)
+        with db_pool.connection() as conn:
+            document_id = store_document_text(conn, user_id, filename, file_type, text, file_hash=file_hash)
+        
+        update_document_job(job_id, status='done', document_id=document_id)
+        
+    except Exception as e:
+        print(f"Error processing document job {job_id}: {str(e)}")
         try:
-            cursor.execute("SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci")
-            cursor.execute("SET CHARACTER SET utf8mb4")
-            cursor.execute("SET character_set_connection=utf8mb4")
-            cursor.execute("SET character_set_client=utf8mb4")
-            cursor.execute("SET character_set_results=utf8mb4")
-        except Exception as e:
-            print(f"Warning: Could not set charset: {e}")
-        
-        # Ensure text is properly encoded for utf8mb4
-        # Handle any encoding issues with special characters
-        if isinstance(text, bytes):
-            text = text.decode('utf-8', errors='ignore')
-        
-        # Clean text: remove or replace problematic characters
-        # Normalize Unicode characters to composed form
-        text = unicodedata.normalize('NFKC', text)
-        
-        # Remove or replace any remaining problematic characters
-        # Keep only printable characters and common whitespace (newlines, tabs, etc.)
-        # Filter out control characters except newlines, carriage returns, and tabs
-        cleaned_text = []
-        for char in text:
-            cat = unicodedata.category(char)
-            # Keep printable characters, newlines, tabs, carriage returns
-            if cat[0] != 'C' or char in '\n\r\t':
-                cleaned_text.append(char)
-            # Replace other control characters with space
-            elif cat == 'Cc':
-                cleaned_text.append(' ')
-        text = ''.join(cleaned_text)
-        
-        # Ensure text is valid UTF-8
-        text = text.encode('utf-8', errors='ignore').decode('utf-8')
-        
-        # Use binary parameter binding to ensure proper encoding
-        cursor.execute("""
-            INSERT INTO user_documents 
-            (user_id, filename, file_type, extracted_text)
-            VALUES (%s, %s, %s, %s)
-        """, (session['user_id'], filename, file_type, text))
-        document_id = cursor.lastrowid
+            update_document_job(job_id, status='failed', error=f'Error processing file: {str(e)}'[:1000])
+        except Exception as update_error:
+            print(f"Error updating document job {job_id}: {str(update_error)}")
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+DOCUMENT_JOB_INSERT = """
+    INSERT INTO document_jobs (user_id, filename, file_type, status)
+    VALUES (%s, %s, %s, 'queued')
+"""
+
+
+def get_uploaded_file(files):
+    """
+    Validate the 'file' field of an upload form.
+    
+    Returns:
+        tuple: (file, None) if valid, otherwise (None, error_message)
+    """
+    # Check if file is present
+    if 'file' not in files:
+        return None, 'No file uploaded'
+    
+    file = files['file']
+    
+    if file.filename == '':
+        return None, 'No file selected'
+    
+    if not allowed_file(file.filename):
+        return None, 'Invalid file type. Only PDF and TXT files are allowed.'
+    return file, None
+
+
+def save_uploaded_file(file):
+    """
+    Save an uploaded file under a unique name in the uploads folder.
+    
+    Returns:
+        tuple: (file_path, filename, file_type)
+    """
+    # Unique name so concurrent uploads never collide
+    filename = secure_filename(file.filename)
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_{filename}")
+    file.save(file_path)
+    
+    # Determine file type
+    file_ext = filename.rsplit('.', 1)[1].lower()
+    file_type = 'PDF' if file_ext == 'pdf' else 'TEXT'
+    return file_path, filename, file_type
+
+
+@app.route('/api/upload-document', methods=['POST'])
+def upload_document():
+    """
+    API endpoint to upload documents for the AI chatbot.
+    
+    PROCESS:
+    1. Receive uploaded file (PDF or text) and save it to the uploads folder
+    2. Create a job in document_jobs and queue it for background processing
+    3. Return the job ID immediately
+    
+    Text extraction and storage happen in a background worker
+    (process_document_job), so upload latency does not depend on document
+    size. Poll /api/documents/<job_id>/status for progress and the final
+    document_id.
+    
+    Returns:
+        JSON with job_id and status URL
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+    
+    file, error = get_uploaded_file(request.files)
+    if error:
+        return jsonify({'success': False, 'message': error})
+    
+    try:
+        # Save uploaded file
+        file_path, filename, file_type = save_uploaded_file(file)
         
+        # Create ingestion job
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(DOCUMENT_JOB_INSERT, (session['user_id'], filename, file_type))
+        job_id = cursor.lastrowid
         conn.commit()
         cursor.close()
         
-        # Clean up uploaded file
-        os.remove(file_path)
+        document_ingest_executor.submit(
+            process_document_job, job_id, session['user_id'], file_path, filename, file_type
+        )
         
         return jsonify({
             'success': True,
-            'message': f'Document "{filename}" uploaded successfully! You can now ask questions about it.',
-            'document_id': document_id,
+            'message': f'Document "{filename}" uploaded. Processing has started.',
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('document_job_status', job_id=job_id),
             'filename': filename
         })
         
@@ -2462,6 +5051,283 @@ def upload_document():
         return jsonify({'success': False, 'message': f'Error processing file: {str(e)}'})
 
 
+@app.route('/api/documents/<int:job_id>/status', methods=['GET'])
+def document_job_status(job_id):
+    """
+    API endpoint to poll the status of a document ingestion job.
+    
+    Returns:
+        JSON with status ('queued', 'processing', 'done', 'failed'),
+        page progress, and document_id once processing is done
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+    
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, filename, status, pages_done, pages_total, document_id, error
+            FROM document_jobs
+            WHERE id = %s AND user_id = %s
+        """, (job_id, session['user_id']))
+        
+        job = cursor.fetchone()
+        cursor.close()
+        
+        if not job:
+            return jsonify({'success': False, 'message': 'Job not found or access denied'})
+        
+        progress = None
+        if job['pages_total']:
+            progress = round(job['pages_done'] / job['pages_total'] * 100, 1)
+        
+        return jsonify({
+            'success': True,
+            'job_id': job['id'],
+            'filename': job['filename'],
+            'status': job['status'],
+            'pages_done': job['pages_done'],
+            'pages_total': job['pages_total'],
+            'progress': progress,
+            'document_id': job['document_id'],
+            'message': job['error']
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+# ============================================================================
+# DOCUMENT RETRIEVAL (Chunked BM25 Index)
+# ============================================================================
+
+# Characters per stored chunk and number of chunks sent to the AI per question
+DOCUMENT_CHUNK_CHARS = int(os.getenv('DOCUMENT_CHUNK_CHARS', DEFAULT_CHUNK_CHARS))
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', 5))
+# Parsed indexes kept in memory (an index never changes for a given content_id)
+DOCUMENT_INDEX_CACHE_SIZE = int(os.getenv('DOCUMENT_INDEX_CACHE_SIZE', 64))
+# Separator between retrieved chunks in the prompt context
+CHUNK_SEPARATOR = "\n...\n"
+
+_document_index_cache = OrderedDict()
+_document_index_cache_lock = threading.Lock()
+
+
+def index_document_content(cursor, content_id, text):
+    """
+    Split document text into chunks and store them with their BM25 index.
+    
+    Safe to run concurrently for the same content: duplicate rows are ignored.
+    
+    Returns:
+        BM25Index: The new index
+    """
+    chunks = chunk_text(text, DOCUMENT_CHUNK_CHARS)
+    index = BM25Index.build(chunks)
+    
+    if chunks:
+        cursor.executemany("""
+            INSERT IGNORE INTO document_chunks (content_id, chunk_index, compressed_text)
+            VALUES (%s, %s, %s)
+        """, [(content_id, i, compress_document_text(chunk)) for i, chunk in enumerate(chunks)])
+    cursor.execute("""
+        INSERT INTO document_indexes (content_id, chunk_count, index_data)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE content_id = content_id
+    """, (content_id, len(chunks), index.to_bytes()))
+    return index
+
+
+def load_document_index(conn, content_id):
+    """
+    Return the BM25 index for a stored document text, or None if the
+    content does not exist.
+    
+    Indexes are cached in memory (LRU). Texts stored before chunking was
+    introduced are chunked and indexed on first use.
+    """
+    with _document_index_cache_lock:
+        index = _document_index_cache.get(content_id)
+        if index is not None:
+            _document_index_cache.move_to_end(content_id)
+            return index
+    
+    cursor = conn.cursor()
+    cursor.execute("SELECT index_data FROM document_indexes WHERE content_id = %s", (content_id,))
+    row = cursor.fetchone()
+    if row:
+        index = BM25Index.from_bytes(row['index_data'])
+    else:
+        cursor.execute("SELECT compressed_text FROM document_contents WHERE id = %s", (content_id,))
+        row = cursor.fetchone()
+        if not row:
+            cursor.close()
+            return None
+        index = index_document_content(cursor, content_id, decompress_document_text(row['compressed_text']))
+        conn.commit()
+    cursor.close()
+    
+    with _document_index_cache_lock:
+        _document_index_cache[content_id] = index
+        _document_index_cache.move_to_end(content_id)
+        while len(_document_index_cache) > DOCUMENT_INDEX_CACHE_SIZE:
+            _document_index_cache.popitem(last=False)
+    return index
+
+
+def retrieve_document_context(conn, content_id, question, top_k=None, max_chars=None):
+    """
+    Build AI prompt context from the document chunks most relevant to a question.
+    
+    PROCESS:
+    1. Rank chunks with the document's BM25 index
+    2. Fall back to the first chunks when no chunk matches any question word
+    3. Fetch only the selected chunks, keeping the best ones within max_chars
+    4. Join them in document order
+    
+    Returns:
+        str: Context text, or None if the document has no text
+    """
+    top_k = top_k or RETRIEVAL_TOP_K
+    max_chars = max_chars or DOCUMENT_CONTEXT_CHARS
+    
+    index = load_document_index(conn, content_id)
+    if index is None or not index.chunk_count:
+        return None
+    
+    chunk_numbers = [chunk_number for chunk_number, _ in index.search(question, top_k)]
+    if not chunk_numbers:
+        chunk_numbers = list(range(min(top_k, index.chunk_count)))
+    
+    cursor = conn.cursor()
+    placeholders = ', '.join(['%s'] * len(chunk_numbers))
+    cursor.execute(f"""
+        SELECT chunk_index, compressed_text FROM document_chunks
+        WHERE content_id = %s AND chunk_index IN ({placeholders})
+    """, (content_id, *chunk_numbers))
+    texts = {
+        row['chunk_index']: decompress_document_text(row['compressed_text']).strip()
+        for row in cursor.fetchall()
+    }
+    cursor.close()
+    
+    # Keep chunks in rank order until the character budget is used up
+    selected = []
+    total_chars = 0
+    for chunk_number in chunk_numbers:
+        text = texts.get(chunk_number)
+        if not text:
+            continue
+        added_chars = len(text) + (len(CHUNK_SEPARATOR) if selected else 0)
+        if selected and total_chars + added_chars > max_chars:
+            break
+        selected.append(chunk_number)
+        total_chars += added_chars
+    
+    if not selected:
+        return None
+    return CHUNK_SEPARATOR.join(texts[chunk_number] for chunk_number in sorted(selected))
+
+
+class DocumentContextService:
+    """
+    Finds the document a chat question refers to and builds its prompt context.
+    
+    HOW IT WORKS:
+    1. resolve() runs one indexed query that returns the selected document
+       (primary key lookup) or, if none is selected or it is not the user's,
+       their most recent one (idx_user_created range scan) - id, filename,
+       content_id and content hash only, never the document text
+    2. context() ranks chunks with the cached BM25 index and fetches only the
+       chunks that fit in the prompt (retrieve_document_context)
+    
+    Lookup and context times are recorded for /api/metrics.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            'lookups': 0,
+            'selected': 0,
+            'latest': 0,
+            'no_document': 0,
+            'contexts': 0,
+            'total_lookup_ms': 0.0,
+            'total_context_ms': 0.0
+        }
+    
+    def resolve(self, conn, user_id, document_id=None):
+        """
+        Find the selected document, or the user's most recent one.
+        
+        Returns:
+            dict: {id, filename, content_id, content_hash}, or None if the
+                  user has no documents
+        """
+        start = time.perf_counter()
+        cursor = conn.cursor()
+        # Both branches are single index lookups; the selected document wins
+        cursor.execute("""
+            SELECT id, filename, content_id, content_hash, is_selected FROM (
+                (SELECT d.id, d.filename, d.content_id, dc.content_hash, 1 AS is_selected
+                 FROM user_documents d
+                 LEFT JOIN document_contents dc ON dc.id = d.content_id
+                 WHERE d.id = %s AND d.user_id = %s)
+                UNION ALL
+                (SELECT d.id, d.filename, d.content_id, dc.content_hash, 0 AS is_selected
+                 FROM user_documents d
+                 LEFT JOIN document_contents dc ON dc.id = d.content_id
+                 WHERE d.user_id = %s
+                 ORDER BY d.created_at DESC, d.id DESC
+                 LIMIT 1)
+            ) candidates
+            ORDER BY is_selected DESC
+            LIMIT 1
+        """, (document_id or 0, user_id, user_id))
+        doc = cursor.fetchone()
+        cursor.close()
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats['lookups'] += 1
+            self._stats['total_lookup_ms'] += elapsed_ms
+            if doc is None:
+                self._stats['no_document'] += 1
+            elif doc['is_selected']:
+                self._stats['selected'] += 1
+            else:
+                self._stats['latest'] += 1
+        if doc is None:
+            return None
+        return {key: doc[key] for key in ('id', 'filename', 'content_id', 'content_hash')}
+    
+    def context(self, conn, doc, question):
+        """Return prompt context for a question: only the document chunks relevant to it."""
+        if not doc or doc['content_id'] is None:
+            return None
+        start = time.perf_counter()
+        context = retrieve_document_context(conn, doc['content_id'], question)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats['contexts'] += 1
+            self._stats['total_context_ms'] += elapsed_ms
+        return context
+    
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_lookup_ms'] = round(stats['total_lookup_ms'] / stats['lookups'], 3) if stats['lookups'] else 0.0
+        stats['avg_context_ms'] = round(stats['total_context_ms'] / stats['contexts'], 3) if stats['contexts'] else 0.0
+        stats['total_lookup_ms'] = round(stats['total_lookup_ms'], 3)
+        stats['total_context_ms'] = round(stats['total_context_ms'], 3)
+        return stats
+
+
+document_context_service = DocumentContextService()
+
+
 # Removed: get_user_questions route - no longer needed
 
 
@@ -2486,151 +5352,937 @@ def history():
                          name=session.get('name', session.get('username')))
 
 
+# Keyset pagination settings for history endpoints
+HISTORY_DEFAULT_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 100
+
+# Columns returned by the history endpoints
+STUDY_PATTERN_HISTORY_COLUMNS = 'study_date, study_hours, sleep_hours, break_time, screen_time, mood_level, created_at'
+BURNOUT_PREDICTION_HISTORY_COLUMNS = ('study_date, study_hours, sleep_hours, break_time, screen_time, '
+                                      'mood_score, predicted_risk, confidence, created_at')
+
+history_cursor_serializer = URLSafeSerializer(app.secret_key, salt='history-cursor')
+
+
+def encode_history_cursor(direction, row):
+    """Create an opaque, signed cursor token pointing at (study_date, id) of a row."""
+    return history_cursor_serializer.dumps([direction, row['study_date'].isoformat(), row['id']])
+
+
+def decode_history_cursor(token):
+    """
+    Decode a cursor token created by encode_history_cursor.
+    
+    Returns:
+        tuple: (direction, study_date, id)
+    
+    Raises:
+        ValueError: If the token is invalid or was tampered with
+    """
+    try:
+        direction, study_date, row_id = history_cursor_serializer.loads(token)
+        if direction not in ('next', 'prev'):
+            raise ValueError("Invalid cursor direction")
+        return direction, date.fromisoformat(study_date), int(row_id)
+    except (BadSignature, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def history_page_query(table, columns, user_id, cursor_token=None, page_size=HISTORY_DEFAULT_PAGE_SIZE):
+    """
+    Build the keyset query for one history page (see fetch_history_page).
+    
+    Returns:
+        tuple: (sql, params, direction)
+    
+    Raises:
+        ValueError: If cursor_token is invalid
+    """
+    direction = None
+    if cursor_token:
+        direction, cursor_date, cursor_id = decode_history_cursor(cursor_token)
+    
+    if direction is None:
+        sql = f"""
+            SELECT id, {columns}
+            FROM {table}
+            WHERE user_id = %s
+            ORDER BY study_date DESC, id DESC
+            LIMIT %s
+        """
+        params = (user_id, page_size + 1)
+    elif direction == 'next':
+        sql = f"""
+            SELECT id, {columns}
+            FROM {table}
+            WHERE user_id = %s
+              AND (study_date < %s OR (study_date = %s AND id < %s))
+            ORDER BY study_date DESC, id DESC
+            LIMIT %s
+        """
+        params = (user_id, cursor_date, cursor_date, cursor_id, page_size + 1)
+    else:
+        sql = f"""
+            SELECT id, {columns}
+            FROM {table}
+            WHERE user_id = %s
+              AND (study_date > %s OR (study_date = %s AND id > %s))
+            ORDER BY study_date ASC, id ASC
+            LIMIT %s
+        """
+        params = (user_id, cursor_date, cursor_date, cursor_id, page_size + 1)
+    return sql, params, direction
+
+
+def history_page_result(rows, direction, page_size):
+    """Turn the rows fetched by a history_page_query() query into a page with cursors."""
+    rows = list(rows)
+    has_extra = len(rows) > page_size
+    rows = rows[:page_size]
+    
+    if direction == 'prev':
+        # Fetched oldest-first to seek forward; flip back to newest-first
+        rows.reverse()
+        has_older = True
+        has_newer = has_extra
+    else:
+        has_older = has_extra
+        has_newer = direction == 'next'
+    
+    return {
+        'rows': rows,
+        'next_cursor': encode_history_cursor('next', rows[-1]) if rows and has_older else None,
+        'prev_cursor': encode_history_cursor('prev', rows[0]) if rows and has_newer else None
+    }
+
+
+def fetch_history_page(table, columns, user_id, cursor_token=None, page_size=HISTORY_DEFAULT_PAGE_SIZE):
+    """
+    Fetch one page of a user's history using keyset pagination on (study_date, id).
+    
+    HOW IT WORKS:
+    - Rows are ordered newest first by (study_date DESC, id DESC)
+    - A 'next' cursor seeks to rows strictly older than its key
+    - A 'prev' cursor seeks to rows strictly newer than its key
+    - One extra row is fetched to know whether another page exists
+    
+    Unlike OFFSET paging, every page is an index range scan starting at the
+    cursor key, so deep pages cost the same as the first one.
+    
+    Args:
+        table (str): 'study_patterns' or 'burnout_predictions' (never user input)
+        columns (str): Column list to select (never user input)
+        user_id (int): User ID
+        cursor_token (str, optional): Token from a previous page
+        page_size (int): Rows per page (already clamped by the caller)
+    
+    Returns:
+        dict: rows, next_cursor, prev_cursor
+    """
+    sql, params, direction = history_page_query(table, columns, user_id, cursor_token, page_size)
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    
+    return history_page_result(rows, direction, page_size)
+
+
+def get_history_page_size():
+    """Read the requested page size (page_size or legacy limit) and clamp it to the server maximum."""
+    page_size = request.args.get('page_size', type=int)
+    if page_size is None:
+        page_size = request.args.get('limit', HISTORY_DEFAULT_PAGE_SIZE, type=int)
+    return max(1, min(page_size, HISTORY_MAX_PAGE_SIZE))
+
+
 @app.route('/api/history/study-patterns', methods=['GET'])
 def get_study_patterns_history():
     """
-    API endpoint to retrieve user's study pattern history.
+    API endpoint to retrieve user's study pattern history, one page at a time.
+    
+    Query Parameters:
+    - page_size (or limit): Rows per page (max HISTORY_MAX_PAGE_SIZE)
+    - cursor (optional): next_cursor / prev_cursor from a previous response
+    
+    Returns:
+        JSON with patterns, count, next_cursor and prev_cursor
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+    
+    try:
+        page = fetch_history_page(
+            'study_patterns',
+            STUDY_PATTERN_HISTORY_COLUMNS,
+            session['user_id'],
+            request.args.get('cursor'),
+            get_history_page_size()
+        )
+        
+        return jsonify({
+            'success': True,
+            'patterns': page['rows'],
+            'count': len(page['rows']),
+            'next_cursor': page['next_cursor'],
+            'prev_cursor': page['prev_cursor']
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+@app.route('/api/history/burnout-predictions', methods=['GET'])
+def get_burnout_predictions_history():
+    """
+    API endpoint to retrieve user's burnout prediction history, one page at a time.
+    
+    Query Parameters:
+    - page_size (or limit): Rows per page (max HISTORY_MAX_PAGE_SIZE)
+    - cursor (optional): next_cursor / prev_cursor from a previous response
+    
+    Returns:
+        JSON with predictions, count, next_cursor and prev_cursor
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+    
+    try:
+        page = fetch_history_page(
+            'burnout_predictions',
+            BURNOUT_PREDICTION_HISTORY_COLUMNS,
+            session['user_id'],
+            request.args.get('cursor'),
+            get_history_page_size()
+        )
+        
+        return jsonify({
+            'success': True,
+            'predictions': page['rows'],
+            'count': len(page['rows']),
+            'next_cursor': page['next_cursor'],
+            'prev_cursor': page['prev_cursor']
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+# Removed: get_generated_questions_history route - no longer needed (old question generator removed)
+    """
+    API endpoint to retrieve user's generated questions history.
     
-    Returns all study pattern entries for the logged-in user.
+    Returns all generated questions for the logged-in user.
     """
     if not is_authenticated():
         return jsonify({'success': False, 'message': 'Authentication required'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         limit = request.args.get('limit', 100, type=int)
         
         cursor.execute("""
-            SELECT study_date, study_hours, sleep_hours, break_time, 
-                   screen_time, mood_level, created_at
-            FROM study_patterns
+            SELECT id, source_filename, source_type, question_text, 
+                   question_type, topic_keywords, created_at
+            FROM generated_questions
             WHERE user_id = %s
-            ORDER BY study_date DESC
+            ORDER BY created_at DESC
             LIMIT %s
         """, (session['user_id'], limit))
         
-        patterns = cursor.fetchall()
+        questions = cursor.fetchall()
         cursor.close()
         
         return jsonify({
             'success': True,
-            'patterns': patterns,
-            'count': len(patterns)
+            'questions': questions,
+            'count': len(questions)
         })
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
 
-@app.route('/api/history/burnout-predictions', methods=['GET'])
-def get_burnout_predictions_history():
+# ============================================================================
+# DATA EXPORT (Streaming CSV / NDJSON)
+# ============================================================================
+
+# Column lists per exportable dataset (fixed - never taken from user input)
+EXPORT_DATASETS = {
+    'study_patterns': (
+        'study_patterns',
+        ['study_date', 'study_hours', 'sleep_hours', 'break_time', 'screen_time', 'mood_level', 'created_at'],
+        'study_date, id'
+    ),
+    'burnout_predictions': (
+        'burnout_predictions',
+        ['study_date', 'study_hours', 'sleep_hours', 'break_time', 'screen_time',
+         'mood_score', 'predicted_risk', 'confidence', 'created_at'],
+        'study_date, id'
+    ),
+    'academic_performance': (
+        'academic_performance',
+        ['class_semester', 'exam_name', 'subject_name', 'marks_scored', 'total_marks', 'created_at'],
+        'class_semester, exam_name, subject_name, id'
+    )
+}
+EXPORT_BATCH_SIZE = 500  # Rows pulled from the server-side cursor per round
+
+
+def export_value(value):
+    """Convert a database value to a plain JSON/CSV-friendly value."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def iter_export_rows(dataset, user_id):
+    """
+    Yield a user's rows for one dataset using a server-side (unbuffered) cursor.
+    
+    SSDictCursor streams rows from MySQL instead of loading the whole result
+    into memory, and rows are pulled EXPORT_BATCH_SIZE at a time, so memory
+    use stays constant regardless of how many rows the user has.
+    
+    The generator checks out its own pooled connection because it keeps
+    running after the view function has returned.
+    """
+    table, columns, order_by = EXPORT_DATASETS[dataset]
+    
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(MySQLdb.cursors.SSDictCursor)
+        try:
+            cursor.execute(f"""
+                SELECT {', '.join(columns)}
+                FROM {table}
+                WHERE user_id = %s
+                ORDER BY {order_by}
+            """, (user_id,))
+            
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            # Closing an unbuffered cursor drains any unread rows
+            cursor.close()
+
+
+def generate_csv_export(dataset, user_id):
+    """Stream one dataset as CSV, one chunk per batch of rows."""
+    columns = EXPORT_DATASETS[dataset][1]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    writer.writerow(columns)
+    count = 0
+    for row in iter_export_rows(dataset, user_id):
+        writer.writerow([export_value(row[column]) for column in columns])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    yield buffer.getvalue()
+
+
+def generate_ndjson_export(datasets, user_id):
+    """Stream one or more datasets as newline-delimited JSON (one object per line)."""
+    for dataset in datasets:
+        chunk = []
+        for row in iter_export_rows(dataset, user_id):
+            record = {'dataset': dataset}
+            record.update({column: export_value(value) for column, value in row.items()})
+            chunk.append(json.dumps(record, ensure_ascii=False))
+            if len(chunk) >= EXPORT_BATCH_SIZE:
+                yield '\n'.join(chunk) + '\n'
+                chunk = []
+        if chunk:
+            yield '\n'.join(chunk) + '\n'
+
+
+@app.route('/api/export', methods=['GET'])
+def export_data():
+    """
+    API endpoint to download a user's full history as a streamed file.
+    
+    Query Parameters:
+    - format: 'csv' (default) or 'ndjson'
+    - dataset: 'study_patterns' (default), 'burnout_predictions',
+      'academic_performance', or 'all' (ndjson only)
+    
+    The response is streamed, so exports of any size start immediately and
+    never buffer the full result in the worker.
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+    
+    export_format = request.args.get('format', 'csv').lower()
+    dataset = request.args.get('dataset', 'study_patterns')
+    user_id = session['user_id']
+    
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'message': "format must be 'csv' or 'ndjson'"})
+    
+    if dataset == 'all':
+        if export_format == 'csv':
+            return jsonify({'success': False, 'message': "dataset 'all' is only available with format=ndjson"})
+        datasets = list(EXPORT_DATASETS)
+    elif dataset in EXPORT_DATASETS:
+        datasets = [dataset]
+    else:
+        return jsonify({'success': False, 'message': 'Invalid dataset'})
+    
+    filename = f"learnsmart_{dataset}_{date.today().isoformat()}.{export_format}"
+    
+    if export_format == 'csv':
+        body = generate_csv_export(dataset, user_id)
+        mimetype = 'text/csv'
+    else:
+        body = generate_ndjson_export(datasets, user_id)
+        mimetype = 'application/x-ndjson'
+    
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+# ============================================================================
+# AI CHATBOT MODULE - Google Gemini
+# ============================================================================
+
+# Characters of document text included in the prompt
+DOCUMENT_CONTEXT_CHARS = 8000
+
+# LLM backend used by the chatbot: 'gemini' (Google Gemini API) or 'stub'
+# (offline stand-in with simulated latency, for load tests and air-gapped setups)
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'gemini').lower()
+# Stub backend: delay before the first token, tokens per second, response length
+LLM_STUB_LATENCY_MS = float(os.getenv('LLM_STUB_LATENCY_MS', 300))
+LLM_STUB_TOKENS_PER_SECOND = float(os.getenv('LLM_STUB_TOKENS_PER_SECOND', 50))
+LLM_STUB_RESPONSE_TOKENS = int(os.getenv('LLM_STUB_RESPONSE_TOKENS', 120))
+
+# Seconds a discovered model list is reused before calling genai.list_models() again
+GEMINI_MODEL_CACHE_TTL = int(os.getenv('GEMINI_MODEL_CACHE_TTL', 3600))
+# Models tried in order when the model list cannot be fetched
+GEMINI_FALLBACK_MODELS = ['gemini-1.5-flash', 'gemini-1.0-pro', 'gemini-pro']
+
+
+def is_model_not_found_error(error):
+    """Return True if a Gemini error means the model is not available (404)."""
+    error_msg = str(error)
+    return "404" in error_msg or "not found" in error_msg.lower()
+
+
+class LLMProvider(abc.ABC):
+    """
+    Interface for chatbot language model backends.
+    
+    Subclasses must implement stream() (a provider without it can't be
+    instantiated); generate() and the metrics/health hooks have defaults.
+    Select the backend with the LLM_PROVIDER setting.
+    """
+    
+    name = 'base'
+    
+    def generate(self, prompt):
+        """Return the full response text for a prompt."""
+        return ''.join(self.stream(prompt)).strip()
+    
+    @abc.abstractmethod
+    def stream(self, prompt):
+        """Yield response text in pieces as they are produced."""
+    
+    async def agenerate(self, prompt):
+        """Async version of generate() (used by the ASGI entrypoint, asgi.py)."""
+        return ''.join([piece async for piece in self.astream(prompt)]).strip()
+    
+    async def astream(self, prompt):
+        """
+        Async version of stream(). The default reads stream() in the event
+        loop's (bounded) default executor; backends with a native async
+        client override it so no thread is held while waiting for the model.
+        """
+        pieces = self.stream(prompt)
+        end = object()
+        while (piece := await asyncio.to_thread(next, pieces, end)) is not end:
+            yield piece
+    
+    def health(self):
+        """Return a dict describing whether the backend is usable (no network calls)."""
+        return {'provider': self.name, 'status': 'ok'}
+    
+    def model_id(self):
+        """Return an identifier for the model currently answering (used in cache keys)."""
+        return self.name
+    
+    def stats(self):
+        """Return backend-specific performance counters for /api/metrics."""
+        return {}
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Process-wide Google Gemini backend.
+    
+    - genai.configure() runs once per API key instead of once per message
+    - Model discovery (genai.list_models()) is cached for model_ttl seconds
+    - Models that return 404 are remembered and skipped until the next
+      discovery, so the fallback chain is walked at most once
+    - Model selection time is recorded and reported by /api/metrics
+    """
+    
+    name = 'gemini'
+    
+    def __init__(self, model_ttl=GEMINI_MODEL_CACHE_TTL, fallback_models=GEMINI_FALLBACK_MODELS):
+        self.model_ttl = model_ttl
+        self.fallback_models = list(fallback_models)
+        self._lock = threading.Lock()
+        # Held (without _lock) while genai.list_models() runs, so only one
+        # thread discovers and other requests are never blocked behind it
+        self._discovery_lock = threading.Lock()
+        self._genai = None
+        self._api_key = None
+        self._candidates = []
+        self._unavailable = set()
+        self._models = {}
+        self._discovered_at = None
+        self._stats = {
+            'selections': 0,
+            'discoveries': 0,
+            'models_marked_unavailable': 0,
+            'total_selection_ms': 0.0,
+            'max_selection_ms': 0.0,
+            'last_selection_ms': None,
+            'last_discovery_ms': None
+        }
+    
+    def _ensure_configured(self, api_key):
+        # Called with the lock held; the import raises ImportError if the library is missing
+        if self._genai is None:
+            import google.generativeai as genai
+            self._genai = genai
+        if api_key != self._api_key:
+            self._genai.configure(api_key=api_key)
+            self._api_key = api_key
+            self._discovered_at = None
+    
+    def _needs_discovery(self, allow_discovery):
+        # Called with the lock held
+        expired = self._discovered_at is None or time.monotonic() - self._discovered_at > self.model_ttl
+        return expired and (allow_discovery or not self._candidates)
+    
+    def _list_models(self, genai):
+        # Network call - runs WITHOUT the lock held
+        try:
+            available_models = [
+                m.name.split('/')[-1]  # Extract just the model name
+                for m in genai.list_models()
+                if 'generateContent' in m.supported_generation_methods
+            ]
+            print(f"Available models: {available_models}")
+            return available_models or [self.fallback_models[0]]
+        except Exception as list_error:
+            print(f"Could not list models: {list_error}")
+            return list(self.fallback_models)
+    
+    def _discover(self, allow_discovery):
+        """
+        Refresh the model list if it is still stale once the discovery lock
+        is held (double-checked). list_models() runs outside self._lock and
+        the result is published under it. Threads that already have a
+        (stale) model list don't wait for a running discovery.
+        """
+        with self._lock:
+            has_candidates = bool(self._candidates)
+        if not self._discovery_lock.acquire(blocking=not has_candidates):
+            return
+        try:
+            with self._lock:
+                if not self._needs_discovery(allow_discovery):
+                    return
+                genai, api_key = self._genai, self._api_key
+            
+            start = time.perf_counter()
+            candidates = self._list_models(genai)
+            
+            with self._lock:
+                if api_key != self._api_key:
+                    return  # Reconfigured meanwhile; the next request discovers again
+                self._candidates = candidates
+                self._unavailable = set()
+                self._models = {}
+                self._discovered_at = time.monotonic()
+                self._stats['discoveries'] += 1
+                self._stats['last_discovery_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        finally:
+            self._discovery_lock.release()
+    
+    def select_model(self, api_key, allow_discovery=True):
+        """
+        Return (model_name, GenerativeModel) for the first candidate model not
+        known to be unavailable, or (None, None) if every candidate failed.
+        
+        allow_discovery=False keeps the current model list even if it has
+        expired (used while walking the fallback chain).
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self._ensure_configured(api_key)
+            needs_discovery = self._needs_discovery(allow_discovery)
+        if needs_discovery:
+            self._discover(allow_discovery)
+        
+        with self._lock:
+            model_name = next((name for name in self._candidates if name not in self._unavailable), None)
+            model = None
+            if model_name is None:
+                # Every model failed: rediscover on the next request
+                self._discovered_at = None
+            else:
+                model = self._models.get(model_name)
+                if model is None:
+                    model = self._models[model_name] = self._genai.GenerativeModel(model_name)
+            
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._stats['selections'] += 1
+            self._stats['total_selection_ms'] += elapsed_ms
+            self._stats['max_selection_ms'] = max(self._stats['max_selection_ms'], elapsed_ms)
+            self._stats['last_selection_ms'] = round(elapsed_ms, 3)
+        return model_name, model
+    
+    def mark_unavailable(self, model_name):
+        """Skip a model (it returned 404) until the next discovery."""
+        with self._lock:
+            if model_name not in self._unavailable:
+                self._unavailable.add(model_name)
+                self._stats['models_marked_unavailable'] += 1
+    
+    def _require_api_key(self):
+        gemini_api_key = os.getenv('GEMINI_API_KEY')
+        if not gemini_api_key:
+            raise ValueError("Gemini API key not configured. Please set GEMINI_API_KEY in .env file. Get your free key at: https://makersuite.google.com/app/apikey")
+        return gemini_api_key
+    
+    @staticmethod
+    def _no_model_error(last_error):
+        return Exception(f"Could not access any Gemini models. Error: {str(last_error)}. Please verify your API key at https://makersuite.google.com/app/apikey")
+    
+    def _with_fallback(self, call):
+        """
+        Run call(model) on the selected model, walking the fallback chain on
+        404 errors. call may only raise a 404 before producing any output.
+        """
+        api_key = self._require_api_key()
+        last_error = None
+        while True:
+            # Discover at most once per call, so each 404 shortens the chain
+            model_name, model = self.select_model(api_key, allow_discovery=last_error is None)
+            if model is None:
+                raise self._no_model_error(last_error)
+            try:
+                return call(model)
+            except Exception as e:
+                if not is_model_not_found_error(e):
+                    raise
+                print(f"Model {model_name} not available, trying next...")
+                last_error = e
+                self.mark_unavailable(model_name)
+    
+    async def _awith_fallback(self, call):
+        """Async version of _with_fallback(); call(model) is a coroutine function."""
+        api_key = self._require_api_key()
+        last_error = None
+        while True:
+            # Selection may call genai.list_models(), so it runs off the event loop
+            model_name, model = await asyncio.to_thread(self.select_model, api_key, last_error is None)
+            if model is None:
+                raise self._no_model_error(last_error)
+            try:
+                return await call(model)
+            except Exception as e:
+                if not is_model_not_found_error(e):
+                    raise
+                print(f"Model {model_name} not available, trying next...")
+                last_error = e
+                self.mark_unavailable(model_name)
+    
+    def generate(self, prompt):
+        """Generate a full response (one request)."""
+        return self._with_fallback(lambda model: model.generate_content(prompt).text.strip())
+    
+    def stream(self, prompt):
+        """Yield response text chunks as Gemini streams them."""
+        def start_stream(model):
+            # Pull the first chunk here so a 404 still falls back to the next model
+            chunks = iter(model.generate_content(prompt, stream=True))
+            first = next(chunks, None)
+            return first, chunks
+        
+        first, chunks = self._with_fallback(start_stream)
+        if first is not None:
+            yield first.text
+        for chunk in chunks:
+            yield chunk.text
+    
+    async def agenerate(self, prompt):
+        """Generate a full response with the async Gemini client."""
+        async def call(model):
+            response = await model.generate_content_async(prompt)
+            return response.text.strip()
+        
+        return await self._awith_fallback(call)
+    
+    async def astream(self, prompt):
+        """Yield response text chunks from the async Gemini client."""
+        async def start_stream(model):
+            chunks = (await model.generate_content_async(prompt, stream=True)).__aiter__()
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = None
+            return first, chunks
+        
+        first, chunks = await self._awith_fallback(start_stream)
+        if first is not None:
+            yield first.text
+        async for chunk in chunks:
+            yield chunk.text
+    
+    def model_id(self):
+        with self._lock:
+            current_model = next((name for name in self._candidates if name not in self._unavailable), None)
+        return f"{self.name}:{current_model}" if current_model else self.name
+    
+    def health(self):
+        try:
+            import google.generativeai  # noqa: F401
+            library_installed = True
+        except ImportError:
+            library_installed = False
+        configured = bool(os.getenv('GEMINI_API_KEY'))
+        with self._lock:
+            current_model = next((name for name in self._candidates if name not in self._unavailable), None)
+        return {
+            'provider': self.name,
+            'status': 'ok' if library_installed and configured else 'unavailable',
+            'library_installed': library_installed,
+            'api_key_configured': configured,
+            'current_model': current_model
+        }
+    
+    def stats(self):
+        """Return model selection metrics and the currently selected model."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['current_model'] = next(
+                (name for name in self._candidates if name not in self._unavailable), None
+            )
+            stats['unavailable_models'] = sorted(self._unavailable)
+            stats['model_list_age_s'] = (
+                round(time.monotonic() - self._discovered_at, 1) if self._discovered_at is not None else None
+            )
+        stats['avg_selection_ms'] = round(stats['total_selection_ms'] / stats['selections'], 3) if stats['selections'] else 0.0
+        stats['total_selection_ms'] = round(stats['total_selection_ms'], 3)
+        stats['max_selection_ms'] = round(stats['max_selection_ms'], 3)
+        return stats
+
+
+class StubLLMProvider(LLMProvider):
     """
-    API endpoint to retrieve user's burnout prediction history.
+    Offline stand-in for a real language model.
     
-    Returns all burnout predictions for the logged-in user.
+    Produces a deterministic response for each prompt (same prompt, same
+    text) after latency_ms, then emits tokens at tokens_per_second. Lets the
+    chat pipeline be load-tested and benchmarked without network access or
+    API quota.
     """
-    if not is_authenticated():
-        return jsonify({'success': False, 'message': 'Authentication required'})
     
-    try:
-        conn = mysql.connect
-        cursor = conn.cursor()
-        
-        limit = request.args.get('limit', 100, type=int)
-        
-        cursor.execute("""
-            SELECT study_date, study_hours, sleep_hours, break_time, 
-                   screen_time, mood_score, predicted_risk, confidence, created_at
-            FROM burnout_predictions
-            WHERE user_id = %s
-            ORDER BY study_date DESC
-            LIMIT %s
-        """, (session['user_id'], limit))
-        
-        predictions = cursor.fetchall()
-        cursor.close()
-        
-        return jsonify({
-            'success': True,
-            'predictions': predictions,
-            'count': len(predictions)
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
+    name = 'stub'
+    
+    WORDS = ('study', 'notes', 'chapter', 'concept', 'example', 'summary', 'review',
+             'practice', 'definition', 'key', 'point', 'exam', 'topic', 'method')
+    
+    def __init__(self, latency_ms=LLM_STUB_LATENCY_MS, tokens_per_second=LLM_STUB_TOKENS_PER_SECOND,
+                 response_tokens=LLM_STUB_RESPONSE_TOKENS):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'tokens': 0}
+    
+    def _tokens(self, prompt):
+        rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+        return ['**Stub response**\n\n'] + [rng.choice(self.WORDS) + ' ' for _ in range(self.response_tokens)]
+    
+    def stream(self, prompt):
+        with self._lock:
+            self._stats['requests'] += 1
+        time.sleep(self.latency_ms / 1000)
+        delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for token in self._tokens(prompt):
+            if delay:
+                time.sleep(delay)
+            with self._lock:
+                self._stats['tokens'] += 1
+            yield token
+    
+    async def astream(self, prompt):
+        with self._lock:
+            self._stats['requests'] += 1
+        await asyncio.sleep(self.latency_ms / 1000)
+        delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for token in self._tokens(prompt):
+            if delay:
+                await asyncio.sleep(delay)
+            with self._lock:
+                self._stats['tokens'] += 1
+            yield token
+    
+    def health(self):
+        return {
+            'provider': self.name,
+            'status': 'ok',
+            'latency_ms': self.latency_ms,
+            'tokens_per_second': self.tokens_per_second
+        }
+    
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
 
 
-# Removed: get_generated_questions_history route - no longer needed (old question generator removed)
+def create_llm_provider():
+    """Create the chatbot language model backend selected by LLM_PROVIDER."""
+    if LLM_PROVIDER == 'stub':
+        return StubLLMProvider()
+    if LLM_PROVIDER != 'gemini':
+        print(f"Warning: Unknown LLM_PROVIDER '{LLM_PROVIDER}'. Using gemini.")
+    return GeminiProvider()
+
+
+llm_provider = create_llm_provider()
+
+
+
+# Bump when build_chat_prompt or the retrieval settings change, so answers
+# cached for the old prompt are not reused
+CHAT_PROMPT_VERSION = 1
+
+# Cached chat answers (0 disables the cache) and seconds before they expire
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv('CHAT_CACHE_MAX_ENTRIES', 1000))
+CHAT_CACHE_TTL = int(os.getenv('CHAT_CACHE_TTL', 3600))
+
+
+def normalize_question(question):
     """
-    API endpoint to retrieve user's generated questions history.
+    Normalize a question for cache lookups.
     
-    Returns all generated questions for the logged-in user.
+    Only case, runs of whitespace and trailing ?/!/. are ignored; operators,
+    digits and inner punctuation are kept, so "5+3" and "5-3" or "2.5" and
+    "25" never share a cached answer.
     """
-    if not is_authenticated():
-        return jsonify({'success': False, 'message': 'Authentication required'})
+    return ' '.join(question.casefold().split()).rstrip('?!. ')
+
+
+class ChatResponseCache:
+    """
+    In-process LRU cache of AI answers with TTL and hit-rate counters.
     
-    try:
-        conn = mysql.connect
-        cursor = conn.cursor()
-        
-        limit = request.args.get('limit', 100, type=int)
-        
-        cursor.execute("""
-            SELECT id, source_filename, source_type, question_text, 
-                   question_type, topic_keywords, created_at
-            FROM generated_questions
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-            LIMIT %s
-        """, (session['user_id'], limit))
-        
-        questions = cursor.fetchall()
-        cursor.close()
-        
-        return jsonify({
-            'success': True,
-            'questions': questions,
-            'count': len(questions)
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': str(e)})
+    Keys are (normalized question, document content hash, prompt version,
+    model), so identical questions about the same shared document reuse
+    one answer, while a new document version, prompt template or model
+    never returns a stale answer.
+    """
+    
+    def __init__(self, max_entries=CHAT_CACHE_MAX_ENTRIES, ttl=CHAT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'stores': 0, 'evictions': 0, 'expired': 0}
+    
+    @staticmethod
+    def make_key(question, content_hash, model_id):
+        return (normalize_question(question), content_hash or '', CHAT_PROMPT_VERSION, model_id)
+    
+    def get(self, key):
+        """Return the cached answer for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                del self._entries[key]
+                self._stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+    
+    def bypass(self):
+        """Count a request that opted out of reading the cache."""
+        with self._lock:
+            self._stats['bypassed'] += 1
+    
+    def set(self, key, answer):
+        if self.max_entries <= 0 or not answer:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+    
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['max_entries'] = self.max_entries
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
 
 
-# AI CHATBOT MODULE - Google Gemini
-# ============================================================================
+chat_response_cache = ChatResponseCache()
 
-def get_ai_response(question, document_text=None):
+
+def build_chat_prompt(question, document_text=None):
     """
-    Get AI response using Google Gemini API.
+    Build the chatbot prompt for a question, with optional document context.
     
     Args:
         question (str): User's question
         document_text (str, optional): Document content for context
     
     Returns:
-        str: AI-generated response
+        str: Prompt text
     """
-    gemini_api_key = os.getenv('GEMINI_API_KEY')
-    
-    if not gemini_api_key:
-        raise ValueError("Gemini API key not configured. Please set GEMINI_API_KEY in .env file. Get your free key at: https://makersuite.google.com/app/apikey")
+    # Prepare context from document (use up to 8000 characters for better context)
+    context = ""
+    if document_text:
+        if len(document_text) > DOCUMENT_CONTEXT_CHARS:
+            context = document_text[:DOCUMENT_CONTEXT_CHARS] + "..."
+        else:
+            context = document_text
     
-    try:
-        # Use the stable google.generativeai package (deprecated but more reliable)
-        import google.generativeai as genai
-        genai.configure(api_key=gemini_api_key)
-        
-        # Prepare context from document (use up to 8000 characters for better context)
-        context = ""
-        if document_text:
-            context = document_text[:8000] + "..." if len(document_text) > 8000 else document_text
-        
-        # Create prompt
-        if context:
-            prompt = f"""You are an AI assistant helping students understand their course materials.
+    # Create prompt
+    if context:
+        prompt = f"""You are an AI assistant helping students understand their course materials.
 Answer questions based on the provided document context. Your responses must be clearly structured and well-formatted.
 
 IMPORTANT FORMATTING REQUIREMENTS:
@@ -2653,8 +6305,8 @@ Document Context:
 Question: {question}
 
 Provide a clear, well-structured, and helpful answer based on the document context:"""
-        else:
-            prompt = f"""You are an AI assistant helping students understand their course materials.
+    else:
+        prompt = f"""You are an AI assistant helping students understand their course materials.
 Your responses must be clearly structured and well-formatted.
 
 IMPORTANT FORMATTING REQUIREMENTS:
@@ -2672,45 +6324,25 @@ IMPORTANT FORMATTING REQUIREMENTS:
 Question: {question}
 
 Provide a clear, well-structured, and helpful answer:"""
-        
-        # List available models first to see what's accessible
-        try:
-            available_models = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
-            print(f"Available models: {available_models}")
-            
-            # Try to find a working model
-            if available_models:
-                # Use the first available model
-                model_name = available_models[0].split('/')[-1]  # Extract just the model name
-                print(f"Using model: {model_name}")
-            else:
-                # Fallback to common model names
-                model_name = 'gemini-1.5-flash'
-        except Exception as list_error:
-            print(f"Could not list models: {list_error}")
-            # Fallback to trying common model names
-            model_names = ['gemini-1.5-flash', 'gemini-1.0-pro', 'gemini-pro']
-            last_error = None
-            for model_name in model_names:
-                try:
-                    model = genai.GenerativeModel(model_name)
-                    response = model.generate_content(prompt)
-                    return response.text.strip()
-                except Exception as e:
-                    last_error = e
-                    error_msg = str(e)
-                    if "404" in error_msg or "not found" in error_msg.lower():
-                        print(f"Model {model_name} not available, trying next...")
-                        continue
-                    raise
-            if last_error:
-                raise Exception(f"Could not access any Gemini models. Error: {str(last_error)}. Please verify your API key at https://makersuite.google.com/app/apikey")
-            return
-        
-        # Use the selected model
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
-        return response.text.strip()
+    return prompt
+
+
+def get_ai_response(question, document_text=None):
+    """
+    Get AI response from the configured language model backend (LLM_PROVIDER).
+    
+    Args:
+        question (str): User's question
+        document_text (str, optional): Document content for context
+    
+    Returns:
+        str: AI-generated response
+    """
+    try:
+        prompt = build_chat_prompt(question, document_text)
+        # The Gemini backend uses the stable google.generativeai package (deprecated
+        # but more reliable); its client and model selection are cached across requests
+        return llm_provider.generate(prompt)
         
     except ImportError:
         raise ImportError("Google Generative AI library not installed. Run: pip install google-generativeai")
@@ -2743,7 +6375,7 @@ def chatbot():
         return redirect(url_for('login'))
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get user's uploaded documents
@@ -2800,7 +6432,7 @@ def get_academic_performance():
         return jsonify({'success': False, 'message': 'Authentication required'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get all academic performance records for the user
@@ -2885,7 +6517,7 @@ def add_academic_performance():
         return jsonify({'success': False, 'message': 'Invalid number format'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         # Insert new record
@@ -2916,7 +6548,7 @@ def delete_academic_performance(record_id):
         return jsonify({'success': False, 'message': 'Authentication required'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         # Check if record exists and belongs to user
@@ -2949,6 +6581,297 @@ def delete_academic_performance(record_id):
         return jsonify({'success': False, 'message': str(e)})
 
 
+def chat_cache_requested(data):
+    """
+    Whether a chat request may be answered from the response cache.
+    
+    Clients opt out with "cache": false in the JSON body or a
+    "Cache-Control: no-cache" header; the fresh answer still replaces the
+    cached one.
+    """
+    if data.get('cache') is False:
+        return False
+    return 'no-cache' not in request.headers.get('Cache-Control', '').lower()
+
+
+def prepare_chat_answer(conn, user_id, document_id, question, use_cache=True):
+    """
+    Resolve the document for a chat question and look up a cached answer.
+    
+    Returns:
+        dict: document_id (the document actually used), cache_key,
+              cached_answer (None on a miss or when use_cache is False) and
+              context (retrieved document text; only computed on a miss)
+    """
+    doc = document_context_service.resolve(conn, user_id, document_id)
+    if doc:
+        # Get the document_id for storage
+        document_id = doc['id']
+    
+    # Identical questions about the same document content are answered from cache
+    cache_key = chat_response_cache.make_key(question, doc['content_hash'] if doc else None, llm_provider.model_id())
+    cached_answer = None
+    if use_cache:
+        cached_answer = chat_response_cache.get(cache_key)
+    else:
+        chat_response_cache.bypass()
+    
+    context = None
+    if cached_answer is None:
+        context = document_context_service.context(conn, doc, question)
+    return {'document_id': document_id, 'cache_key': cache_key, 'cached_answer': cached_answer, 'context': context}
+
+
+CHAT_CONVERSATION_INSERT = """
+    INSERT INTO chat_conversations
+    (user_id, document_id, user_message, ai_response)
+    VALUES (%s, %s, %s, %s)
+"""
+
+
+# Conversations waiting to be written (0 = write every conversation synchronously)
+CHAT_WRITE_QUEUE_SIZE = int(os.getenv('CHAT_WRITE_QUEUE_SIZE', 1000))
+# Conversations per INSERT batch, and seconds a queued conversation may wait for a batch to fill
+CHAT_WRITE_BATCH_SIZE = int(os.getenv('CHAT_WRITE_BATCH_SIZE', 50))
+CHAT_WRITE_FLUSH_INTERVAL = float(os.getenv('CHAT_WRITE_FLUSH_INTERVAL', 1.0))
+# Retries on a fresh pooled connection when the database connection fails,
+# and the first retry delay in seconds (doubled for each further retry)
+CHAT_WRITE_RETRIES = int(os.getenv('CHAT_WRITE_RETRIES', 3))
+CHAT_WRITE_RETRY_DELAY = float(os.getenv('CHAT_WRITE_RETRY_DELAY', 0.5))
+
+
+class ChatConversationWriter:
+    """
+    Write-behind queue for chat_conversations inserts.
+    
+    HOW IT WORKS:
+    1. enqueue() puts a conversation on a bounded queue and returns at once,
+       so the chat response does not wait for an INSERT and commit
+    2. A background thread writes queued conversations with one executemany()
+       and one commit per batch, when batch_size rows are waiting or
+       flush_interval seconds after the first row of a batch arrived
+    3. When the queue is full, enqueue() returns False and the caller writes
+       synchronously (nothing is dropped)
+    4. close() - registered with atexit - stops accepting rows and writes
+       everything still queued before the process exits
+    
+    If a batch fails, its rows are retried one by one so a single bad row
+    cannot lose the others. If the connection itself fails, the rows not yet
+    committed are retried on a fresh pooled connection (up to retries
+    times, with backoff) before they count as failed. Queue depth and flush
+    times are recorded for /api/metrics.
+    """
+    
+    def __init__(self, max_queue=CHAT_WRITE_QUEUE_SIZE, batch_size=CHAT_WRITE_BATCH_SIZE,
+                 flush_interval=CHAT_WRITE_FLUSH_INTERVAL, retries=CHAT_WRITE_RETRIES,
+                 retry_delay=CHAT_WRITE_RETRY_DELAY):
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'queue_full': 0,
+            'failed': 0,
+            'connection_retries': 0,
+            'max_queue_depth': 0,
+            'total_flush_ms': 0.0,
+            'last_flush_ms': None
+        }
+    
+    def enqueue(self, user_id, document_id, question, ai_response):
+        """
+        Queue one conversation for a batched write.
+        
+        Returns:
+            bool: False if the caller must write it synchronously (write-behind
+                  disabled, queue full or writer closed)
+        """
+        if self.max_queue <= 0:
+            return False
+        # Checked and queued under the lock, so no row can land behind close()'s end marker
+        with self._lock:
+            if self._closed:
+                return False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='chat-writer', daemon=True)
+                self._thread.start()
+            try:
+                self._queue.put_nowait((user_id, document_id, question, ai_response))
+            except queue.Full:
+                self._stats['queue_full'] += 1
+                return False
+            self._stats['enqueued'] += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queue.qsize())
+        return True
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                return
+    
+    def _write_on(self, conn, rows, counts):
+        """
+        Write rows on one connection, removing each row from the list once it
+        is committed (counts['written']) or rejected by the database
+        (counts['rejected']).
+        
+        Raises if the connection fails; the rows left in the list were not saved.
+        """
+        cursor = conn.cursor()
+        try:
+            try:
+                cursor.executemany(CHAT_CONVERSATION_INSERT, rows)
+                conn.commit()
+                counts['written'] += len(rows)
+                rows.clear()
+                return
+            except Exception as e:
+                # Raises here if the connection is gone, so the batch is retried whole
+                conn.rollback()
+                conn.ping()
+                print(f"Chat batch write failed ({len(rows)} rows), retrying one by one: {str(e)}")
+            while rows:
+                try:
+                    cursor.execute(CHAT_CONVERSATION_INSERT, rows[0])
+                    conn.commit()
+                    counts['written'] += 1
+                except Exception as row_error:
+                    conn.rollback()
+                    conn.ping()
+                    counts['rejected'] += 1
+                    print(f"Chat conversation for user {rows[0][0]} could not be saved: {str(row_error)}")
+                rows.pop(0)
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+    
+    def _write(self, rows):
+        start = time.perf_counter()
+        rows = list(rows)
+        counts = {'written': 0, 'rejected': 0}
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self._lock:
+                    self._stats['connection_retries'] += 1
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+            try:
+                with db_pool.connection() as conn:
+                    self._write_on(conn, rows, counts)
+                break
+            except Exception as e:
+                # _write_on removed every committed row, so only unsaved rows are retried
+                print(f"Chat batch write failed, database connection error "
+                      f"(attempt {attempt + 1}/{self.retries + 1}, {len(rows)} rows unsaved): {str(e)}")
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['written'] += counts['written']
+            # Rejected rows plus rows still unsaved after the last retry
+            self._stats['failed'] += counts['rejected'] + len(rows)
+            self._stats['total_flush_ms'] += elapsed_ms
+            self._stats['last_flush_ms'] = round(elapsed_ms, 3)
+    
+    def close(self, timeout=30):
+        """Stop accepting conversations and write everything still queued."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            # Queued after every pending row, so the writer drains the queue first
+            self._queue.put(None)
+            thread.join(timeout)
+    
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['max_queue'] = self.max_queue
+        stats['batch_size'] = self.batch_size
+        stats['avg_batch_size'] = round(stats['written'] / stats['batches'], 2) if stats['batches'] else 0.0
+        stats['avg_flush_ms'] = round(stats['total_flush_ms'] / stats['batches'], 3) if stats['batches'] else 0.0
+        stats['total_flush_ms'] = round(stats['total_flush_ms'], 3)
+        return stats
+
+
+chat_writer = ChatConversationWriter()
+atexit.register(chat_writer.close)
+
+
+def save_chat_conversation(user_id, document_id, question, ai_response, conn=None):
+    """
+    Store one question/answer pair in chat_conversations.
+    
+    The row is queued on chat_writer and written in a batch shortly after;
+    only when the queue is full is it written here (on conn, or a pooled
+    connection if conn is None).
+    
+    Returns:
+        int: The new row's ID if it was written synchronously, None if queued
+    """
+    if chat_writer.enqueue(user_id, document_id, question, ai_response):
+        return None
+    
+    def insert(conn):
+        cursor = conn.cursor()
+        cursor.execute(CHAT_CONVERSATION_INSERT, (user_id, document_id, question, ai_response))
+        conversation_id = cursor.lastrowid
+        conn.commit()
+        cursor.close()
+        return conversation_id
+    
+    if conn is not None:
+        return insert(conn)
+    with db_pool.connection() as conn:
+        return insert(conn)
+
+
+def chat_error_message(error):
+    """Turn an exception from the chat pipeline into a user-facing message."""
+    if isinstance(error, ValueError):
+        # API key not configured
+        return f'{str(error)}. Get your free API key at: https://makersuite.google.com/app/apikey'
+    if isinstance(error, ImportError):
+        # Library not installed
+        return f'{str(error)}. Please run: pip install google-generativeai'
+    error_msg = str(error)
+    print(f"Chat API error: {error_msg}")
+    if "API key" in error_msg or "authentication" in error_msg.lower() or "401" in error_msg or "403" in error_msg:
+        return f'API key error. Please check your GEMINI_API_KEY in .env file. Get your free key at: https://makersuite.google.com/app/apikey'
+    return f'Error processing question: {error_msg}'
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat_api():
     """
@@ -2957,9 +6880,10 @@ def chat_api():
     REQUEST BODY (JSON):
     - question: User's question
     - document_id (optional): ID of document to use as context
+    - cache (optional): false to skip the response cache
     
     Returns:
-        JSON with AI response
+        JSON with AI response (cached = answer came from the response cache)
     """
     if not is_authenticated():
         return jsonify({'success': False, 'message': 'Authentication required'})
@@ -2972,83 +6896,180 @@ def chat_api():
         return jsonify({'success': False, 'message': 'Question is required'})
     
     try:
-        conn = mysql.connect
-        cursor = conn.cursor()
+        conn = get_db()
+        answer = prepare_chat_answer(conn, session['user_id'], document_id, question, chat_cache_requested(data))
+        document_id = answer['document_id']
+        ai_response = answer['cached_answer']
+        cached = ai_response is not None
         
-        # Get document text if document_id provided
-        document_text = None
-        if document_id:
-            cursor.execute("""
-                SELECT extracted_text FROM user_documents
-                WHERE id = %s AND user_id = %s
-            """, (document_id, session['user_id']))
-            
-            doc = cursor.fetchone()
-            if doc:
-                document_text = doc['extracted_text']
-        
-        # If no document selected, try to get the most recent document
-        if not document_text:
-            cursor.execute("""
-                SELECT extracted_text FROM user_documents
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-                LIMIT 1
-            """, (session['user_id'],))
-            
-            doc = cursor.fetchone()
-            if doc:
-                document_text = doc['extracted_text']
-                # Get the document_id for storage
-                cursor.execute("""
-                    SELECT id FROM user_documents
-                    WHERE user_id = %s
-                    ORDER BY created_at DESC
-                    LIMIT 1
-                """, (session['user_id'],))
-                doc_id_result = cursor.fetchone()
-                document_id = doc_id_result['id'] if doc_id_result else None
-        
-        # Get AI response using Gemini
-        ai_response = get_ai_response(question, document_text)
+        if not cached:
+            # Get AI response using Gemini
+            ai_response = get_ai_response(question, answer['context'])
+            chat_response_cache.set(answer['cache_key'], ai_response)
         
         # Store conversation in database
-        cursor.execute("""
-            INSERT INTO chat_conversations
-            (user_id, document_id, user_message, ai_response)
-            VALUES (%s, %s, %s, %s)
-        """, (session['user_id'], document_id, question, ai_response))
-        
-        conn.commit()
-        cursor.close()
+        save_chat_conversation(session['user_id'], document_id, question, ai_response, conn)
         
         return jsonify({
             'success': True,
             'response': ai_response,
-            'document_id': document_id
+            'document_id': document_id,
+            'cached': cached
         })
         
-    except ValueError as e:
-        # API key not configured
-        return jsonify({
-            'success': False, 
-            'message': f'{str(e)}. Get your free API key at: https://makersuite.google.com/app/apikey'
-        })
-    except ImportError as e:
-        # Library not installed
-        return jsonify({
-            'success': False, 
-            'message': f'{str(e)}. Please run: pip install google-generativeai'
-        })
     except Exception as e:
-        error_msg = str(e)
-        print(f"Chat API error: {error_msg}")
-        if "API key" in error_msg or "authentication" in error_msg.lower() or "401" in error_msg or "403" in error_msg:
-            return jsonify({
-                'success': False, 
-                'message': f'API key error. Please check your GEMINI_API_KEY in .env file. Get your free key at: https://makersuite.google.com/app/apikey'
-            })
-        return jsonify({'success': False, 'message': f'Error processing question: {error_msg}'})
+        return jsonify({'success': False, 'message': chat_error_message(e)})
+
+
+# Response pieces buffered between the model and a slow client; when the
+# buffer is full the model stream is not read (backpressure)
+CHAT_STREAM_BUFFER_SIZE = int(os.getenv('CHAT_STREAM_BUFFER_SIZE', 64))
+# Seconds without new text before a keep-alive comment is sent to the client
+CHAT_STREAM_HEARTBEAT = float(os.getenv('CHAT_STREAM_HEARTBEAT', 15))
+
+_STREAM_END = object()
+
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Event with a JSON payload."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_llm_response(prompt, cancelled):
+    """
+    Read llm_provider.stream(prompt) in a background thread through a
+    bounded buffer.
+    
+    - The reader blocks while the buffer is full, so the model is never read
+      faster than the client consumes (backpressure)
+    - Setting `cancelled` (client disconnected) stops the reader and closes
+      the model stream
+    
+    Yields:
+        str pieces of the response, or None after CHAT_STREAM_HEARTBEAT
+        seconds without new text (so the caller can send a keep-alive)
+    
+    Raises:
+        The provider's exception if generation fails
+    """
+    buffer = queue.Queue(maxsize=CHAT_STREAM_BUFFER_SIZE)
+    
+    def put(item):
+        while not cancelled.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def read_model():
+        pieces = None
+        try:
+            pieces = llm_provider.stream(prompt)
+            for piece in pieces:
+                if piece and not put(piece):
+                    return
+            put(_STREAM_END)
+        except Exception as e:
+            put(e)
+        finally:
+            if pieces is not None:
+                pieces.close()
+    
+    threading.Thread(target=read_model, name='chat-stream', daemon=True).start()
+    
+    while True:
+        try:
+            item = buffer.get(timeout=CHAT_STREAM_HEARTBEAT)
+        except queue.Empty:
+            yield None
+            continue
+        if item is _STREAM_END:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream_api():
+    """
+    Streaming variant of /api/chat using Server-Sent Events.
+    
+    REQUEST BODY (JSON): same as /api/chat
+    
+    RESPONSE (text/event-stream):
+    - event "start": {document_id, cached}
+    - unnamed events: {text} for each piece of the answer as it is generated
+      (a cached answer is sent as a single piece)
+    - event "done": {document_id, conversation_id} after the full answer is
+      saved (conversation_id is None when the write was queued on chat_writer)
+    - event "error": {message}
+    
+    The assembled answer is stored in chat_conversations when the stream
+    ends. If the client disconnects, generation stops and nothing is stored.
+    """
+    if not is_authenticated():
+        return jsonify({'success': False, 'message': 'Authentication required'})
+    
+    data = request.get_json()
+    question = data.get('question', '').strip()
+    document_id = data.get('document_id')
+    user_id = session['user_id']
+    
+    if not question:
+        return jsonify({'success': False, 'message': 'Question is required'})
+    
+    try:
+        answer = prepare_chat_answer(get_db(), user_id, document_id, question, chat_cache_requested(data))
+        document_id = answer['document_id']
+        cache_key = answer['cache_key']
+        cached_answer = answer['cached_answer']
+        
+        prompt = None
+        if cached_answer is None:
+            prompt = build_chat_prompt(question, answer['context'])
+    except Exception as e:
+        return jsonify({'success': False, 'message': chat_error_message(e)})
+    
+    def generate():
+        cancelled = threading.Event()
+        answer = []
+        try:
+            yield sse_event({'document_id': document_id, 'cached': cached_answer is not None}, 'start')
+            if cached_answer is not None:
+                answer.append(cached_answer)
+                yield sse_event({'text': cached_answer})
+            else:
+                for piece in stream_llm_response(prompt, cancelled):
+                    if piece is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    answer.append(piece)
+                    yield sse_event({'text': piece})
+            
+            ai_response = ''.join(answer).strip()
+            if cached_answer is None:
+                chat_response_cache.set(cache_key, ai_response)
+            
+            # The request's connection was released when the view returned, so
+            # a synchronous fallback write uses its own pooled connection
+            conversation_id = save_chat_conversation(user_id, document_id, question, ai_response)
+            yield sse_event({'document_id': document_id, 'conversation_id': conversation_id}, 'done')
+        except Exception as e:
+            yield sse_event({'message': chat_error_message(e)}, 'error')
+        finally:
+            # Runs on completion and when the server closes the generator
+            # because the client disconnected
+            cancelled.set()
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/api/delete-document/<int:document_id>', methods=['DELETE'])
@@ -3068,12 +7089,12 @@ def delete_document(document_id):
         return jsonify({'success': False, 'message': 'Authentication required'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         # Verify document belongs to user
         cursor.execute("""
-            SELECT id, filename FROM user_documents
+            SELECT id, filename, content_id FROM user_documents
             WHERE id = %s AND user_id = %s
         """, (document_id, session['user_id']))
         
@@ -3094,6 +7115,9 @@ def delete_document(document_id):
             WHERE id = %s AND user_id = %s
         """, (document_id, session['user_id']))
         
+        # Delete the stored text if no other upload shares it
+        delete_orphan_content(cursor, doc['content_id'])
+        
         conn.commit()
         cursor.close()
         
@@ -3119,7 +7143,7 @@ def get_user_documents():
         return jsonify({'success': False, 'message': 'Authentication required'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -3141,6 +7165,25 @@ def get_user_documents():
         return jsonify({'success': False, 'message': str(e)})
 
 
+def chat_history_query(user_id, document_id=None, limit=50):
+    """Build the query for a user's latest chat messages, optionally for one document."""
+    if document_id:
+        return """
+            SELECT user_message, ai_response, created_at
+            FROM chat_conversations
+            WHERE user_id = %s AND document_id = %s
+            ORDER BY created_at DESC
+            LIMIT %s
+        """, (user_id, document_id, limit)
+    return """
+        SELECT user_message, ai_response, created_at
+        FROM chat_conversations
+        WHERE user_id = %s
+        ORDER BY created_at DESC
+        LIMIT %s
+    """, (user_id, limit)
+
+
 @app.route('/api/chat-history', methods=['GET'])
 def get_chat_history():
     """
@@ -3157,33 +7200,18 @@ def get_chat_history():
         return jsonify({'success': False, 'message': 'Authentication required'})
     
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         
-        document_id = request.args.get('document_id', type=int)
-        limit = request.args.get('limit', 50, type=int)
-        
-        if document_id:
-            cursor.execute("""
-                SELECT user_message, ai_response, created_at
-                FROM chat_conversations
-                WHERE user_id = %s AND document_id = %s
-                ORDER BY created_at DESC
-                LIMIT %s
-            """, (session['user_id'], document_id, limit))
-        else:
-            cursor.execute("""
-                SELECT user_message, ai_response, created_at
-                FROM chat_conversations
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-                LIMIT %s
-            """, (session['user_id'], limit))
-        
-        history = cursor.fetchall()
-        cursor.close()
+        cursor.execute(*chat_history_query(
+            session['user_id'],
+            request.args.get('document_id', type=int),
+            request.args.get('limit', 50, type=int)
+        ))
         
         # Reverse to show oldest first
+        history = list(cursor.fetchall())
+        cursor.close()
         history.reverse()
         
         return jsonify({
@@ -3194,25 +7222,67 @@ def get_chat_history():
         return jsonify({'success': False, 'message': str(e)})
 
 
+# Token for metrics scrapers (sent as "Authorization: Bearer <token>"); without
+# it /api/metrics is only available to logged-in users
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+
+def metrics_access_allowed():
+    """Allow /api/metrics for a logged-in user or a request carrying METRICS_TOKEN."""
+    if METRICS_TOKEN:
+        authorization = request.headers.get('Authorization', '')
+        if hmac.compare_digest(authorization.encode(), f'Bearer {METRICS_TOKEN}'.encode()):
+            return True
+    return is_authenticated()
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    Metrics endpoint - reports in-process performance counters
+    (cache hit rates, etc.) for this worker.
+    
+    REQUIRES AUTHENTICATION (session) or the METRICS_TOKEN bearer token,
+    since pool state and per-subsystem details are not public.
+    """
+    if not metrics_access_allowed():
+        return jsonify({'success': False, 'message': 'Authentication required'}), 401
+    
+    return jsonify({
+        'dashboard_cache': dashboard_cache.stats(),
+        'llm_provider': dict(llm_provider.stats(), provider=llm_provider.name),
+        'chat_response_cache': chat_response_cache.stats(),
+        'password_hasher': password_hasher.stats(),
+        'document_context': document_context_service.stats(),
+        'chat_writer': chat_writer.stats(),
+        'pdf_extraction_pool': pdf_extraction_pool.stats()
+    })
+
+
 @app.route('/health')
 def health():
     """
-    Health check endpoint - verifies database connection.
+    Health check endpoint - verifies database connection and reports
+    connection pool metrics (size, in use, idle, wait times) and the
+    language model backend status.
     """
     try:
-        conn = mysql.connect
+        conn = get_db()
         cursor = conn.cursor()
         cursor.execute("SELECT 1")
         cursor.close()
-        return jsonify({'status': 'healthy', 'database': 'connected'})
+        return jsonify({'status': 'healthy', 'database': 'connected', 'pool': db_pool.stats(),
+                        'llm': llm_provider.health()})
     except Exception as e:
-        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+        return jsonify({'status': 'unhealthy', 'error': str(e), 'pool': db_pool.stats(),
+                        'llm': llm_provider.health()}), 500
 
 
 # Run the application
 if __name__ == '__main__':
     # Initialize database on first run
-    init_database()
+    with app.app_context():
+        init_database()
     
     # Run Flask app in debug mode (change to False in production)
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,657 @@
+"""
+ASGI entrypoint - async execution mode for the I/O-bound endpoints.
+
+Run with an ASGI server instead of `python app.py`:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+These endpoints are served by async handlers, so a request that is waiting
+for Gemini or MySQL does not hold a thread:
+
+    POST /api/chat                      POST /api/upload-document
+    POST /api/chat/stream               GET  /api/chat-history
+    GET  /api/history/study-patterns    GET  /api/history/burnout-predictions
+
+- Language model calls use the providers' async methods (agenerate/astream)
+- Simple queries use aiomysql when it is installed (ASYNC_DB_DRIVER); without
+  it they run on db_pool in the bounded DB executor
+- Blocking work (document retrieval, multipart parsing, saving uploads) runs
+  in bounded executors (ASYNC_DB_WORKERS, ASYNC_BLOCKING_WORKERS threads),
+  never on the event loop
+
+Every other route is the unchanged Flask (WSGI) view, run in a pool of
+ASYNC_THREAD_WORKERS threads (also used as the event loop's default
+executor, e.g. by asyncio.to_thread()).
+
+Sessions, request parsing and responses use Flask's own machinery
+(app.request_context / app.process_response), so clients see the same
+behaviour in both modes.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request, session, jsonify, url_for
+from werkzeug.exceptions import HTTPException, InternalServerError, RequestEntityTooLarge
+
+from app import (
+    app, db_pool, llm_provider, chat_response_cache, document_ingest_executor,
+    is_authenticated, prepare_chat_answer, chat_cache_requested, chat_error_message,
+    build_chat_prompt, sse_event, chat_writer, CHAT_CONVERSATION_INSERT, CHAT_STREAM_BUFFER_SIZE,
+    CHAT_STREAM_HEARTBEAT, get_uploaded_file, save_uploaded_file, process_document_job,
+    DOCUMENT_JOB_INSERT, history_page_query, history_page_result, get_history_page_size,
+    STUDY_PATTERN_HISTORY_COLUMNS, BURNOUT_PREDICTION_HISTORY_COLUMNS, chat_history_query
+)
+
+# Threads running the Flask (WSGI) routes and asyncio.to_thread() calls
+ASYNC_THREAD_WORKERS = int(os.getenv('ASYNC_THREAD_WORKERS', 32))
+# Threads running database work without an async driver (more than the pool size would only wait for connections)
+ASYNC_DB_WORKERS = int(os.getenv('ASYNC_DB_WORKERS', app.config['MYSQL_POOL_SIZE']))
+# Threads parsing and saving uploads
+ASYNC_BLOCKING_WORKERS = int(os.getenv('ASYNC_BLOCKING_WORKERS', 4))
+# 'aiomysql' (async driver, needs `pip install aiomysql`) or 'threads' (db_pool in the DB executor)
+ASYNC_DB_DRIVER = os.getenv('ASYNC_DB_DRIVER', 'aiomysql').lower()
+# Connections of the MYSQL_POOL_SIZE budget given to the aiomysql pool (db_pool keeps the rest)
+ASYNC_MYSQL_POOL_SIZE = int(os.getenv('ASYNC_MYSQL_POOL_SIZE', max(1, app.config['MYSQL_POOL_SIZE'] // 2)))
+# Request bodies larger than this are spooled to a temporary file
+ASYNC_BODY_SPOOL_BYTES = 1024 * 1024
+
+thread_executor = ThreadPoolExecutor(max_workers=ASYNC_THREAD_WORKERS, thread_name_prefix='asgi-thread')
+db_executor = ThreadPoolExecutor(max_workers=ASYNC_DB_WORKERS, thread_name_prefix='asgi-db')
+blocking_executor = ThreadPoolExecutor(max_workers=ASYNC_BLOCKING_WORKERS, thread_name_prefix='asgi-blocking')
+
+_STREAM_END = object()
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before its request body was read."""
+
+
+async def run_in_executor(executor, func, *args):
+    """
+    Run func(*args) in executor and await the result.
+
+    The caller's context is copied, so func can use flask.request and
+    flask.session of the request being handled.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, functools.partial(context.run, func, *args)
+    )
+
+
+def run_query(sql, params, fetch):
+    """Run one statement on a pooled connection (the DB executor fallback)."""
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            if fetch == 'all':
+                return list(cursor.fetchall())
+            if fetch == 'one':
+                return cursor.fetchone()
+            conn.commit()
+            return cursor.lastrowid
+        finally:
+            cursor.close()
+
+
+class AsyncDatabase:
+    """
+    Database access for the async handlers.
+
+    With aiomysql installed, statements run on an async connection pool
+    (autocommit, dict rows) of pool_size connections, which are taken out of
+    db_pool so the process still opens at most MYSQL_POOL_SIZE connections.
+    Otherwise they run on db_pool through the bounded DB executor, so the
+    behaviour is the same either way.
+    """
+
+    def __init__(self, config, driver=ASYNC_DB_DRIVER, pool_size=ASYNC_MYSQL_POOL_SIZE):
+        self.config = config
+        self.driver = driver
+        self.pool_size = pool_size
+        self._pool = None
+
+    async def start(self):
+        if self.driver != 'aiomysql':
+            return
+        try:
+            import aiomysql
+        except ImportError:
+            print("Warning: aiomysql not installed. Async endpoints will run queries in the DB executor.")
+            return
+        if not 0 < self.pool_size < db_pool.size:
+            print(f"Warning: ASYNC_MYSQL_POOL_SIZE must be between 1 and {db_pool.size - 1}. "
+                  "Async endpoints will run queries in the DB executor.")
+            return
+        db_pool.reserve(self.pool_size)
+        try:
+            self._pool = await aiomysql.create_pool(
+                host=self.config['MYSQL_HOST'],
+                port=self.config['MYSQL_PORT'],
+                user=self.config['MYSQL_USER'],
+                password=self.config['MYSQL_PASSWORD'],
+                db=self.config['MYSQL_DB'],
+                charset=self.config['MYSQL_CHARSET'],
+                cursorclass=aiomysql.DictCursor,
+                autocommit=True,
+                minsize=1,
+                maxsize=self.pool_size,
+                pool_recycle=int(self.config['MYSQL_POOL_RECYCLE'])
+            )
+        except Exception:
+            db_pool.unreserve(self.pool_size)
+            raise
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+            db_pool.unreserve(self.pool_size)
+
+    @property
+    def driver_in_use(self):
+        return 'aiomysql' if self._pool is not None else 'threads'
+
+    async def _execute(self, sql, params, fetch):
+        if self._pool is None:
+            return await run_in_executor(db_executor, run_query, sql, params, fetch)
+        async with self._pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                if fetch == 'all':
+                    return list(await cursor.fetchall())
+                if fetch == 'one':
+                    return await cursor.fetchone()
+                return cursor.lastrowid
+
+    async def fetchall(self, sql, params=()):
+        return await self._execute(sql, params, 'all')
+
+    async def fetchone(self, sql, params=()):
+        return await self._execute(sql, params, 'one')
+
+    async def insert(self, sql, params=()):
+        """Run an INSERT and return the new row's ID."""
+        return await self._execute(sql, params, None)
+
+
+async_db = AsyncDatabase(app.config)
+
+
+# ============================================================================
+# ASYNC HANDLERS
+# ============================================================================
+
+def prepare_chat(user_id, document_id, question, use_cache):
+    # Document lookup and retrieval share the in-process index cache, so they
+    # run on db_pool in the DB executor
+    with db_pool.connection() as conn:
+        return prepare_chat_answer(conn, user_id, document_id, question, use_cache)
+
+
+def read_chat_request():
+    """Return (data, question, document_id) from the chat request body."""
+    data = request.get_json()
+    return data, data.get('question', '').strip(), data.get('document_id')
+
+
+async def save_conversation(user_id, document_id, question, ai_response):
+    """
+    Queue a conversation on chat_writer, or insert it now if the queue is full.
+
+    Returns:
+        int: The new row's ID if it was written now, None if queued
+    """
+    if chat_writer.enqueue(user_id, document_id, question, ai_response):
+        return None
+    return await async_db.insert(CHAT_CONVERSATION_INSERT, (user_id, document_id, question, ai_response))
+
+
+async def chat(receive, send):
+    """Async version of /api/chat (see chat_api in app.py)."""
+    data, question, document_id = read_chat_request()
+    if not question:
+        return jsonify({'success': False, 'message': 'Question is required'})
+    user_id = session['user_id']
+
+    try:
+        answer = await run_in_executor(db_executor, prepare_chat, user_id, document_id, question,
+                                       chat_cache_requested(data))
+        ai_response = answer['cached_answer']
+        cached = ai_response is not None
+
+        if not cached:
+            ai_response = await llm_provider.agenerate(build_chat_prompt(question, answer['context']))
+            chat_response_cache.set(answer['cache_key'], ai_response)
+
+        await save_conversation(user_id, answer['document_id'], question, ai_response)
+
+        return jsonify({
+            'success': True,
+            'response': ai_response,
+            'document_id': answer['document_id'],
+            'cached': cached
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': chat_error_message(e)})
+
+
+async def stream_with_heartbeat(pieces):
+    """
+    Read the async iterator `pieces` through a bounded buffer.
+
+    Yields:
+        str pieces, or None after CHAT_STREAM_HEARTBEAT seconds without new
+        text (so the caller can send a keep-alive)
+    """
+    buffer = asyncio.Queue(maxsize=CHAT_STREAM_BUFFER_SIZE)
+
+    async def read_model():
+        try:
+            async for piece in pieces:
+                if piece:
+                    await buffer.put(piece)
+            await buffer.put(_STREAM_END)
+        except Exception as e:
+            await buffer.put(e)
+        finally:
+            await pieces.aclose()
+
+    reader = asyncio.ensure_future(read_model())
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(buffer.get(), CHAT_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if item is _STREAM_END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        reader.cancel()
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def chat_stream(receive, send):
+    """
+    Async version of /api/chat/stream (see chat_stream_api in app.py).
+
+    The model is read only as fast as send() accepts data, and a client
+    disconnect cancels generation; nothing is stored in that case.
+    """
+    data, question, document_id = read_chat_request()
+    if not question:
+        return jsonify({'success': False, 'message': 'Question is required'})
+    user_id = session['user_id']
+
+    try:
+        answer = await run_in_executor(db_executor, prepare_chat, user_id, document_id, question,
+                                       chat_cache_requested(data))
+    except Exception as e:
+        return jsonify({'success': False, 'message': chat_error_message(e)})
+
+    document_id = answer['document_id']
+    cached_answer = answer['cached_answer']
+
+    async def send_text(text):
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+    async def stream_answer():
+        pieces = []
+        try:
+            await send_text(sse_event({'document_id': document_id, 'cached': cached_answer is not None}, 'start'))
+            if cached_answer is not None:
+                pieces.append(cached_answer)
+                await send_text(sse_event({'text': cached_answer}))
+            else:
+                prompt = build_chat_prompt(question, answer['context'])
+                stream = stream_with_heartbeat(llm_provider.astream(prompt))
+                try:
+                    async for piece in stream:
+                        if piece is None:
+                            await send_text(": keep-alive\n\n")
+                            continue
+                        pieces.append(piece)
+                        await send_text(sse_event({'text': piece}))
+                finally:
+                    await stream.aclose()
+
+            ai_response = ''.join(pieces).strip()
+            if cached_answer is None:
+                chat_response_cache.set(answer['cache_key'], ai_response)
+
+            conversation_id = await save_conversation(user_id, document_id, question, ai_response)
+            await send_text(sse_event({'document_id': document_id, 'conversation_id': conversation_id}, 'done'))
+        except Exception as e:
+            await send_text(sse_event({'message': chat_error_message(e)}, 'error'))
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]
+    })
+
+    streaming = asyncio.ensure_future(stream_answer())
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    await asyncio.wait({streaming, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    disconnect.cancel()
+    if not streaming.done():
+        # Client went away: stop generation and save nothing
+        streaming.cancel()
+        return None
+    await send({'type': 'http.response.body', 'body': b''})
+    return None
+
+
+async def upload_document(receive, send):
+    """Async version of /api/upload-document (see upload_document in app.py)."""
+    # Multipart parsing and the file write are blocking, so both run in the blocking executor
+    file, error = await run_in_executor(blocking_executor, lambda: get_uploaded_file(request.files))
+    if error:
+        return jsonify({'success': False, 'message': error})
+    user_id = session['user_id']
+
+    file_path = None
+    try:
+        file_path, filename, file_type = await run_in_executor(blocking_executor, save_uploaded_file, file)
+
+        job_id = await async_db.insert(DOCUMENT_JOB_INSERT, (user_id, filename, file_type))
+        document_ingest_executor.submit(
+            process_document_job, job_id, user_id, file_path, filename, file_type
+        )
+
+        return jsonify({
+            'success': True,
+            'message': f'Document "{filename}" uploaded. Processing has started.',
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('document_job_status', job_id=job_id),
+            'filename': filename
+        })
+    except Exception as e:
+        print(f"Error uploading document: {str(e)}")
+        # Clean up file if exists
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+        return jsonify({'success': False, 'message': f'Error processing file: {str(e)}'})
+
+
+async def history_page(table, columns):
+    page_size = get_history_page_size()
+    sql, params, direction = history_page_query(
+        table, columns, session['user_id'], request.args.get('cursor'), page_size
+    )
+    return history_page_result(await async_db.fetchall(sql, params), direction, page_size)
+
+
+async def study_patterns_history(receive, send):
+    """Async version of /api/history/study-patterns."""
+    try:
+        page = await history_page('study_patterns', STUDY_PATTERN_HISTORY_COLUMNS)
+        return jsonify({
+            'success': True,
+            'patterns': page['rows'],
+            'count': len(page['rows']),
+            'next_cursor': page['next_cursor'],
+            'prev_cursor': page['prev_cursor']
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+async def burnout_predictions_history(receive, send):
+    """Async version of /api/history/burnout-predictions."""
+    try:
+        page = await history_page('burnout_predictions', BURNOUT_PREDICTION_HISTORY_COLUMNS)
+        return jsonify({
+            'success': True,
+            'predictions': page['rows'],
+            'count': len(page['rows']),
+            'next_cursor': page['next_cursor'],
+            'prev_cursor': page['prev_cursor']
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+async def chat_history(receive, send):
+    """Async version of /api/chat-history."""
+    try:
+        history = await async_db.fetchall(*chat_history_query(
+            session['user_id'],
+            request.args.get('document_id', type=int),
+            request.args.get('limit', 50, type=int)
+        ))
+        # Reverse to show oldest first
+        history.reverse()
+        return jsonify({'success': True, 'history': history})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+
+# (method, path) -> handler(receive, send); a handler returns a Flask
+# response, or None if it sent the response itself
+ASYNC_ROUTES = {
+    ('POST', '/api/chat'): chat,
+    ('POST', '/api/chat/stream'): chat_stream,
+    ('POST', '/api/upload-document'): upload_document,
+    ('GET', '/api/history/study-patterns'): study_patterns_history,
+    ('GET', '/api/history/burnout-predictions'): burnout_predictions_history,
+    ('GET', '/api/chat-history'): chat_history,
+}
+
+
+# ============================================================================
+# ASGI PLUMBING
+# ============================================================================
+
+async def read_body(receive, max_length=None):
+    """
+    Read the request body into a spooled temporary file.
+
+    Returns:
+        file object positioned at the start, or None if the body is larger
+        than max_length
+
+    Raises:
+        ClientDisconnected: If the client disconnects first
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=ASYNC_BODY_SPOOL_BYTES)
+    length = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            raise ClientDisconnected()
+        chunk = message.get('body', b'')
+        length += len(chunk)
+        if max_length is not None and length > max_length:
+            body.close()
+            return None
+        body.write(chunk)
+        more_body = message.get('more_body', False)
+    body.seek(0)
+    return body
+
+
+def build_wsgi_environ(scope, body):
+    """Build a WSGI environ for an ASGI HTTP scope, so Flask can parse the request."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').lower()
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key in environ:
+            value = environ[key] + ',' + value
+        environ[key] = value
+    return environ
+
+
+async def send_response(response, send):
+    """Send a complete (non-streaming) werkzeug response."""
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in response.headers.items()
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+
+
+async def handle_async_route(handler, scope, receive, send):
+    """Run an async handler inside a Flask request context."""
+    try:
+        body = await read_body(receive, app.config.get('MAX_CONTENT_LENGTH'))
+    except ClientDisconnected:
+        return
+    if body is None:
+        await send_response(RequestEntityTooLarge().get_response(), send)
+        return
+
+    try:
+        environ = build_wsgi_environ(scope, body)
+        with app.request_context(environ):
+            try:
+                if not is_authenticated():
+                    response = jsonify({'success': False, 'message': 'Authentication required'})
+                else:
+                    response = await handler(receive, send)
+            except HTTPException as e:
+                # e.g. malformed JSON (400) or an oversized upload (413)
+                response = e.get_response(environ)
+            except Exception:
+                app.log_exception(sys.exc_info())
+                response = InternalServerError().get_response(environ)
+
+            if response is not None:
+                # Runs after_request hooks and refreshes the session cookie
+                await send_response(app.process_response(response), send)
+    finally:
+        body.close()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                # Bounds the threads used by the WSGI routes and asyncio.to_thread()
+                asyncio.get_running_loop().set_default_executor(thread_executor)
+                await async_db.start()
+                print(f"ASGI mode: database driver '{async_db.driver_in_use}'")
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # Write queued chat conversations before the process exits
+            await asyncio.to_thread(chat_writer.close)
+            await async_db.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def run_wsgi_app(scope, receive, send):
+    """
+    Serve a request with the Flask (WSGI) app in the thread executor.
+
+    Response bodies are read one item at a time in the executor, so
+    streamed responses (e.g. /api/export) stay streamed, and stop when the
+    client disconnects.
+    """
+    try:
+        body = await read_body(receive, app.config.get('MAX_CONTENT_LENGTH'))
+    except ClientDisconnected:
+        return
+    if body is None:
+        await send_response(RequestEntityTooLarge().get_response(), send)
+        return
+    loop = asyncio.get_running_loop()
+    environ = build_wsgi_environ(scope, body)
+    response_start = {}
+
+    def start_response(status, headers, exc_info=None):
+        response_start['status'] = int(status.split(' ', 1)[0])
+        response_start['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+        ]
+
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    result = None
+    try:
+        result = await loop.run_in_executor(thread_executor, app, environ, start_response)
+        await send(dict(response_start, type='http.response.start'))
+        chunks = iter(result)
+        while not disconnect.done():
+            chunk = await loop.run_in_executor(thread_executor, next, chunks, _STREAM_END)
+            if chunk is _STREAM_END:
+                await send({'type': 'http.response.body', 'body': b''})
+                break
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    finally:
+        disconnect.cancel()
+        if hasattr(result, 'close'):
+            await loop.run_in_executor(thread_executor, result.close)
+        body.close()
+
+
+async def application(scope, receive, send):
+    """ASGI application: async handlers for ASYNC_ROUTES, Flask for everything else."""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+    if handler is not None:
+        await handle_async_route(handler, scope, receive, send)
+    else:
+        await run_wsgi_app(scope, receive, send)
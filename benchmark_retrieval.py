@@ -0,0 +1,77 @@
+"""
+Benchmark for chunked BM25 document retrieval.
+Measures, for growing document sizes, the time to chunk and index a
+document, the serialized index size, the time to load the index, and the
+latency of a top-k search.
+
+Usage:
+    python benchmark_retrieval.py [max_size_in_characters]
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from document_index import BM25Index, chunk_text
+
+
+def generate_document(size, seed=42):
+    """Generate lecture-notes-like text with a Zipf-distributed vocabulary."""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(20000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    lines = []
+    length = 0
+    while length < size:
+        words = rng.choices(vocabulary, weights=weights, k=rng.randint(5, 25))
+        line = ' '.join(words) + '.'
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines)[:size]
+
+
+def time_queries(index, queries, top_k=5):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, top_k)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies), max(latencies)
+
+
+def main():
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 8_000_000
+    rng = random.Random(7)
+    queries = [
+        ' '.join(f"term{rng.randint(0, 5000)}" for _ in range(rng.randint(2, 8)))
+        for _ in range(200)
+    ]
+
+    print(f"{'chars':>10} {'chunks':>7} {'build ms':>9} {'index KB':>9} "
+          f"{'load ms':>8} {'search p50 ms':>14} {'search max ms':>14}")
+
+    size = 10_000
+    while size <= max_size:
+        text = generate_document(size)
+
+        start = time.perf_counter()
+        chunks = chunk_text(text)
+        index = BM25Index.build(chunks)
+        build_time = time.perf_counter() - start
+
+        data = index.to_bytes()
+        start = time.perf_counter()
+        loaded = BM25Index.from_bytes(data)
+        load_time = time.perf_counter() - start
+
+        assert loaded.search(queries[0]) == index.search(queries[0])
+        p50, worst = time_queries(loaded, queries)
+
+        print(f"{len(text):>10,} {len(chunks):>7,} {build_time * 1000:>9.1f} {len(data) / 1024:>9.1f} "
+              f"{load_time * 1000:>8.2f} {p50 * 1000:>14.3f} {worst * 1000:>14.3f}")
+        size *= 4
+
+
+if __name__ == '__main__':
+    main()
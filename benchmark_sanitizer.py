@@ -0,0 +1,107 @@
+"""
+Benchmark for the document text sanitizer.
+Compares text_sanitizer.sanitize_text against the original per-character
+loop and verifies that both produce identical output.
+
+Usage:
+    python benchmark_sanitizer.py [size_in_characters]
+"""
+
+import random
+import sys
+import time
+import unicodedata
+
+from text_sanitizer import sanitize_text
+
+
+def legacy_clean_document_text(text):
+    """Original per-character implementation (reference)."""
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', errors='ignore')
+
+    text = unicodedata.normalize('NFKC', text)
+
+    cleaned_text = []
+    for char in text:
+        cat = unicodedata.category(char)
+        if cat[0] != 'C' or char in '\n\r\t':
+            cleaned_text.append(char)
+        elif cat == 'Cc':
+            cleaned_text.append(' ')
+    text = ''.join(cleaned_text)
+
+    return text.encode('utf-8', errors='ignore').decode('utf-8')
+
+
+def generate_sample_text(size, seed=42):
+    """
+    Generate text that looks like PDF extraction output: mostly prose with
+    ligatures, accents, full-width forms, control and format characters,
+    private-use glyphs, lone surrogates and unassigned code points.
+    """
+    rng = random.Random(seed)
+    words = ['study', 'burnout', 'sleep', 'analysis', 'ﬁnal', 'ﬂow', 'café',
+             'naïve', 'Ｆｕｌｌ', '①②', 'é', 'Å', 'µm', '½', 'x²']
+    noise = ['\x00', '\x07', '\x0b', '\x0c', '\x1b', '\x7f', '\x85',
+             '­', '​', '‍', ' ', '﻿', '',
+             '\U000f0000', '\ud800', '\udfff', '͸', '\U000e0001', '\t', '\r']
+    parts = []
+    length = 0
+    while length < size:
+        roll = rng.random()
+        if roll < 0.85:
+            part = rng.choice(words) + ' '
+        elif roll < 0.95:
+            part = rng.choice(noise)
+        else:
+            part = '\n'
+        parts.append(part)
+        length += len(part)
+    return ''.join(parts)
+
+
+def edge_cases():
+    """Small inputs that exercise normalization and every category branch."""
+    cases = ['', '\n', 'plain ascii text', b'bytes \xff input', '\x00\x01\x02']
+    cases.append(''.join(chr(cp) for cp in range(0, 0x3000)))
+    cases.append(''.join(chr(cp) for cp in range(0xd700, 0xe100)))
+    cases.append(''.join(chr(cp) for cp in range(0xfe00, 0x10100)))
+    cases.append(''.join(chr(cp) for cp in range(0xe0000, 0xe0200)))
+    return cases
+
+
+def time_call(func, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+
+    for case in edge_cases():
+        assert sanitize_text(case) == legacy_clean_document_text(case), repr(case[:40])
+    print(f"Edge cases: {len(edge_cases())} identical")
+
+    text = generate_sample_text(size)
+    legacy_result, legacy_time = time_call(legacy_clean_document_text, text)
+    fast_result, fast_time = time_call(sanitize_text, text)
+    chunked_result = sanitize_text(text, chunk_size=4096)
+
+    assert fast_result == legacy_result, "sanitize_text output differs from legacy loop"
+    assert chunked_result == legacy_result, "chunked output differs from legacy loop"
+
+    print(f"Input size: {len(text):,} characters")
+    print(f"Legacy loop:   {legacy_time * 1000:8.1f} ms")
+    print(f"sanitize_text: {fast_time * 1000:8.1f} ms")
+    print(f"Speedup:       {legacy_time / fast_time:8.1f}x")
+    print("Outputs identical")
+
+
+if __name__ == '__main__':
+    main()
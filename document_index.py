@@ -0,0 +1,186 @@
+"""
+Chunking and BM25 retrieval for uploaded document text.
+
+Documents are split into chunks of roughly chunk_chars characters at
+paragraph/line boundaries, and a per-document BM25 inverted index is built
+over the chunks. At question time only the top-k most relevant chunks are
+sent to the AI as context, instead of the first N characters of the
+document.
+
+The index is stored in compressed-sparse-row form with NumPy:
+- terms:          sorted vocabulary (serialized as newline-joined UTF-8)
+- term_offsets:   postings of terms[i] are posting_chunks[term_offsets[i]:term_offsets[i + 1]]
+- posting_chunks: chunk number for each posting
+- posting_tfs:    term frequency in that chunk
+- chunk_lengths:  number of tokens in each chunk
+
+to_bytes()/from_bytes() serialize it as a compressed .npz (no pickle), so
+it can be stored in the database next to the document.
+
+Run benchmark_retrieval.py to measure index build and search latency
+against document size.
+"""
+
+import io
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+# Target characters per chunk (5 chunks ~ the 8000 character prompt budget)
+DEFAULT_CHUNK_CHARS = 1600
+
+# Standard BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Common English words that carry no retrieval signal
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from had has have how i if in
+into is it its of on or our so than that the their them then there these they this
+to was we were what when where which who why will with you your
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens, without stopwords and single characters."""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def chunk_text(text, chunk_chars=DEFAULT_CHUNK_CHARS):
+    """
+    Split text into chunks of at most chunk_chars characters.
+
+    Chunks end at line boundaries where possible; lines longer than
+    chunk_chars are split at the last space before the limit.
+
+    Returns:
+        list: Chunk strings (empty chunks are skipped)
+    """
+    chunks = []
+    current = []
+    current_length = 0
+
+    for line in text.splitlines(keepends=True):
+        while len(line) > chunk_chars:
+            # Keep the space with the head; without one, cut at exactly chunk_chars
+            split_at = line.rfind(' ', 0, chunk_chars)
+            cut = split_at + 1 if split_at > 0 else chunk_chars
+            head, line = line[:cut], line[cut:]
+            if current_length + len(head) > chunk_chars and current:
+                chunks.append(''.join(current))
+                current, current_length = [], 0
+            current.append(head)
+            current_length += len(head)
+        if current_length + len(line) > chunk_chars and current:
+            chunks.append(''.join(current))
+            current, current_length = [], 0
+        current.append(line)
+        current_length += len(line)
+
+    if current:
+        chunks.append(''.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+class BM25Index:
+    """Okapi BM25 index over the chunks of one document."""
+
+    def __init__(self, terms, term_offsets, posting_chunks, posting_tfs, chunk_lengths):
+        self.terms = terms
+        self.term_offsets = term_offsets
+        self.posting_chunks = posting_chunks
+        self.posting_tfs = posting_tfs
+        self.chunk_lengths = chunk_lengths
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.chunk_count = len(chunk_lengths)
+        self.avg_chunk_length = float(chunk_lengths.mean()) if self.chunk_count else 0.0
+
+    @classmethod
+    def build(cls, chunks):
+        """Build an index from a list of chunk strings."""
+        postings = {}
+        chunk_lengths = np.zeros(len(chunks), dtype=np.int32)
+
+        for chunk_number, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            chunk_lengths[chunk_number] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((chunk_number, tf))
+
+        terms = sorted(postings)
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        term_offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        posting_chunks = np.fromiter(
+            (chunk_number for term in terms for chunk_number, _ in postings[term]),
+            dtype=np.int32, count=int(term_offsets[-1])
+        )
+        posting_tfs = np.fromiter(
+            (tf for term in terms for _, tf in postings[term]),
+            dtype=np.int32, count=int(term_offsets[-1])
+        )
+        return cls(terms, term_offsets, posting_chunks, posting_tfs, chunk_lengths)
+
+    def search(self, query, top_k=5):
+        """
+        Score all chunks against the query.
+
+        Returns:
+            list: [(chunk_number, score), ...] for the top_k best chunks with a
+                  positive score, best first
+        """
+        if not self.chunk_count:
+            return []
+
+        scores = np.zeros(self.chunk_count, dtype=np.float64)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.chunk_lengths / (self.avg_chunk_length or 1.0))
+
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            chunks = self.posting_chunks[start:end]
+            tfs = self.posting_tfs[start:end]
+            df = end - start
+            idf = math.log(1 + (self.chunk_count - df + 0.5) / (df + 0.5))
+            # Each chunk appears at most once per term, so fancy-index += is safe
+            scores[chunks] += idf * tfs * (BM25_K1 + 1) / (tfs + length_norm[chunks])
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(chunk_number), float(scores[chunk_number])) for chunk_number in candidates]
+
+    def to_bytes(self):
+        """Serialize the index as a compressed .npz blob."""
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            terms=np.frombuffer('\n'.join(self.terms).encode('utf-8'), dtype=np.uint8),
+            term_offsets=self.term_offsets,
+            posting_chunks=self.posting_chunks,
+            posting_tfs=self.posting_tfs,
+            chunk_lengths=self.chunk_lengths,
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Load an index serialized by to_bytes()."""
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            terms_blob = arrays['terms'].tobytes().decode('utf-8')
+            return cls(
+                terms_blob.split('\n') if terms_blob else [],
+                arrays['term_offsets'],
+                arrays['posting_chunks'],
+                arrays['posting_tfs'],
+                arrays['chunk_lengths'],
+            )
@@ -0,0 +1,70 @@
+"""
+Page-level PDF text extraction, run inside the PDF extraction worker processes.
+
+The worker processes are started with the 'forkserver' (or 'spawn') method
+rather than fork(), so the function they run lives in this small module that
+imports nothing from app.py and can be preloaded by the fork server.
+"""
+
+import signal
+
+import PyPDF2
+
+# Set in each worker by init_worker()
+_started_queue = None
+_page_timeout = None
+
+
+class PageTimeout(Exception):
+    """Raised inside a worker when a single page takes longer than the page timeout."""
+
+
+def _on_alarm(signum, frame):
+    raise PageTimeout()
+
+
+def init_worker(started_queue, page_timeout):
+    """
+    Pool initializer for the extraction workers.
+
+    Batch start notifications go to started_queue, so the parent can time each
+    batch from when a worker actually picked it up. Where SIGALRM is available
+    each page is also limited to page_timeout seconds inside the worker.
+    """
+    global _started_queue, _page_timeout
+    _started_queue = started_queue
+    if hasattr(signal, 'setitimer') and page_timeout > 0:
+        _page_timeout = page_timeout
+        signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def extract_pdf_pages(file_path, page_numbers, task_id=None):
+    """
+    Extract the text of specific pages of a PDF.
+
+    Each call opens the file itself, so only the file path and page numbers
+    cross the process boundary. A page that runs past the page timeout
+    contributes no text; the remaining pages are still extracted.
+
+    Returns:
+        list: Text of each requested page, in order
+    """
+    if _started_queue is not None and task_id is not None:
+        _started_queue.put(task_id)
+
+    page_texts = []
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page_number in page_numbers:
+            page_text = ""
+            try:
+                if _page_timeout:
+                    signal.setitimer(signal.ITIMER_REAL, _page_timeout)
+                page_text = pdf_reader.pages[page_number].extract_text() or ""
+            except PageTimeout:
+                print(f"PDF extraction timed out on page {page_number + 1}, skipping")
+            finally:
+                if _page_timeout:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            page_texts.append(page_text)
+    return page_texts
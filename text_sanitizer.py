@@ -0,0 +1,138 @@
+"""
+Fast Unicode sanitation for uploaded document text.
+
+Produces exactly the same output as the original per-character loop in
+app.py:
+
+    text = unicodedata.normalize('NFKC', text)
+    for char in text:
+        cat = unicodedata.category(char)
+        if cat[0] != 'C' or char in '\\n\\r\\t':   keep char
+        elif cat == 'Cc':                        replace with ' '
+        (other C* categories are dropped)
+
+but without a Python-level call per character:
+- Control characters (Cc) are replaced with a space by one regex pass
+- Format, surrogate, private-use and unassigned characters (Cf, Cs, Co, Cn)
+  in the Basic Multilingual Plane are removed by one precompiled regex
+  (compiled to a bitmap, so matching is O(1) per character)
+- Characters above U+FFFF are rare in extracted text; runs of them are
+  located with a single range regex and only those characters are checked
+  against the Unicode database
+
+The tables are built once at import time from the same unicodedata
+database the original loop used, so results are identical. Large texts
+are processed in chunks split after newlines, which are safe boundaries
+for NFKC normalization.
+
+Run benchmark_sanitizer.py to compare speed and verify identical output.
+"""
+
+import re
+import unicodedata
+
+# Characters kept even though they are control characters
+KEEP_CONTROL_CHARS = '\n\r\t'
+
+# Non-control "C" categories that are dropped entirely
+DROP_CATEGORIES = ('Cf', 'Cs', 'Co', 'Cn')
+
+# Texts larger than this are normalized and filtered chunk by chunk
+CHUNK_SIZE = 1024 * 1024
+
+
+def _char_class(code_points):
+    """Build a regex character class body from a sorted list of code points."""
+    ranges = []
+    for code_point in code_points:
+        if ranges and ranges[-1][1] == code_point - 1:
+            ranges[-1][1] = code_point
+        else:
+            ranges.append([code_point, code_point])
+    return ''.join(
+        re.escape(chr(start)) if start == end else f"{re.escape(chr(start))}-{re.escape(chr(end))}"
+        for start, end in ranges
+    )
+
+
+def _build_patterns():
+    """Build the control-character and BMP drop regexes from the Unicode database."""
+    control_chars = []
+    drop_chars = []
+    for code_point in range(0x10000):
+        category = unicodedata.category(chr(code_point))
+        if category == 'Cc' and chr(code_point) not in KEEP_CONTROL_CHARS:
+            control_chars.append(code_point)
+        elif category in DROP_CATEGORIES:
+            drop_chars.append(code_point)
+    return (
+        re.compile(f"[{_char_class(control_chars)}]"),
+        re.compile(f"[{_char_class(drop_chars)}]+"),
+    )
+
+
+CONTROL_PATTERN, BMP_DROP_PATTERN = _build_patterns()
+ASTRAL_PATTERN = re.compile('[\U00010000-\U0010FFFF]+')
+
+
+def _filter_astral(match):
+    # There are no control characters above U+FFFF, only C* categories to drop
+    return ''.join(
+        char for char in match.group()
+        if unicodedata.category(char) not in DROP_CATEGORIES
+    )
+
+
+def _sanitize_chunk(text):
+    if text.isascii():
+        # NFKC leaves ASCII unchanged and only C0 controls/DEL can need work
+        return CONTROL_PATTERN.sub(' ', text)
+    text = unicodedata.normalize('NFKC', text)
+    text = CONTROL_PATTERN.sub(' ', text)
+    text = BMP_DROP_PATTERN.sub('', text)
+    if ASTRAL_PATTERN.search(text):
+        text = ASTRAL_PATTERN.sub(_filter_astral, text)
+    return text
+
+
+def iter_chunks(text, chunk_size=CHUNK_SIZE):
+    """
+    Split text into pieces of roughly chunk_size characters, each ending
+    right after a newline (or at the end of the text).
+    """
+    start = 0
+    length = len(text)
+    while start < length:
+        end = start + chunk_size
+        if end >= length:
+            yield text[start:]
+            return
+        newline = text.rfind('\n', start, end)
+        if newline == -1:
+            # No newline in this window - extend to the next one
+            newline = text.find('\n', end)
+            if newline == -1:
+                yield text[start:]
+                return
+        yield text[start:newline + 1]
+        start = newline + 1
+
+
+def sanitize_text(text, chunk_size=CHUNK_SIZE):
+    """
+    Normalize and filter document text so it can be stored in a utf8mb4 column.
+
+    Args:
+        text (str or bytes): Extracted document text (bytes are decoded as UTF-8)
+        chunk_size (int): Characters processed per chunk
+
+    Returns:
+        str: Sanitized text (valid UTF-8, no control characters except newline,
+             carriage return and tab)
+    """
+    if isinstance(text, bytes):
+        text = text.decode('utf-8', errors='ignore')
+
+    if len(text) <= chunk_size:
+        return _sanitize_chunk(text)
+    return ''.join(_sanitize_chunk(chunk) for chunk in iter_chunks(text, chunk_size))